@@ -0,0 +1 @@
+"""FastAPI service for the AI checkout system."""
@@ -0,0 +1,135 @@
+"""
+Product catalog helpers: key normalization, frozen records and the fuzzy
+name index.
+
+Records and identifier lookups are served by catalog_store.CatalogStore;
+the name index is built once per worker so per-request lookups never scan
+the catalog in Python.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+from rapidfuzz import fuzz, process
+
+FUZZY_THRESHOLD = 70
+# Unique-ish identifier columns of the `products` table (supabase_schema.sql)
+KEY_FIELDS = ("barcode", "product_id", "sku")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_name(name: Any) -> str:
+    """Lowercase and collapse whitespace so equivalent names hash the same."""
+    if not isinstance(name, str):
+        return ""
+    return _WHITESPACE.sub(" ", name).strip().lower()
+
+
+def normalize_key(value: Any) -> Optional[str]:
+    """Canonical string form of an identifier (barcodes may load as numbers)."""
+    if value is None:
+        return None
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return None
+        if value.is_integer():
+            value = int(value)
+    key = str(value).strip()
+    return key or None
+
+
+def freeze_product(product: Mapping) -> Mapping:
+    """Return a read-only view of a product record (nested dicts included)."""
+    return MappingProxyType({
+        k: freeze_product(v) if isinstance(v, Mapping) else v
+        for k, v in product.items()
+    })
+
+
+def thaw_product(product: Mapping) -> dict:
+    """Plain (JSON-serializable) copy of a frozen product record."""
+    return {k: thaw_product(v) if isinstance(v, Mapping) else v for k, v in product.items()}
+
+
+class NameIndex:
+    """
+    Product-name matcher.
+
+    Exact hits come from a normalized-name hash map. Misses fall back to
+    ``rapidfuzz.process.extractOne`` over a precomputed list of normalized
+    names, which runs the whole comparison loop in C. Results are memoized
+    per query because the classifier only ever emits a fixed set of labels.
+    """
+
+    def __init__(self, products: Sequence[Mapping], name_key: str = "name",
+                 threshold: float = FUZZY_THRESHOLD, cache_size: int = 4096,
+                 names: Optional[Iterable[str]] = None):
+        """
+        Build the index.
+
+        Args:
+            products: Product records (any indexable sequence)
+            name_key: Field holding the product name
+            threshold: Minimum fuzz.ratio score for a fuzzy match (exclusive)
+            cache_size: Number of memoized query results
+            names: Product names in row order, if available without
+                reading every record
+        """
+        self.products = products
+        self.threshold = threshold
+        self.cache_size = cache_size
+        self._exact: Dict[str, int] = {}
+        self._choices: List[str] = []
+        self._choice_rows: List[int] = []
+        if names is None:
+            names = (product.get(name_key) for product in products)
+        for row, name in enumerate(names):
+            key = normalize_name(name)
+            if not key:
+                continue
+            if key not in self._exact:
+                self._exact[key] = row
+                self._choices.append(key)
+                self._choice_rows.append(row)
+        self._cache: "OrderedDict[str, Optional[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._choices)
+
+    def _match_row(self, key: str) -> Optional[int]:
+        row = self._exact.get(key)
+        if row is not None:
+            return row
+        if not self._choices:
+            return None
+        best = process.extractOne(key, self._choices, scorer=fuzz.ratio, score_cutoff=self.threshold)
+        if best is None or best[1] <= self.threshold:
+            return None
+        return self._choice_rows[best[2]]
+
+    def lookup(self, name: str) -> Optional[Mapping]:
+        """
+        Find the product whose name best matches `name`.
+
+        Returns:
+            The product record, or None if nothing scores above the threshold
+        """
+        key = normalize_name(name)
+        if not key:
+            return None
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                row = self._cache[key]
+                return self.products[row] if row is not None else None
+
+        row = self._match_row(key)
+        with self._lock:
+            self._cache[key] = row
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return self.products[row] if row is not None else None
+
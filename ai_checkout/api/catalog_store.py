@@ -0,0 +1,467 @@
+"""
+Compact columnar product catalog, memory-mapped read-only by API workers.
+
+A store is a directory of ``.npy`` arrays plus ``meta.json``:
+
+    <col>.values.npy            numeric columns (float64 / int64)
+    <col>.offsets.npy           string columns: int64 offsets into...
+    <col>.data.npy              ...a uint8 UTF-8 string table
+    <col>.null.npy              optional missing-value mask
+    <field>.hash.npy            sorted 64-bit key hashes for indexed fields
+    <field>.rows.npy            row of each hash entry
+    name.sorted.npy             rows ordered by normalized name (prefix search)
+
+Workers open every array with ``np.load(mmap_mode='r')``, so opening a store
+costs a few milliseconds regardless of catalog size and the pages are shared
+between processes through the OS page cache instead of being copied into
+each worker's heap. Identifier lookups binary-search the mapped hash arrays
+and materialize only the records that are actually returned.
+
+On disk the store path is a symlink to a versioned directory
+(``.<name>.<random>``). A rebuild writes a fresh directory and repoints the
+link with a single ``os.replace``, so the store path always resolves to a
+complete store; rebuilds by concurrent workers are serialized by an
+``flock`` on ``.<name>.lock`` next to the store.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: rebuilds are not serialized across processes
+    fcntl = None
+
+from api.catalog import KEY_FIELDS, NameIndex, freeze_product, normalize_key, normalize_name
+
+FORMAT_VERSION = 2
+NAME_FIELD = "name"
+CATEGORY_FIELD = "category"
+# Fields with a mapped hash index: identifiers, the normalized name and the
+# category (the indexed product columns in supabase_schema.sql)
+INDEXED_FIELDS = KEY_FIELDS + (NAME_FIELD, CATEGORY_FIELD)
+
+
+def _hash_key(key: str) -> int:
+    """Stable 64-bit hash (Python's hash() differs between processes)."""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _index_key(field: str, value: Any) -> Optional[str]:
+    if field == NAME_FIELD:
+        return normalize_name(value) or None
+    return normalize_key(value)
+
+
+def _column_kind(values: Sequence[Any]) -> str:
+    present = [v for v in values if v is not None]
+    if not present:
+        return "str"
+    if all(isinstance(v, str) for v in present):
+        return "str"
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in present):
+        return "int"
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        return "float"
+    return "json"
+
+
+def _write_strings(out_dir: Path, name: str, values: Sequence[Optional[str]]) -> None:
+    encoded = [v.encode("utf-8") if v is not None else b"" for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    np.save(out_dir / f"{name}.offsets.npy", offsets)
+    np.save(out_dir / f"{name}.data.npy", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+
+
+@contextmanager
+def store_lock(store_dir: Path):
+    """Hold an exclusive lock on the store's sibling lock file (no-op without fcntl)."""
+    store_dir = Path(store_dir)
+    store_dir.parent.mkdir(parents=True, exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+    with open(store_dir.with_name(f".{store_dir.name}.lock"), "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _swap_in(tmp_dir: Path, out_dir: Path) -> None:
+    """Point the `out_dir` symlink at `tmp_dir` and remove superseded versions."""
+    previous = Path(os.readlink(out_dir)).name if out_dir.is_symlink() else None
+    if out_dir.exists() and not out_dir.is_symlink():
+        # Store written before versioned directories: move it aside once
+        legacy = out_dir.with_name(f".{out_dir.name}.legacy")
+        shutil.rmtree(legacy, ignore_errors=True)
+        os.replace(out_dir, legacy)
+        previous = legacy.name
+    link = out_dir.with_name(f".{out_dir.name}.link.{os.getpid()}")
+    if link.is_symlink():
+        link.unlink()
+    os.symlink(tmp_dir.name, link)
+    os.replace(link, out_dir)
+    # Keep the version just replaced for readers that resolved the old link a
+    # moment ago; anything older is unreachable
+    keep = {tmp_dir.name, previous, f".{out_dir.name}.lock"}
+    for path in out_dir.parent.glob(f".{out_dir.name}.*"):
+        if path.name not in keep and path.is_dir() and not path.is_symlink():
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def write_store(products: Sequence[Mapping], out_dir: Path, source: Optional[Path] = None) -> Path:
+    """
+    Write products as a columnar store, atomically repointing `out_dir` at it.
+
+    Callers that may race with other writers should hold store_lock(out_dir).
+
+    Args:
+        products: Product records (e.g. from data/product_catalog.json)
+        out_dir: Store directory
+        source: JSON file the store was built from (recorded for staleness checks)
+
+    Returns:
+        Path of the written store
+    """
+    out_dir = Path(out_dir)
+    out_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f".{out_dir.name}.", dir=out_dir.parent))
+    try:
+        columns: List[str] = []
+        for product in products:
+            for key in product:
+                if key not in columns:
+                    columns.append(key)
+
+        kinds = {}
+        digest = hashlib.sha256()
+        for col in columns:
+            values = [p.get(col) for p in products]
+            kind = _column_kind(values)
+            kinds[col] = kind
+            null = np.array([v is None for v in values], dtype=bool)
+            if null.any():
+                np.save(tmp_dir / f"{col}.null.npy", null)
+            if kind == "int":
+                arr = np.array([v if v is not None else 0 for v in values], dtype=np.int64)
+                np.save(tmp_dir / f"{col}.values.npy", arr)
+            elif kind == "float":
+                arr = np.array([v if v is not None else np.nan for v in values], dtype=np.float64)
+                np.save(tmp_dir / f"{col}.values.npy", arr)
+            elif kind == "str":
+                _write_strings(tmp_dir, col, values)
+            else:
+                _write_strings(tmp_dir, col, [json.dumps(v) if v is not None else None for v in values])
+            digest.update(json.dumps([col, kind, values], sort_keys=True, default=str).encode("utf-8"))
+
+        indexed = []
+        for field in INDEXED_FIELDS:
+            if field not in kinds:
+                continue
+            hashes, rows = [], []
+            for row, product in enumerate(products):
+                key = _index_key(field, product.get(field))
+                if key is not None:
+                    hashes.append(_hash_key(key))
+                    rows.append(row)
+            hashes = np.array(hashes, dtype=np.uint64)
+            rows = np.array(rows, dtype=np.int64)
+            # Sort by hash, then row, so the first occurrence of a key wins
+            order = np.lexsort((rows, hashes))
+            np.save(tmp_dir / f"{field}.hash.npy", hashes[order])
+            np.save(tmp_dir / f"{field}.rows.npy", rows[order])
+            indexed.append(field)
+
+        if NAME_FIELD in kinds:
+            named = sorted(
+                (key, row) for row, key in
+                ((row, _index_key(NAME_FIELD, p.get(NAME_FIELD))) for row, p in enumerate(products))
+                if key is not None
+            )
+            np.save(tmp_dir / f"{NAME_FIELD}.sorted.npy", np.array([row for _, row in named], dtype=np.int64))
+
+        meta = {
+            "format_version": FORMAT_VERSION,
+            "rows": len(products),
+            "columns": kinds,
+            "indexed": indexed,
+            "version": digest.hexdigest()[:16],
+        }
+        if source is not None:
+            stat = Path(source).stat()
+            meta["source"] = {"path": str(source), "size": stat.st_size, "mtime": stat.st_mtime}
+        with open(tmp_dir / "meta.json", "w") as f:
+            json.dump(meta, f, indent=2)
+
+        # mkdtemp creates the directory 0700; workers may run as another user
+        os.chmod(tmp_dir, 0o755)
+        # Swap the finished store into place; readers keep their mappings of the old files
+        _swap_in(tmp_dir, out_dir)
+        return out_dir
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def is_stale(store_dir: Path, source: Path) -> bool:
+    """True if the store is missing or was built from a different version of `source`."""
+    meta_path = Path(store_dir) / "meta.json"
+    if not meta_path.exists():
+        return True
+    if not Path(source).exists():
+        return False
+    with open(meta_path) as f:
+        meta = json.load(f)
+    recorded = meta.get("source") or {}
+    stat = Path(source).stat()
+    return (meta.get("format_version") != FORMAT_VERSION
+            or recorded.get("size") != stat.st_size
+            or recorded.get("mtime") != stat.st_mtime)
+
+
+class _Records(Sequence):
+    """Lazy sequence view over a store's records."""
+
+    def __init__(self, store: "CatalogStore"):
+        self._store = store
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def __getitem__(self, row):
+        return self._store.record(row)
+
+
+class CatalogStore:
+    """
+    Read-only, memory-mapped product catalog.
+
+    Identifier lookups (get, by_barcode, by_product_id, by_sku, bulk_get)
+    binary-search the mapped hash indexes; find_by_name goes through NameIndex.
+    """
+
+    def __init__(self, store_dir: Path, record_cache_size: int = 4096):
+        # Resolve the link once so every array comes from the same version
+        self.path = Path(store_dir).resolve()
+        with open(self.path / "meta.json") as f:
+            self.meta = json.load(f)
+        self.version: str = self.meta["version"]
+        self.kinds: Dict[str, str] = self.meta["columns"]
+        self._rows: int = self.meta["rows"]
+        self._values: Dict[str, np.ndarray] = {}
+        self._strings: Dict[str, tuple] = {}
+        self._nulls: Dict[str, np.ndarray] = {}
+        for col, kind in self.kinds.items():
+            if kind in ("int", "float"):
+                self._values[col] = self._load(f"{col}.values.npy")
+            else:
+                self._strings[col] = (self._load(f"{col}.offsets.npy"), self._load(f"{col}.data.npy"))
+            if (self.path / f"{col}.null.npy").exists():
+                self._nulls[col] = self._load(f"{col}.null.npy")
+        self._index = {
+            field: (self._load(f"{field}.hash.npy"), self._load(f"{field}.rows.npy"))
+            for field in self.meta["indexed"]
+        }
+        sorted_path = self.path / f"{NAME_FIELD}.sorted.npy"
+        self._name_sorted = self._load(sorted_path.name) if sorted_path.exists() else np.empty(0, dtype=np.int64)
+        self.products = _Records(self)
+        self._record_cache: "OrderedDict[int, Mapping]" = OrderedDict()
+        self._record_cache_size = record_cache_size
+        self._names: Optional[NameIndex] = None
+        self._lock = threading.Lock()
+
+    def _load(self, name: str) -> np.ndarray:
+        return np.load(self.path / name, mmap_mode="r")
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def is_null(self, col: str, row: int) -> bool:
+        null = self._nulls.get(col)
+        return bool(null[row]) if null is not None else False
+
+    def string(self, col: str, row: int) -> str:
+        offsets, data = self._strings[col]
+        return data[offsets[row]:offsets[row + 1]].tobytes().decode("utf-8")
+
+    def strings(self, col: str) -> Iterator[Optional[str]]:
+        """Iterate a string column in row order (None for missing values)."""
+        for row in range(self._rows):
+            yield None if self.is_null(col, row) else self.string(col, row)
+
+    def column(self, col: str) -> np.ndarray:
+        """Mapped array of a numeric column."""
+        return self._values[col]
+
+    def value(self, col: str, row: int) -> Any:
+        if self.is_null(col, row):
+            return None
+        kind = self.kinds[col]
+        if kind == "int":
+            return int(self._values[col][row])
+        if kind == "float":
+            return float(self._values[col][row])
+        text = self.string(col, row)
+        return json.loads(text) if kind == "json" else text
+
+    def record(self, row: int) -> Mapping:
+        """Materialize one row as a frozen product record (LRU-cached)."""
+        if row < 0:
+            row += self._rows
+        if not 0 <= row < self._rows:
+            raise IndexError(row)
+        with self._lock:
+            cached = self._record_cache.get(row)
+            if cached is not None:
+                self._record_cache.move_to_end(row)
+                return cached
+        product = freeze_product({col: self.value(col, row) for col in self.kinds})
+        with self._lock:
+            self._record_cache[row] = product
+            if len(self._record_cache) > self._record_cache_size:
+                self._record_cache.popitem(last=False)
+        return product
+
+    def _find_row(self, field: str, key: str, key_hash: int, hashes: np.ndarray, rows: np.ndarray) -> Optional[int]:
+        i = int(np.searchsorted(hashes, np.uint64(key_hash), side="left"))
+        while i < len(hashes) and int(hashes[i]) == key_hash:
+            row = int(rows[i])
+            if _index_key(field, self.value(field, row)) == key:
+                return row
+            i += 1
+        return None
+
+    def get_row(self, field: str, value: Any) -> Optional[int]:
+        """Row of the first product whose `field` matches `value`."""
+        if field not in self._index:
+            return None
+        key = _index_key(field, value)
+        if key is None:
+            return None
+        hashes, rows = self._index[field]
+        return self._find_row(field, key, _hash_key(key), hashes, rows)
+
+    def get(self, field: str, value: Any) -> Optional[Mapping]:
+        row = self.get_row(field, value)
+        return self.record(row) if row is not None else None
+
+    def by_barcode(self, barcode: Any) -> Optional[Mapping]:
+        return self.get("barcode", barcode)
+
+    def by_product_id(self, product_id: Any) -> Optional[Mapping]:
+        return self.get("product_id", product_id)
+
+    def by_sku(self, sku: Any) -> Optional[Mapping]:
+        return self.get("sku", sku)
+
+    def rows_matching(self, field: str, value: Any) -> np.ndarray:
+        """All rows (ascending) whose indexed `field` equals `value`."""
+        key = _index_key(field, value) if field in self._index else None
+        if key is None:
+            return np.empty(0, dtype=np.int64)
+        hashes, rows = self._index[field]
+        key_hash = np.uint64(_hash_key(key))
+        lo = int(np.searchsorted(hashes, key_hash, side="left"))
+        hi = int(np.searchsorted(hashes, key_hash, side="right"))
+        candidates = np.asarray(rows[lo:hi])
+        # Equal keys share a hash and sit together in row order; drop collisions
+        keep = [_index_key(field, self.value(field, int(r))) == key for r in candidates]
+        return np.sort(candidates[np.array(keep, dtype=bool)]) if len(candidates) else candidates
+
+    def rows_with_name_prefix(self, prefix: str) -> np.ndarray:
+        """All rows (ascending) whose normalized name starts with `prefix`."""
+        prefix = normalize_name(prefix)
+        ordered = self._name_sorted
+        if not prefix or not len(ordered):
+            return np.empty(0, dtype=np.int64)
+
+        def name_at(i: int) -> str:
+            return _index_key(NAME_FIELD, self.string(NAME_FIELD, int(ordered[i])))
+
+        def bisect(upper: str) -> int:
+            lo, hi = 0, len(ordered)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if name_at(mid) < upper:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            return lo
+
+        start = bisect(prefix)
+        end = bisect(prefix + "\U0010ffff")
+        return np.sort(np.asarray(ordered[start:end]))
+
+    def bulk_get(self, field: str, values: Iterable[Any]) -> List[Optional[Mapping]]:
+        """Look up many identifiers with one vectorized search over the mapped hashes."""
+        values = list(values)
+        if field not in self._index or not values:
+            return [None] * len(values)
+        keys = [_index_key(field, v) for v in values]
+        key_hashes = np.array([_hash_key(k) if k is not None else 0 for k in keys], dtype=np.uint64)
+        hashes, rows = self._index[field]
+        starts = np.searchsorted(hashes, key_hashes, side="left")
+        results: List[Optional[Mapping]] = []
+        for key, key_hash, start in zip(keys, key_hashes, starts):
+            row = None
+            if key is not None and start < len(hashes) and hashes[start] == key_hash:
+                row = self._find_row(field, key, int(key_hash), hashes, rows)
+            results.append(self.record(row) if row is not None else None)
+        return results
+
+    def bulk_by_barcode(self, barcodes: Iterable[Any]) -> List[Optional[Mapping]]:
+        return self.bulk_get("barcode", barcodes)
+
+    @property
+    def names(self) -> NameIndex:
+        """Fuzzy name matcher, built on first use from the mapped name column."""
+        if self._names is None:
+            with self._lock:
+                if self._names is None:
+                    names = self.strings(NAME_FIELD) if NAME_FIELD in self._strings else ()
+                    self._names = NameIndex(self.products, names=names)
+        return self._names
+
+    def find_by_name(self, name: str) -> Optional[Mapping]:
+        # Exact (normalized) names resolve through the mapped index without
+        # building the per-process fuzzy matcher
+        product = self.get(NAME_FIELD, name)
+        if product is not None:
+            return product
+        return self.names.lookup(name)
+
+
+def open_catalog(source: Path, store_dir: Path) -> CatalogStore:
+    """
+    Open the columnar store, (re)building it from the JSON catalog when stale.
+
+    Workers starting together take the store lock in turn; the first one
+    rebuilds and the rest find the store fresh when they re-check under the
+    lock. Readers never see a missing or half-written store because
+    write_store swaps versions in with an atomic symlink replace.
+    """
+    source, store_dir = Path(source), Path(store_dir)
+    if is_stale(store_dir, source):
+        with store_lock(store_dir):
+            if is_stale(store_dir, source):
+                products = []
+                if source.exists():
+                    with open(source, "r") as f:
+                        products = json.load(f)
+                else:
+                    print(f"Product catalog not found at {source}")
+                write_store(products, store_dir, source=source if source.exists() else None)
+                print(f"Built columnar catalog store with {len(products)} products at {store_dir}")
+    return CatalogStore(store_dir)
@@ -0,0 +1,317 @@
+"""
+Content-addressed store for uploaded frames.
+
+Frames are persisted exactly as uploaded (no decode/re-encode) under the
+hash of their bytes, sharded into two levels of subdirectories:
+
+    <root>/ab/cd/abcd1234....jpg
+
+Identical frames map to the same file and are written once. Writes happen on
+a background thread, so ``put()`` only hashes the bytes and returns the key
+that goes into ``scans.image_url`` / ``training_data.image_url``.
+
+Retention:
+    - frames referenced by ``training_data`` are pinned and never evicted
+    - other frames (referenced by ``scans``) are evicted once older than
+      ``max_age_s``, and oldest-first whenever the store exceeds ``max_bytes``
+
+Several API worker processes share one store, so all retention state lives
+on disk: a pinned frame has a ``<key>.pin`` marker next to it and a frame's
+age is its file mtime (refreshed whenever it is seen again). One process at
+a time owns eviction (an ``flock`` on ``.evict.lock``, taken over if the
+owner exits); it rescans the store, so the byte budget covers every
+process's writes. Eviction and pinning serialize on ``.pin.lock``, and the
+pin marker is re-checked before each delete.
+"""
+
+import hashlib
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single process owns the store
+    fcntl = None
+
+PIN_SUFFIX = ".pin"
+
+_SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"RIFF", ".webp"),
+)
+
+
+def frame_extension(data: bytes) -> str:
+    """File extension from the image's magic bytes."""
+    for magic, ext in _SIGNATURES:
+        if data.startswith(magic):
+            return ext
+    return ".bin"
+
+
+def content_key(data: bytes) -> str:
+    """Sharded relative path for `data`, e.g. 'ab/cd/abcd....jpg'."""
+    digest = hashlib.blake2b(data, digest_size=20).hexdigest()
+    return f"{digest[:2]}/{digest[2:4]}/{digest}{frame_extension(data)}"
+
+
+class FrameStore:
+    """Deduplicating, asynchronously written frame store with eviction."""
+
+    def __init__(
+        self,
+        root: Path,
+        max_bytes: int = 2 * 1024 ** 3,
+        max_age_s: float = 7 * 24 * 3600,
+        max_pending: int = 256,
+        evict_interval_s: float = 60.0,
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            root: Directory holding the frames
+            max_bytes: Size budget for unpinned frames
+            max_age_s: Age after which unpinned frames are evicted
+            max_pending: Frames waiting to be written; beyond this new frames are dropped
+            evict_interval_s: How often the writer thread enforces the budget
+        """
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.evict_interval_s = evict_interval_s
+        self._queue: "queue.Queue[Tuple[str, bytes, bool]]" = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        # key -> (size, last write time); pinned keys are tracked separately
+        self._index: Dict[str, Tuple[int, float]] = {}
+        self._pinned: Set[str] = set()
+        self._bytes = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._last_evict = 0.0
+        self._owner_lock = None
+
+        self.writes = 0
+        self.dedup_hits = 0
+        self.dropped = 0
+        self.evicted = 0
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._load()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="frame-store", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop after writing queued frames."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._owner_lock is not None:
+            self._owner_lock.close()
+            self._owner_lock = None
+
+    def _load(self) -> None:
+        """Rebuild the in-memory index from disk."""
+        pinned = set()
+        index = {}
+        for shard in self.root.glob("*/*"):
+            if not shard.is_dir():
+                continue
+            with os.scandir(shard) as it:
+                entries = [entry for entry in it if entry.is_file()]
+            names = {entry.name for entry in entries}
+            for entry in entries:
+                if entry.name.endswith((".tmp", PIN_SUFFIX)):
+                    continue
+                key = f"{shard.parent.name}/{shard.name}/{entry.name}"
+                if entry.name + PIN_SUFFIX in names:
+                    pinned.add(key)
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                index[key] = (stat.st_size, stat.st_mtime)
+        with self._lock:
+            self._pinned = pinned
+            self._index = index
+            self._bytes = sum(size for size, _ in index.values())
+
+    def path(self, key: str) -> Path:
+        return self.root / key
+
+    def pin_path(self, key: str) -> Path:
+        return self.root / (key + PIN_SUFFIX)
+
+    @contextmanager
+    def _pin_lock(self):
+        """Serialize pinning against eviction across processes."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.root / ".pin.lock", "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _owns_eviction(self) -> bool:
+        """Take (or keep) the store-wide eviction lock; False if another process holds it."""
+        if fcntl is None or self._owner_lock is not None:
+            return True
+        f = open(self.root / ".evict.lock", "a")
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._owner_lock = f
+        return True
+
+    def put(self, data: bytes, pin: bool = False) -> Optional[str]:
+        """
+        Schedule `data` for storage and return its key.
+
+        Args:
+            data: Encoded frame bytes, stored as-is
+            pin: Retain the frame indefinitely (training data)
+
+        Returns:
+            The frame key, or None if the write queue is full
+        """
+        key = content_key(data)
+        # Known frames are queued too: the writer refreshes the file's mtime
+        # (which eviction in any process goes by) or rewrites it if another
+        # process has evicted it since
+        try:
+            self._queue.put_nowait((key, data, pin))
+        except queue.Full:
+            with self._lock:
+                known = key in self._index or key in self._pinned
+            if known and not pin:
+                return key
+            self.dropped += 1
+            return None
+        return key
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "frames": len(self._index),
+                "pinned": len(self._pinned),
+                "bytes": self._bytes,
+                "pending_writes": self._queue.qsize(),
+                "writes": self.writes,
+                "dedup_hits": self.dedup_hits,
+                "dropped": self.dropped,
+                "evicted": self.evicted,
+                "evict_owner": self._owner_lock is not None,
+            }
+
+    def _run(self) -> None:
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                key, data, pin = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                key = None
+            if key is not None:
+                try:
+                    self._write(key, data, pin)
+                except OSError as e:
+                    print(f"Error writing frame {key}: {e}")
+            if time.monotonic() - self._last_evict >= self.evict_interval_s:
+                self.evict()
+
+    def _store(self, key: str, data: bytes) -> None:
+        path = self.path(key)
+        try:
+            os.utime(path)
+            self.dedup_hits += 1
+            return
+        except FileNotFoundError:
+            pass
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self.writes += 1
+
+    def _write(self, key: str, data: bytes, pin: bool) -> None:
+        if pin:
+            # Frame and marker land together, so eviction sees either both or neither
+            with self._pin_lock():
+                self._store(key, data)
+                self.pin_path(key).touch()
+        else:
+            self._store(key, data)
+
+        with self._lock:
+            if pin:
+                if key not in self._pinned:
+                    self._pinned.add(key)
+                    entry = self._index.pop(key, None)
+                    if entry is not None:
+                        self._bytes -= entry[0]
+            elif key not in self._pinned:
+                previous = self._index.get(key)
+                if previous is None:
+                    self._bytes += len(data)
+                self._index[key] = (len(data), time.time())
+
+    def evict(self) -> int:
+        """
+        Delete expired frames, then the oldest ones until under budget.
+
+        Only the process owning the eviction lock deletes; every process
+        refreshes its index from disk so its stats include other writers.
+        """
+        self._last_evict = time.monotonic()
+        self._load()
+        if not self._owns_eviction():
+            return 0
+        cutoff = time.time() - self.max_age_s
+        with self._lock:
+            by_age = sorted(self._index.items(), key=lambda item: item[1][1])
+            victims: List[Tuple[str, int, float]] = []
+            remaining = self._bytes
+            for key, (size, mtime) in by_age:
+                if mtime >= cutoff and remaining <= self.max_bytes:
+                    break
+                victims.append((key, size, mtime))
+                remaining -= size
+
+        removed = []
+        with self._pin_lock():
+            for key, size, mtime in victims:
+                path = self.path(key)
+                try:
+                    # Skip frames pinned or seen again since the scan
+                    if self.pin_path(key).exists() or path.stat().st_mtime > mtime:
+                        continue
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    print(f"Error evicting frame {key}: {e}")
+                    continue
+                removed.append(key)
+        with self._lock:
+            for key in removed:
+                entry = self._index.pop(key, None)
+                if entry is not None:
+                    self._bytes -= entry[0]
+        self.evicted += len(removed)
+        return len(removed)
@@ -0,0 +1,104 @@
+"""
+Frame ingestion for the vision endpoints.
+
+Frames can arrive as:
+    - multipart/form-data with an ``image`` (or ``file``) upload
+    - a raw body with Content-Type application/octet-stream or image/*
+    - JSON ``{"image": "<data URL or base64>", "user_id": ...}`` (legacy)
+
+The binary paths hand the request buffer straight to ``cv2.imdecode`` so
+each frame is decoded exactly once; the JSON path only adds the base64 step.
+"""
+
+import base64
+import binascii
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+import cv2
+import numpy as np
+from fastapi import Request
+from starlette.datastructures import UploadFile
+
+BINARY_CONTENT_TYPES = ("application/octet-stream", "image/")
+UPLOAD_FIELDS = ("image", "file")
+
+
+class FrameError(ValueError):
+    """Raised when a request does not carry a usable frame."""
+
+
+@dataclass
+class Frame:
+    """An uploaded frame: the original encoded bytes plus the requesting user."""
+    data: bytes
+    user_id: Optional[str] = None
+    # Other text fields sent with the frame (query, form or JSON), e.g. label
+    fields: Dict[str, str] = field(default_factory=dict)
+
+
+def decode_image_bytes(data) -> Optional[np.ndarray]:
+    """Decode encoded image bytes (JPEG/PNG/...) to a BGR array in a single pass."""
+    if not data:
+        return None
+    buf = np.frombuffer(data, dtype=np.uint8)
+    return cv2.imdecode(buf, cv2.IMREAD_COLOR)
+
+
+def is_decodable_image(data) -> bool:
+    """Cheap validity check: decodes at 1/8 scale in grayscale."""
+    if not data:
+        return False
+    buf = np.frombuffer(data, dtype=np.uint8)
+    return cv2.imdecode(buf, cv2.IMREAD_REDUCED_GRAYSCALE_8) is not None
+
+
+def data_url_to_bytes(data_url: str) -> bytes:
+    """Strip an optional data URL prefix and base64-decode the payload."""
+    b64 = data_url.split(",", 1)[1] if data_url.startswith("data:") else data_url
+    try:
+        return base64.b64decode(b64, validate=False)
+    except (binascii.Error, ValueError) as e:
+        raise FrameError(f"Invalid base64 image data: {e}")
+
+
+async def read_frame(request: Request) -> Frame:
+    """
+    Extract the encoded frame and user id from a request.
+
+    Args:
+        request: Incoming request (multipart, raw bytes or JSON)
+
+    Returns:
+        Frame with the original encoded bytes
+    """
+    content_type = request.headers.get("content-type", "").lower()
+    fields = dict(request.query_params)
+    user_id = request.query_params.get("user_id") or request.headers.get("x-user-id")
+
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = next((form[f] for f in UPLOAD_FIELDS if isinstance(form.get(f), UploadFile)), None)
+        if upload is None:
+            raise FrameError("No image provided")
+        data = await upload.read()
+        fields.update({k: v for k, v in form.items() if isinstance(v, str)})
+        user_id = form.get("user_id") or user_id
+    elif content_type.startswith(BINARY_CONTENT_TYPES):
+        data = await request.body()
+    else:
+        try:
+            payload = await request.json()
+        except ValueError:
+            raise FrameError("Expected multipart, raw image bytes or a JSON body")
+        if not isinstance(payload, dict):
+            raise FrameError("Expected a JSON object")
+        image = payload.get("image")
+        if not image:
+            raise FrameError("No image provided")
+        data = data_url_to_bytes(image)
+        fields.update({k: v for k, v in payload.items() if k != "image" and isinstance(v, str)})
+        user_id = payload.get("user_id") or user_id
+
+    if not data:
+        raise FrameError("No image provided")
+    return Frame(data=data, user_id=user_id, fields=fields)
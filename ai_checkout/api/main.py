@@ -1,8 +1,39 @@
-﻿from fastapi import FastAPI, Form, UploadFile, File, status
+﻿from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Form, UploadFile, File, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from starlette.routing import Match
 from pydantic import BaseModel
 from supabase import create_client, Client
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
 import os
+import sys
+import threading
+import time
+import numpy as np
+
+# Make the ai_checkout packages (api, inference) importable however the app is started
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from api.catalog import thaw_product
+from api.catalog_store import open_catalog
+from api.product_pages import DEFAULT_LIMIT, CursorError, ProductPages, decode_cursor, etag_matches
+from api.scan_log import ScanLogWriter
+from api.frame_store import FrameStore
+from api.result_cache import ResultCache, frame_signature
+from api.ingest import FrameError, data_url_to_bytes, decode_image_bytes, is_decodable_image, read_frame
+from api.stream import LatestFrameSlot
+from api.worker_pool import DEFAULT_WORKERS, PoolSaturated, StageTimer, WorkerPool
+from inference import cnn_infer
+from inference.detection import YoloDetector
+from inference.two_stage import classify_detections
+from inference import verify_basket
+from inference.depth import DepthEstimator
+from inference.volume import assign, load_calibration
+from inference.instrumentation import REGISTRY, observe_stages, server_timing
+from inference.model_registry import ModelRegistry
 
 app = FastAPI()
 
@@ -14,29 +45,732 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Minimal config (ML disabled during reset)
+# Configuration
 SUPABASE_URL = os.getenv("SUPABASE_URL", "https://<YOUR_PROJECT>.supabase.co")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "<SERVICE_ROLE_KEY>")
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+CONFIDENCE_THRESHOLD = float(os.getenv("CONFIDENCE_THRESHOLD", "0.5"))
+PRODUCT_CATALOG_PATH = os.getenv(
+    "PRODUCT_CATALOG_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "data", "product_catalog.json"),
+)
+# Columnar store built from the JSON catalog (scripts/build_catalog_store.py)
+CATALOG_STORE_PATH = os.getenv("CATALOG_STORE_PATH", os.path.splitext(PRODUCT_CATALOG_PATH)[0] + ".store")
+
+# Detection worker pool: CPU-bound decode/inference runs off the event loop
+DETECT_WORKERS = int(os.getenv("DETECT_WORKERS", str(DEFAULT_WORKERS)))
+DETECT_MAX_PENDING = int(os.getenv("DETECT_MAX_PENDING", "0"))
+DETECT_RETRY_AFTER_S = float(os.getenv("DETECT_RETRY_AFTER_S", "1"))
+PRODUCTS_MAX_AGE_S = int(os.getenv("PRODUCTS_MAX_AGE_S", "60"))
+# Scan logging is write-behind: rows are batched and inserted off the request path
+SCAN_LOG_BATCH = int(os.getenv("SCAN_LOG_BATCH", "100"))
+SCAN_LOG_FLUSH_S = float(os.getenv("SCAN_LOG_FLUSH_S", "1"))
+SCAN_LOG_MAX_QUEUE = int(os.getenv("SCAN_LOG_MAX_QUEUE", "10000"))
+SCAN_SPILL_PATH = os.getenv(
+    "SCAN_SPILL_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "data", "spool", "scans.jsonl"),
+)
+TRAINING_SPILL_PATH = os.getenv(
+    "TRAINING_SPILL_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "data", "spool", "training_data.jsonl"),
+)
+# Uploaded frames are stored as-is under their content hash
+FRAME_STORE_DIR = os.getenv("FRAME_STORE_DIR", os.path.join(os.path.dirname(__file__), "..", "data", "frames"))
+FRAME_STORE_MAX_MB = int(os.getenv("FRAME_STORE_MAX_MB", "2048"))
+FRAME_MAX_AGE_DAYS = float(os.getenv("FRAME_MAX_AGE_DAYS", "7"))
+# Reuse predictions for near-identical auto-capture frames (TTL 0 disables)
+RESULT_CACHE_TTL_S = float(os.getenv("RESULT_CACHE_TTL_S", "10"))
+RESULT_CACHE_MAX_DISTANCE = int(os.getenv("RESULT_CACHE_MAX_DISTANCE", "10"))
+# Multi-item detector (YOLO exported to ONNX; path from DETECTOR_MODEL_PATH)
+DETECTOR_CONF_THRESHOLD = float(os.getenv("DETECTOR_CONF_THRESHOLD", "0.25"))
+DETECTOR_IOU_THRESHOLD = float(os.getenv("DETECTOR_IOU_THRESHOLD", "0.45"))
+# Second stage: classify every detector box with the CNN in one batched pass
+BASKET_CLASSIFY_CROPS = os.getenv("BASKET_CLASSIFY_CROPS", "1") == "1"
+# Volume check inputs: depth model (DEPTH_MODEL_PATH) and reference-object calibration
+CAMERA_CALIBRATION_PATH = os.getenv("CAMERA_CALIBRATION_PATH", os.path.join(os.path.dirname(__file__), "..", "calibration", "camera.json"))
+DEPTH_WORKING_SIZE = int(os.getenv("DEPTH_WORKING_SIZE", "256"))
+# Classifier versions live in the model registry (MODEL_REGISTRY_DIR); workers
+# poll its CURRENT pointer and hot-swap when it changes (0 disables polling)
+MODEL_REGISTRY_POLL_S = float(os.getenv("MODEL_REGISTRY_POLL_S", "10"))
+# Echo per-stage timings to clients in a Server-Timing header (off by default)
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
 
-# Keep Supabase client for non-ML operations (no-op here)
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
 
+scan_log = ScanLogWriter(
+    insert_fn=lambda rows: supabase.table("scans").insert(rows).execute(),
+    spill_path=Path(SCAN_SPILL_PATH),
+    max_batch=SCAN_LOG_BATCH,
+    flush_interval_s=SCAN_LOG_FLUSH_S,
+    max_queue=SCAN_LOG_MAX_QUEUE,
+)
+
+# Training rows take the same write-behind path, off the detection pool
+training_log = ScanLogWriter(
+    insert_fn=lambda rows: supabase.table("training_data").insert(rows).execute(),
+    spill_path=Path(TRAINING_SPILL_PATH),
+    timestamp_field="added_at",
+)
+
+frame_store = FrameStore(
+    root=Path(FRAME_STORE_DIR),
+    max_bytes=FRAME_STORE_MAX_MB * 1024 * 1024,
+    max_age_s=FRAME_MAX_AGE_DAYS * 24 * 3600,
+)
+
+def frame_url(key: Optional[str]) -> Optional[str]:
+    return f"frames/{key}" if key else None
+
+result_cache = ResultCache(max_distance=RESULT_CACHE_MAX_DISTANCE, ttl_s=RESULT_CACHE_TTL_S)
+
+detect_pool = WorkerPool(
+    max_workers=DETECT_WORKERS,
+    max_pending=DETECT_MAX_PENDING,
+    retry_after=DETECT_RETRY_AFTER_S,
+    name="detect",
+)
+
+calibration = load_calibration(CAMERA_CALIBRATION_PATH) if os.path.exists(CAMERA_CALIBRATION_PATH) else None
+verifier = verify_basket.BasketVerifier(calibration=calibration)
+depth_estimator = DepthEstimator(working_size=DEPTH_WORKING_SIZE)
+
+model_registry = ModelRegistry()
+
+detector = YoloDetector(conf_threshold=DETECTOR_CONF_THRESHOLD, iou_threshold=DETECTOR_IOU_THRESHOLD)
+
+# Memory-map the product catalog (shared read-only between workers)
+catalog = open_catalog(PRODUCT_CATALOG_PATH, CATALOG_STORE_PATH)
+product_pages = ProductPages(catalog)
+
+# Queue and cache counters are exported as gauges at /metrics
+REGISTRY.register_collector("detect_pool", detect_pool.stats)
+REGISTRY.register_collector("result_cache", result_cache.stats)
+REGISTRY.register_collector("scan_log", scan_log.stats)
+REGISTRY.register_collector("training_log", training_log.stats)
+REGISTRY.register_collector("frame_store", frame_store.stats)
+REGISTRY.register_collector("cnn", cnn_infer.stats)
+REGISTRY.register_collector("depth", depth_estimator.stats)
+
+def route_template(request: Request) -> str:
+    """Path template of the matched route, so ids in the URL do not become labels."""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", request.url.path)
+    return "unmatched"
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    REGISTRY.histogram("http_request_seconds", "HTTP request latency").observe(
+        time.perf_counter() - start,
+        method=request.method,
+        path=route_template(request),
+        status=response.status_code,
+    )
+    timings = getattr(request.state, "timings_ms", None)
+    if SERVER_TIMING and timings:
+        response.headers["Server-Timing"] = server_timing(timings)
+    return response
+
+# Set once every model has been loaded and warmed up (or found missing)
+models_warm = threading.Event()
+registry_stop = threading.Event()
+
+def registry_entry(version: str):
+    """Registered version by name, or None (logged) if it is unknown, malformed or unreadable."""
+    try:
+        entry = model_registry.get(version)
+    except (OSError, ValueError) as e:
+        print(f"Cannot read model version {version!r} from the registry: {e}")
+        return None
+    if entry is None:
+        print(f"Model version {version!r} is not registered")
+    return entry
+
+def warm_up_models():
+    """Load and warm up the models off the event loop; /ready flips when this returns."""
+    try:
+        entry = None
+        try:
+            current = model_registry.current()
+        except OSError as e:
+            print(f"Error reading model registry: {e}")
+            current = None
+        if current:
+            entry = registry_entry(current)
+            if entry is None:
+                print("Falling back to the configured CNN model.")
+        if not cnn_infer.initialize(backend=entry.backend if entry else None,
+                                    precision=entry.precision if entry else None,
+                                    bundle_dir=entry.path if entry else None,
+                                    version=entry.version if entry else None):
+            print("CNN model unavailable; /detect-vision will report unknown items.")
+        if not detector.load():
+            print("Detector unavailable; /detect-basket is disabled.")
+        else:
+            detector.warm_up()
+            if calibration is not None:
+                if depth_estimator.load():
+                    depth_estimator.warm_up()
+                else:
+                    print("Depth model unavailable; volume checks use detections' own volumes only.")
+            # Imports the assignment solver now instead of on the first basket frame
+            assign(np.zeros((1, 1)))
+    except Exception as e:
+        print(f"Model warm-up failed: {e}")
+    finally:
+        models_warm.set()
+
+def activate_model_version(version: str) -> bool:
+    """Hot-swap the classifier to a registered version; cached results of the old model are dropped."""
+    entry = registry_entry(version)
+    if entry is None:
+        return False
+    if not cnn_infer.swap_model(entry.path, entry.version, entry.backend, entry.precision):
+        return False
+    result_cache.clear()
+    return True
+
+def watch_model_registry():
+    """Follow the registry's CURRENT pointer so every worker process picks up a new version."""
+    models_warm.wait()
+    failed = None
+    while not registry_stop.wait(MODEL_REGISTRY_POLL_S):
+        try:
+            current = model_registry.current()
+        except (OSError, ValueError) as e:
+            print(f"Error reading model registry: {e}")
+            continue
+        if current and current not in (cnn_infer.version(), failed):
+            # Do not retry a broken version every poll; a new CURRENT clears this
+            failed = None if activate_model_version(current) else current
+
+@app.on_event("startup")
+async def load_model():
+    scan_log.start()
+    training_log.start()
+    frame_store.start()
+    threading.Thread(target=warm_up_models, name="model-warmup", daemon=True).start()
+    if MODEL_REGISTRY_POLL_S > 0:
+        threading.Thread(target=watch_model_registry, name="model-registry", daemon=True).start()
+
+@app.on_event("shutdown")
+async def stop_model():
+    registry_stop.set()
+    detect_pool.shutdown(wait=False)
+    cnn_infer.stop_batcher()
+    scan_log.stop()
+    training_log.stop()
+    frame_store.stop()
+
+# Find product by name: exact normalized-name hit, then indexed fuzzy match
+def find_product_by_name(product_name: str):
+    return catalog.find_by_name(product_name)
+
+def log_scan(scan_data: dict):
+    # Never blocks on Supabase; see api/scan_log.py
+    scan_log.log(scan_data)
+
 class DetectResponse(BaseModel):
     status: str
-    message: str | None = None
+    product_name: Optional[str] = None
+    price: Optional[float] = None
+    confidence: Optional[float] = None
+    message: Optional[str] = None
+    timings_ms: Optional[Dict[str, float]] = None
+    cached: bool = False
+
+def run_detection(data: bytes, user_id: str, session: Optional[str] = None) -> DetectResponse:
+    """
+    Decode, classify, match and log one frame.
+
+    Runs on the detection worker pool; every stage here is blocking. With an
+    explicit session id, frames that perceptually match a recent frame from
+    the same session reuse its prediction instead of running the model.
+    """
+    timer = StageTimer()
+
+    image = decode_image_bytes(data)
+    timer.mark("decode")
+    if image is None:
+        return DetectResponse(status="failed", message="Invalid image data", timings_ms=timer.timings)
+    # Original bytes, written in the background; stored here rather than in the
+    # handler so requests rejected at pool admission write no frame
+    image_url = frame_url(frame_store.put(data))
+
+    # Never keyed on the user id: lanes share ids (the frontend sends
+    # demo-user), and one lane's prediction must not answer another's frame
+    use_cache = result_cache.enabled and bool(session)
+    cached, prediction, signature = False, None, None
+    if use_cache:
+        signature = frame_signature(image)
+        cached, prediction = result_cache.get(session, signature)
+        timer.mark("cache")
+    if not cached:
+        prediction = cnn_infer.predict(image)
+        timer.mark("inference")
+        if use_cache and prediction is not None:
+            result_cache.put(session, signature, prediction)
+
+    # If no prediction, store unknown scan entry
+    if prediction is None:
+        log_scan({
+            "user_id": user_id,
+            "image_url": image_url,
+            "status": "unknown_item"
+        })
+        timer.mark("log")
+        return DetectResponse(status="unknown_item", message="No product detected", timings_ms=timer.timings)
+
+    product_name, confidence = prediction
+    product = find_product_by_name(product_name)
+    timer.mark("match")
+
+    # If product found and confidence >= threshold -> success
+    if product and confidence >= CONFIDENCE_THRESHOLD:
+        log_scan({
+            "user_id": user_id,
+            "product_name": product.get("name"),
+            "confidence": confidence,
+            "image_url": image_url,
+            "status": "success"
+        })
+        timer.mark("log")
+        return DetectResponse(
+            status="success",
+            product_name=product.get("name"),
+            price=float(product.get("price", 0)),
+            confidence=confidence,
+            timings_ms=timer.timings,
+            cached=cached
+        )
+
+    # Else unknown item (low confidence or not in catalog)
+    log_scan({
+        "user_id": user_id,
+        "product_name": product_name,
+        "confidence": confidence,
+        "image_url": image_url,
+        "status": "unknown_item"
+    })
+    timer.mark("log")
+    return DetectResponse(
+        status="unknown_item",
+        product_name=product_name,
+        confidence=confidence,
+        message="Low confidence detection",
+        timings_ms=timer.timings,
+        cached=cached
+    )
+
+@app.post("/detect-vision", response_model=DetectResponse)
+async def detect_vision(request: Request):
+    """
+    Detect item using the CNN classifier.
+
+    Accepts the frame as a multipart upload (``image``/``file`` field), as raw
+    JPEG bytes (``application/octet-stream`` or ``image/jpeg``, with ``user_id``
+    as a query parameter or ``X-User-Id`` header), or as the legacy JSON body
+    ``{"image": "<data URL>", "user_id": ...}``. The result cache is only
+    used for requests carrying a ``session_id``, and only within it.
+
+    Decoding and inference run on the detection worker pool. When the pool
+    is saturated the request is rejected with 429 and a Retry-After header.
+
+    Returns:
+        DetectResponse with product details, confidence, status and
+        per-stage timings
+    """
+    try:
+        try:
+            frame = await read_frame(request)
+        except FrameError as e:
+            return DetectResponse(status="failed", message=str(e))
+        user_id = frame.user_id or "demo-user"
+
+        try:
+            result, queue_ms = await detect_pool.run(
+                run_detection, frame.data, user_id, frame.fields.get("session_id")
+            )
+        except PoolSaturated as e:
+            busy = DetectResponse(status="busy", message=str(e))
+            return JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content=busy.dict(),
+                headers={"Retry-After": str(max(1, round(e.retry_after)))},
+            )
+        result.timings_ms = {"queue": round(queue_ms, 3), **(result.timings_ms or {})}
+        observe_stages(result.timings_ms, "detect-vision")
+        request.state.timings_ms = result.timings_ms
+        return result
+
+    except Exception as e:
+        return DetectResponse(status="failed", message=f"Error processing request: {str(e)}")
+
+def run_basket_detection(data: bytes, user_id: str,
+                         session: Optional[verify_basket.VerificationSession] = None) -> dict:
+    """
+    Detect every item in one frame, match each to the catalog and log it.
 
-@app.post("/detect-vision", response_model=DetectResponse, status_code=status.HTTP_501_NOT_IMPLEMENTED)
-async def detect_vision_placeholder():
-    return DetectResponse(status="disabled", message="/detect-vision is temporarily disabled during ML reset.")
+    Runs on the detection worker pool. With BASKET_CLASSIFY_CROPS, every box
+    is also classified by the CNN (all crops in one batch) and the
+    classifier's label is used for matching. Detections of the same product
+    are merged into one line item with a quantity. With a verification
+    session, the frame's detections also update its running verdict.
+    """
+    timer = StageTimer()
 
-@app.post("/train-new-item", status_code=status.HTTP_501_NOT_IMPLEMENTED)
-async def train_new_item_placeholder():
-    return {"status": "disabled", "message": "Training endpoint disabled during ML reset."}
+    image = decode_image_bytes(data)
+    timer.mark("decode")
+    if image is None:
+        return {"status": "failed", "message": "Invalid image data", "timings_ms": timer.timings}
+    image_url = frame_url(frame_store.put(data))
+
+    detections = detector.detect(image)
+    timer.mark("inference")
+    if BASKET_CLASSIFY_CROPS and detections:
+        classify_detections(image, detections)
+        timer.mark("classify")
+
+    items: Dict[str, dict] = {}
+    unknown = []
+    scans = []
+    # Catalog match per detection; the verification session reconciles on product_id
+    matches: List[Optional[dict]] = []
+    for det in detections:
+        product = find_product_by_name(det.name)
+        matched = product is not None and det.confidence >= CONFIDENCE_THRESHOLD
+        matches.append(product if matched else None)
+        scans.append({
+            "user_id": user_id,
+            "product_name": product.get("name") if matched else det.name,
+            "confidence": det.confidence,
+            "image_url": image_url,
+            "status": "success" if matched else "unknown_item"
+        })
+        if not matched:
+            unknown.append(det.to_dict())
+            continue
+        key = product.get("product_id") or product.get("name")
+        if key in items:
+            items[key]["quantity"] += 1
+            items[key]["confidence"] = max(items[key]["confidence"], det.confidence)
+        else:
+            items[key] = {**detected_item(product, det.confidence), "boxes": []}
+        items[key]["boxes"].append(det.to_dict()["box"])
+    timer.mark("match")
+
+    for row in scans:
+        log_scan(row)
+    timer.mark("log")
+
+    result = {
+        "status": "success" if items else "unknown_item",
+        "items": list(items.values()),
+        "unknown": unknown,
+        "message": f"Detected {sum(i['quantity'] for i in items.values())} item(s)",
+    }
+    if session is not None:
+        boxes = np.array([det.box for det in detections], dtype=np.float64).reshape(-1, 4)
+        depths = np.zeros(len(boxes))
+        if depth_estimator.loaded and calibration is not None and len(boxes):
+            depths = depth_estimator.depth_for_boxes(image, boxes, stream=session.session_id)
+            timer.mark("depth")
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        # The session numbers the frame under its lock; concurrent frames get distinct ids
+        session.update(None, [
+            verify_basket.Detection(
+                None,
+                product.get("name") if product else det.name,
+                det.confidence,
+                det.box,
+                pixel_area=float(area),
+                depth_estimate=float(depth),
+                product_id=str(product["product_id"]) if product and product.get("product_id") else None,
+            )
+            for det, product, area, depth in zip(detections, matches, areas, depths)
+        ])
+        result["verification"] = session.result().to_dict()
+        timer.mark("verify")
+    result["timings_ms"] = timer.timings
+    return result
+
+@app.post("/detect-basket")
+async def detect_basket(request: Request):
+    """
+    Detect all items in a basket frame with the YOLO detector.
+
+    Accepts the same frame encodings as /detect-vision. A ``session_id``
+    field naming a verification session (see /verify-sessions) feeds the
+    detections into that session.
+
+    Returns:
+        JSON with one line item (product details and quantity) per matched
+        product, unmatched detections and per-stage timings
+    """
+    if not detector.loaded:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "failed", "message": "Detector model not loaded"},
+        )
+    try:
+        try:
+            frame = await read_frame(request)
+        except FrameError as e:
+            return {"status": "failed", "message": str(e)}
+        user_id = frame.user_id or "demo-user"
+        session = None
+        if frame.fields.get("session_id"):
+            session = verifier.get(frame.fields["session_id"])
+            if session is None:
+                return {"status": "failed", "message": "Unknown verification session"}
+
+        try:
+            result, queue_ms = await detect_pool.run(
+                run_basket_detection, frame.data, user_id, session
+            )
+        except PoolSaturated as e:
+            return JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={"status": "busy", "message": str(e)},
+                headers={"Retry-After": str(max(1, round(e.retry_after)))},
+            )
+        result["timings_ms"] = {"queue": round(queue_ms, 3), **result["timings_ms"]}
+        observe_stages(result["timings_ms"], "detect-basket")
+        request.state.timings_ms = result["timings_ms"]
+        return result
+
+    except Exception as e:
+        return {"status": "failed", "message": f"Error processing request: {str(e)}"}
+
+class VerifySessionRequest(BaseModel):
+    session_id: str
+    items: List[Dict[str, Any]]
+
+@app.post("/verify-sessions")
+async def start_verification(request: VerifySessionRequest):
+    """
+    Start reconciling a scanned basket against camera detections.
+
+    Items use the sample_scanned_basket.json format (product_id, name,
+    price, optional quantity and dimensions). Frames sent to /detect-basket
+    with this ``session_id`` update the session incrementally.
+    """
+    try:
+        items = verify_basket.scanned_items_from_json(request.items)
+    except (KeyError, TypeError, ValueError) as e:
+        return {"status": "failed", "message": f"Invalid scanned items: {str(e)}"}
+    session = verifier.start(request.session_id, items)
+    return session.result().to_dict()
+
+@app.get("/verify-sessions/{session_id}")
+async def verification_status(session_id: str):
+    """Running verdict; shortfalls are 'pending' until the session is finished."""
+    session = verifier.get(session_id)
+    if session is None:
+        return JSONResponse(status_code=status.HTTP_404_NOT_FOUND,
+                            content={"status": "failed", "message": "Unknown verification session"})
+    return session.result().to_dict()
+
+@app.post("/verify-sessions/{session_id}/finish")
+async def finish_verification(session_id: str):
+    """Final verdict (missing items are flagged); the session is closed."""
+    result = verifier.finish(session_id)
+    depth_estimator.reset(session_id)
+    if result is None:
+        return JSONResponse(status_code=status.HTTP_404_NOT_FOUND,
+                            content={"status": "failed", "message": "Unknown verification session"})
+    return result.to_dict()
+
+@app.get("/models")
+async def list_models():
+    """Registered classifier versions, the registry's CURRENT pointer and what this worker serves."""
+    return {
+        "current": model_registry.current(),
+        "serving": cnn_infer.version(),
+        "versions": [entry.to_dict() for entry in model_registry.versions()],
+    }
+
+@app.post("/models/{version}/activate")
+async def activate_model(version: str):
+    """
+    Make `version` the serving classifier without a restart.
+
+    The new model is loaded and warmed beside the old one and swapped in;
+    CURRENT is updated so the other worker processes follow on their next
+    registry poll. The version's metrics are recorded in model_metrics.
+    """
+    try:
+        entry = model_registry.get(version)
+    except ValueError as e:
+        return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST,
+                            content={"status": "failed", "message": str(e)})
+    if entry is None:
+        return JSONResponse(status_code=status.HTTP_404_NOT_FOUND,
+                            content={"status": "failed", "message": f"Unknown model version {version}"})
+    if not await asyncio.to_thread(activate_model_version, version):
+        return JSONResponse(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                            content={"status": "failed", "message": f"Model version {version} failed to load"})
+    model_registry.set_current(version)
+    if entry.metrics:
+        try:
+            await asyncio.to_thread(lambda: supabase.table("model_metrics").insert(entry.metrics_row()).execute())
+        except Exception as e:
+            print(f"Error logging model metrics to Supabase: {e}")
+    return {"status": "success", "serving": cnn_infer.version(), "warmup_ms": cnn_infer.stats()["warmup_ms"]}
+
+@app.websocket("/ws/scan")
+async def scan_stream(websocket: WebSocket):
+    """
+    Stream frames over one connection and receive detections as they finish.
+
+    Query parameters: ``user_id`` and optional ``session_id``. The client
+    sends binary messages holding encoded JPEG/PNG frames (a text message
+    ``{"image": "<data URL>"}`` is accepted too). Only the newest frame is
+    processed; frames that arrive while detection is running replace each
+    other and are counted as dropped. Each result is pushed as JSON:
+    ``{"type": "detection", "seq": ..., "dropped": ..., <DetectResponse>}``.
+    """
+    await websocket.accept()
+    user_id = websocket.query_params.get("user_id") or "demo-user"
+    session = websocket.query_params.get("session_id")
+    slot = LatestFrameSlot()
+
+    async def detect_loop():
+        while True:
+            item = await slot.get()
+            if item is None:
+                return
+            seq, data = item
+            try:
+                result, queue_ms = await detect_pool.run(run_detection, data, user_id, session)
+                result.timings_ms = {"queue": round(queue_ms, 3), **(result.timings_ms or {})}
+                observe_stages(result.timings_ms, "ws-scan")
+                event = {"type": "detection", "seq": seq, "dropped": slot.dropped, **result.dict()}
+            except PoolSaturated as e:
+                event = {"type": "busy", "seq": seq, "retry_after": e.retry_after, "message": str(e)}
+            except Exception as e:
+                event = {"type": "error", "seq": seq, "message": f"Error processing frame: {str(e)}"}
+            try:
+                await websocket.send_json(event)
+            except (WebSocketDisconnect, RuntimeError):
+                return
+
+    worker = asyncio.ensure_future(detect_loop())
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes"):
+                slot.put(message["bytes"])
+            elif message.get("text"):
+                try:
+                    image = json.loads(message["text"]).get("image")
+                    if image:
+                        slot.put(data_url_to_bytes(image))
+                except (ValueError, AttributeError, FrameError) as e:
+                    await websocket.send_json({"type": "error", "message": f"Invalid frame message: {e}"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        slot.close()
+        worker.cancel()
+
+@app.post("/train-new-item")
+async def train_new_item(request: Request):
+    """
+    Add new item to training data for model retraining
+
+    Accepts the same frame encodings as /detect-vision plus a ``label``
+    field (form field, JSON key or query parameter).
+
+    Returns:
+        JSON with success status
+    """
+    try:
+        try:
+            frame = await read_frame(request)
+        except FrameError as e:
+            return {"status": "failed", "message": str(e)}
+        user_id = frame.user_id or "demo-user"
+        label = frame.fields.get("label")
+        if not label:
+            return {"status": "failed", "message": "Image and label are required"}
+
+        if not is_decodable_image(frame.data):
+            return {"status": "failed", "message": "Invalid image data"}
+
+        # Training frames are pinned: never evicted from the frame store
+        key = frame_store.put(frame.data, pin=True)
+        if key is None:
+            return {"status": "failed", "message": "Frame store is busy; try again"}
+
+        training_data = {
+            "user_id": user_id,
+            "image_url": frame_url(key),
+            "label": label,
+            "added_at": "now()"
+        }
+        # Never blocks on Supabase or takes a detection slot; see api/scan_log.py
+        training_log.log(training_data)
+
+        return {
+            "status": "success",
+            "message": "Item added to training data successfully",
+            "image_url": frame_url(key)
+        }
+
+    except Exception as e:
+        return {"status": "failed", "message": f"Error processing request: {str(e)}"}
 
 @app.get("/get-products")
-async def get_products():
-    return {"status": "success", "products": []}
+async def get_products(
+    request: Request,
+    category: Optional[str] = None,
+    name_prefix: Optional[str] = None,
+    offset: int = 0,
+    limit: int = DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+):
+    """
+    Fetch a page of the BigBasket product catalog
+
+    Args:
+        category: Exact category filter
+        name_prefix: Case-insensitive product name prefix filter
+        offset: Index of the first product to return
+        limit: Page size (max 1000)
+        cursor: `next_cursor` from a previous page (overrides offset)
+
+    Returns:
+        JSON page with products, total, and next_cursor. Responses carry an
+        ETag (304 on a matching If-None-Match) and are gzip/brotli encoded
+        when the client accepts it.
+    """
+    try:
+        if cursor:
+            offset = decode_cursor(cursor, product_pages.version)
+        page = product_pages.get(category=category, name_prefix=name_prefix, offset=offset, limit=limit)
+    except CursorError as e:
+        return JSONResponse(status_code=status.HTTP_409_CONFLICT, content={"status": "failed", "message": str(e)})
+    except Exception as e:
+        return {"status": "failed", "message": f"Error fetching products: {str(e)}"}
+
+    headers = {
+        "ETag": page.etag,
+        "Cache-Control": f"public, max-age={PRODUCTS_MAX_AGE_S}",
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match"), page.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    body, encoding = page.for_encoding(request.headers.get("accept-encoding", ""))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @app.post("/update-feedback", status_code=status.HTTP_501_NOT_IMPLEMENTED)
 async def update_feedback_placeholder():
@@ -46,14 +780,126 @@ async def update_feedback_placeholder():
 async def train_model_placeholder():
     return {"status": "disabled", "message": "Model training disabled during ML reset."}
 
-@app.post("/detect-item", status_code=status.HTTP_501_NOT_IMPLEMENTED)
-async def detect_item_placeholder():
-    return {"status": "disabled", "message": "Item detection disabled during ML reset."}
+def detected_item(product, confidence: float) -> dict:
+    return {
+        "product_name": product.get("name"),
+        "price": product.get("price"),
+        "quantity": 1,
+        "confidence": confidence,
+        "size": product.get("size", ""),
+        "product_id": product.get("product_id")
+    }
+
+def classify_upload(data: bytes):
+    """Decode an uploaded image and match the classifier's label to the catalog."""
+    image = decode_image_bytes(data)
+    if image is None:
+        return None, None
+    prediction = cnn_infer.predict(image)
+    if prediction is None:
+        return None, None
+    label, confidence = prediction
+    return find_product_by_name(label), confidence
+
+@app.post("/detect-item")
+async def detect_item(barcode: str = Form(None), file: UploadFile = File(None)):
+    """
+    Detect item from either barcode or image
+
+    Args:
+        barcode: Product barcode string (O(1) catalog index lookup)
+        file: Image file for visual recognition
+
+    Returns:
+        JSON with product details and success message
+    """
+    try:
+        if barcode:
+            product = catalog.by_barcode(barcode)
+            confidence = 1.0
+        elif file is not None:
+            try:
+                (product, confidence), _ = await detect_pool.run(classify_upload, await file.read())
+            except PoolSaturated as e:
+                return JSONResponse(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    content={"message": str(e), "product": None},
+                    headers={"Retry-After": str(max(1, round(e.retry_after)))},
+                )
+            if product is not None and confidence < CONFIDENCE_THRESHOLD:
+                product = None
+        else:
+            return {"message": "Barcode or image file is required", "product": None}
+
+        if product is None:
+            return {"message": "Item not found", "product": None}
+
+        return {
+            "message": "Item detected successfully",
+            "product": detected_item(product, confidence)
+        }
+
+    except Exception as e:
+        return {"message": f"Error processing request: {str(e)}", "product": None}
+
+class BarcodeLookupRequest(BaseModel):
+    barcodes: List[str]
+
+@app.post("/lookup-barcodes")
+async def lookup_barcodes(req: BarcodeLookupRequest):
+    """
+    Bulk barcode lookup.
+
+    Returns:
+        JSON with one entry per requested barcode (product or null), in order
+    """
+    products = catalog.bulk_by_barcode(req.barcodes)
+    return {
+        "status": "success",
+        "products": [thaw_product(p) if p is not None else None for p in products],
+        "missing": [code for code, p in zip(req.barcodes, products) if p is None]
+    }
 
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/ready")
+async def readiness():
+    """Readiness probe: 503 until the classifier is loaded and warm (/health only reports liveness)."""
+    ready = models_warm.is_set() and cnn_infer.ready()
+    body = {
+        "status": "ready" if ready else ("unavailable" if cnn_infer.state() == "unavailable" else "warming"),
+        "models": {
+            "cnn": cnn_infer.state(),
+            "cnn_version": cnn_infer.version(),
+            "detector": detector.loaded,
+            "depth": depth_estimator.loaded,
+        },
+        "warmup_ms": cnn_infer.stats()["warmup_ms"],
+    }
+    if not ready:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=body)
+    return body
+
+@app.get("/stats")
+async def service_stats():
+    """Counters from the detection pipeline's queues and caches."""
+    return {
+        "detect_pool": detect_pool.stats(),
+        "result_cache": result_cache.stats(),
+        "scan_log": scan_log.stats(),
+        "training_log": training_log.stats(),
+        "frame_store": frame_store.stats(),
+        "cnn": cnn_infer.stats(),
+        "depth": depth_estimator.stats(),
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Latency histograms and component counters in Prometheus text format."""
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(app, host="0.0.0.0", port=8000)
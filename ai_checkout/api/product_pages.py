@@ -0,0 +1,175 @@
+"""
+Paginated, cached responses for /get-products.
+
+Each distinct (filters, offset, limit) page is serialized once per catalog
+version and kept as ready-to-send bytes together with its ETag and
+precompressed gzip (and brotli, when the ``brotli`` package is installed)
+bodies. Repeat requests only pick the right encoding, or answer 304 when the
+client's If-None-Match still matches.
+"""
+
+import base64
+import binascii
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+from api.catalog import normalize_name, thaw_product
+from api.catalog_store import CATEGORY_FIELD, CatalogStore
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = 1024
+
+
+class CursorError(ValueError):
+    """Raised for malformed cursors or cursors from another catalog version."""
+
+
+def encode_cursor(version: str, offset: int) -> str:
+    raw = json.dumps({"v": version, "o": offset}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, version: str) -> int:
+    """Return the offset encoded in `cursor`, checking it targets `version`."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        offset = int(payload["o"])
+    except (binascii.Error, ValueError, KeyError, TypeError, UnicodeError):
+        raise CursorError("Invalid cursor")
+    if payload.get("v") != version:
+        raise CursorError("Catalog has changed; restart pagination")
+    if offset < 0:
+        raise CursorError("Invalid cursor")
+    return offset
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Evaluate an If-None-Match header (weak comparison) against `etag`."""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return "*" in tags or any((t[2:] if t.startswith("W/") else t) == bare for t in tags)
+
+
+@dataclass
+class Page:
+    """A serialized page with its ETag and compressed variants."""
+    body: bytes
+    etag: str
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+
+    def for_encoding(self, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+        """Pick the best body for an Accept-Encoding header: (body, content-encoding)."""
+        if len(self.body) < COMPRESS_MIN_BYTES:
+            return self.body, None
+        accepted = {part.split(";")[0].strip().lower() for part in (accept_encoding or "").split(",")}
+        if brotli is not None and "br" in accepted:
+            if "br" not in self.encoded:
+                self.encoded["br"] = brotli.compress(self.body, quality=5)
+            return self.encoded["br"], "br"
+        if "gzip" in accepted:
+            if "gzip" not in self.encoded:
+                self.encoded["gzip"] = gzip.compress(self.body, compresslevel=6)
+            return self.encoded["gzip"], "gzip"
+        return self.body, None
+
+
+class ProductPages:
+    """Builds and caches /get-products pages for one catalog version."""
+
+    def __init__(self, catalog: CatalogStore, max_pages: int = 256, max_selections: int = 64):
+        self.catalog = catalog
+        self.max_pages = max_pages
+        self.max_selections = max_selections
+        self._pages: "OrderedDict[tuple, Page]" = OrderedDict()
+        self._selections: "OrderedDict[tuple, Optional[np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> str:
+        return self.catalog.version
+
+    def _lru_get(self, cache: OrderedDict, key):
+        with self._lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return True, cache[key]
+        return False, None
+
+    def _lru_put(self, cache: OrderedDict, key, value, limit: int) -> None:
+        with self._lock:
+            cache[key] = value
+            if len(cache) > limit:
+                cache.popitem(last=False)
+
+    def _select(self, category: Optional[str], prefix: str) -> Optional[np.ndarray]:
+        """Rows matching the filters, or None for the whole catalog."""
+        key = (category, prefix)
+        hit, rows = self._lru_get(self._selections, key)
+        if hit:
+            return rows
+        rows = None
+        if category is not None:
+            rows = self.catalog.rows_matching(CATEGORY_FIELD, category)
+        if prefix:
+            prefixed = self.catalog.rows_with_name_prefix(prefix)
+            rows = prefixed if rows is None else np.intersect1d(rows, prefixed, assume_unique=True)
+        self._lru_put(self._selections, key, rows, self.max_selections)
+        return rows
+
+    def get(self, category: Optional[str] = None, name_prefix: Optional[str] = None,
+            offset: int = 0, limit: int = DEFAULT_LIMIT) -> Page:
+        """
+        Return the serialized page for the given filters.
+
+        Args:
+            category: Exact category to filter on
+            name_prefix: Case-insensitive product name prefix
+            offset: Index of the first matching product
+            limit: Page size (clamped to 1..MAX_LIMIT)
+        """
+        offset = max(0, int(offset))
+        limit = min(max(1, int(limit)), MAX_LIMIT)
+        prefix = normalize_name(name_prefix)
+        key = (category, prefix, offset, limit)
+        hit, page = self._lru_get(self._pages, key)
+        if hit:
+            return page
+
+        rows = self._select(category, prefix)
+        total = len(self.catalog) if rows is None else len(rows)
+        if rows is None:
+            page_rows = range(offset, min(offset + limit, total))
+        else:
+            page_rows = [int(r) for r in rows[offset:offset + limit]]
+        end = offset + len(page_rows)
+
+        payload = {
+            "status": "success",
+            "products": [thaw_product(self.catalog.record(r)) for r in page_rows],
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "next_cursor": encode_cursor(self.version, end) if end < total else None,
+            "catalog_version": self.version,
+        }
+        body = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+        etag = f'"{self.version}-{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        page = Page(body=body, etag=etag)
+        self._lru_put(self._pages, key, page, self.max_pages)
+        return page
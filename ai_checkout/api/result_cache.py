@@ -0,0 +1,145 @@
+"""
+Perceptual cache for classification results.
+
+Auto-capture sends a frame every few seconds, and while an item sits on the
+counter consecutive frames are near-identical. Each frame gets a signature:
+a 32x32 grayscale thumbnail, averaged from a strided view of the frame so
+it costs well under a millisecond. If a recent frame from the same session
+differs from it by at most ``max_distance`` grey levels in every cell, its
+prediction is reused instead of running the model again.
+
+A single-bit hash (dHash) is not used: on the flat backgrounds of a counter
+its bits are decided by sensor noise, so frames of different products
+collide while noisy copies of one frame do not. The largest per-cell
+difference instead reacts to any local change, such as a different label.
+
+Sessions are kept in an LRU; each session remembers its last few distinct
+frames, and entries expire after ``ttl_s`` seconds.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Tuple
+import cv2
+import numpy as np
+
+SIGNATURE_SIZE = 32
+
+
+def frame_signature(image: np.ndarray, size: int = SIGNATURE_SIZE) -> np.ndarray:
+    """
+    Grayscale thumbnail of a BGR (or grayscale) image.
+
+    Args:
+        image: Decoded frame
+        size: Thumbnail is size x size
+
+    Returns:
+        (size, size) uint8 array
+    """
+    # Stride down to ~4 source pixels per cell first; the full-frame
+    # conversion would cost more than the rest of the cache lookup
+    step = max(1, min(image.shape[:2]) // (4 * size))
+    view = image[::step, ::step]
+    gray = cv2.cvtColor(view, cv2.COLOR_BGR2GRAY) if view.ndim == 3 else view
+    # INTER_AREA averages whole blocks, which keeps the signature stable under sensor noise
+    return cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA)
+
+
+def signature_distance(a: np.ndarray, b: np.ndarray) -> int:
+    """Largest absolute per-cell difference between two signatures."""
+    return int(cv2.absdiff(a, b).max())
+
+
+class ResultCache:
+    """Per-session LRU of recent frame hashes and their predictions."""
+
+    def __init__(
+        self,
+        max_distance: int = 10,
+        ttl_s: float = 10.0,
+        max_sessions: int = 1024,
+        per_session: int = 4,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_distance: Largest per-cell grey-level difference counted as the same frame
+            ttl_s: Seconds a cached prediction stays valid
+            max_sessions: Sessions tracked before the least recently used is dropped
+            per_session: Distinct frames remembered per session
+        """
+        self.max_distance = max_distance
+        self.ttl_s = ttl_s
+        self.max_sessions = max_sessions
+        self.per_session = per_session
+        self._sessions: "OrderedDict[str, Deque[Tuple[np.ndarray, float, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_s > 0
+
+    def get(self, session: str, signature: np.ndarray) -> Tuple[bool, Any]:
+        """
+        Look up a prediction for a frame.
+
+        Args:
+            session: Session id
+            signature: frame_signature() of the frame
+
+        Returns:
+            (hit, cached prediction)
+        """
+        if not self.enabled:
+            return False, None
+        now = time.monotonic()
+        with self._lock:
+            entries = self._sessions.get(session)
+            if entries:
+                self._sessions.move_to_end(session)
+                while entries and now - entries[0][1] > self.ttl_s:
+                    entries.popleft()
+                    self.expired += 1
+                for cached, _, value in reversed(entries):
+                    if signature_distance(cached, signature) <= self.max_distance:
+                        self.hits += 1
+                        return True, value
+            self.misses += 1
+        return False, None
+
+    def put(self, session: str, signature: np.ndarray, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            entries = self._sessions.get(session)
+            if entries is None:
+                entries = self._sessions[session] = deque(maxlen=self.per_session)
+                if len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session)
+            entries.append((signature, time.monotonic(), value))
+
+    def clear(self) -> None:
+        """Drop every cached prediction (e.g. after the model changes)."""
+        with self._lock:
+            self._sessions.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        with self._lock:
+            sessions = len(self._sessions)
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "sessions": sessions,
+        }
@@ -0,0 +1,232 @@
+"""
+Write-behind logger for Supabase tables written from requests (``scans``,
+``training_data``).
+
+Request handlers hand scan rows to ``ScanLogWriter.log()``, which only
+appends to a bounded in-memory queue. A background thread drains the queue
+into multi-row inserts (flushed by size or age), retries failed inserts with
+exponential backoff, and spills rows it cannot deliver to a local
+append-only JSON-lines file. The spill file is replayed once the remote
+accepts inserts again.
+"""
+
+import json
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, List, Optional
+
+
+class ScanLogWriter:
+    """Batches scan rows into background multi-row inserts."""
+
+    def __init__(
+        self,
+        insert_fn: Callable[[List[dict]], None],
+        spill_path: Path,
+        max_batch: int = 100,
+        flush_interval_s: float = 1.0,
+        max_queue: int = 10000,
+        max_retries: int = 3,
+        backoff_base_s: float = 0.5,
+        backoff_max_s: float = 30.0,
+        replay_interval_s: float = 30.0,
+        timestamp_field: str = "created_at",
+    ):
+        """
+        Initialize the writer.
+
+        Args:
+            insert_fn: Inserts a list of rows remotely; raises on failure
+            spill_path: Append-only JSON-lines file for undeliverable rows
+            max_batch: Rows per insert
+            flush_interval_s: Longest a queued row waits before a flush
+            max_queue: Rows held in memory; beyond this rows go straight to the spill file
+            max_retries: Insert attempts per batch before spilling it
+            backoff_base_s: First retry delay (doubles per attempt, with jitter)
+            backoff_max_s: Upper bound on a retry delay
+            replay_interval_s: Minimum time between spill-file replays
+            timestamp_field: Column stamped with the time log() was called
+        """
+        self.insert_fn = insert_fn
+        self.spill_path = Path(spill_path)
+        self.max_batch = max_batch
+        self.flush_interval_s = flush_interval_s
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.replay_interval_s = replay_interval_s
+        self.timestamp_field = timestamp_field
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._spill_lock = threading.Lock()
+        self._last_replay = 0.0
+        self._remote_healthy = True
+
+        self.enqueued = 0
+        self.inserted = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.failed_batches = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="scan-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the writer, flushing what it can and spilling the rest."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        leftover = self._drain(self._queue.qsize())
+        if leftover:
+            self._spill(leftover)
+
+    def log(self, row: dict) -> None:
+        """Queue a row without blocking; stamps timestamp_field at call time."""
+        row = dict(row)
+        if row.get(self.timestamp_field) in (None, "now()"):
+            row[self.timestamp_field] = datetime.now(timezone.utc).isoformat()
+        try:
+            self._queue.put_nowait(row)
+            self.enqueued += 1
+        except queue.Full:
+            self._spill([row])
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "inserted": self.inserted,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+            "failed_batches": self.failed_batches,
+            "flushes": self.flushes,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "avg_flush_ms": round(self._total_flush_ms / self.flushes, 3) if self.flushes else 0.0,
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "remote_healthy": self._remote_healthy,
+        }
+
+    def _drain(self, limit: int) -> List[dict]:
+        rows = []
+        while len(rows) < limit:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _collect(self) -> List[dict]:
+        """Wait for the first row, then gather until the batch is full or old enough."""
+        try:
+            first = self._queue.get(timeout=self.flush_interval_s)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval_s
+        while len(batch) < self.max_batch and not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+            if self._remote_healthy and time.monotonic() - self._last_replay >= self.replay_interval_s:
+                self._replay_spill()
+        # Final flush of whatever arrived before stop()
+        while True:
+            batch = self._drain(self.max_batch)
+            if not batch:
+                break
+            self._flush(batch, retries=1)
+
+    def _insert(self, rows: List[dict]) -> None:
+        # PostgREST bulk inserts need every object to carry the same keys
+        keys = sorted({k for row in rows for k in row})
+        self.insert_fn([{k: row.get(k) for k in keys} for row in rows])
+
+    def _flush(self, batch: List[dict], retries: Optional[int] = None) -> bool:
+        attempts = self.max_retries if retries is None else retries
+        if not self._remote_healthy:
+            # Remote was down on the last flush: one probe, no backoff
+            attempts = 1
+        start = time.perf_counter()
+        for attempt in range(attempts):
+            try:
+                self._insert(batch)
+            except Exception as e:
+                print(f"Error logging scans to Supabase (attempt {attempt + 1}/{attempts}): {e}")
+                if attempt + 1 < attempts and not self._stop.is_set():
+                    delay = min(self.backoff_max_s, self.backoff_base_s * (2 ** attempt))
+                    self._stop.wait(delay * random.uniform(0.5, 1.0))
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            self.flushes += 1
+            self.inserted += len(batch)
+            self.last_flush_ms = elapsed
+            self.max_flush_ms = max(self.max_flush_ms, elapsed)
+            self._total_flush_ms += elapsed
+            self._remote_healthy = True
+            return True
+
+        self.failed_batches += 1
+        self._remote_healthy = False
+        self._spill(batch)
+        return False
+
+    def _spill(self, rows: List[dict]) -> None:
+        with self._spill_lock:
+            self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row, default=str) + "\n")
+            self.spilled += len(rows)
+
+    def _replay_spill(self) -> None:
+        """Re-send spilled rows; whatever still fails is appended back."""
+        self._last_replay = time.monotonic()
+        replay_path = self.spill_path.with_suffix(self.spill_path.suffix + ".replay")
+        with self._spill_lock:
+            if not replay_path.exists():
+                if not self.spill_path.exists() or self.spill_path.stat().st_size == 0:
+                    return
+                os.replace(self.spill_path, replay_path)
+
+        with open(replay_path, "r", encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        for i in range(0, len(rows), self.max_batch):
+            chunk = rows[i:i + self.max_batch]
+            try:
+                self._insert(chunk)
+                self.replayed += len(chunk)
+            except Exception as e:
+                print(f"Replaying spilled scans failed: {e}")
+                self._remote_healthy = False
+                with self._spill_lock:
+                    with open(self.spill_path, "a", encoding="utf-8") as f:
+                        for row in rows[i:]:
+                            f.write(json.dumps(row, default=str) + "\n")
+                break
+        replay_path.unlink(missing_ok=True)
@@ -0,0 +1,53 @@
+"""
+Latest-frame mailbox for the /ws/scan streaming endpoint.
+
+A camera can send frames faster than detection runs. Rather than queue
+them (and answer with ever older results), each connection keeps a single
+slot: a new frame overwrites one that has not been picked up yet, and the
+detection loop always takes the newest frame available.
+"""
+
+import asyncio
+from typing import Optional, Tuple
+
+
+class LatestFrameSlot:
+    """Single-slot mailbox that keeps only the most recent frame."""
+
+    def __init__(self):
+        self._frame: Optional[bytes] = None
+        self._seq = 0
+        self._ready = asyncio.Event()
+        self._closed = False
+
+        self.received = 0
+        self.dropped = 0
+        self.taken = 0
+
+    def put(self, data: bytes) -> int:
+        """Store a frame, replacing any unprocessed one; returns its sequence number."""
+        if self._frame is not None:
+            self.dropped += 1
+        self._seq += 1
+        self._frame = data
+        self.received += 1
+        self._ready.set()
+        return self._seq
+
+    async def get(self) -> Optional[Tuple[int, bytes]]:
+        """Wait for the newest frame: (seq, data), or None once closed."""
+        while self._frame is None:
+            if self._closed:
+                return None
+            await self._ready.wait()
+            self._ready.clear()
+        frame, self._frame = self._frame, None
+        self.taken += 1
+        return self._seq, frame
+
+    def close(self) -> None:
+        self._closed = True
+        self._ready.set()
+
+    def stats(self) -> dict:
+        return {"received": self.received, "dropped": self.dropped, "processed": self.taken}
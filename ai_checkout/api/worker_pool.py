@@ -0,0 +1,112 @@
+"""
+Bounded worker pool for CPU-bound request work.
+
+Frame decoding, inference and other blocking calls run on a thread pool so
+they never stall the asyncio event loop. Threads (rather than processes) are
+used because OpenCV, NumPy and the inference runtimes release the GIL, and
+because frames from concurrent requests must meet in the same process for
+cnn_infer's micro-batcher to group them.
+
+The pool admits at most ``max_pending`` jobs (running + queued); beyond that
+``run()`` raises PoolSaturated immediately so the caller can shed load.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Tuple
+
+DEFAULT_WORKERS = max(4, (os.cpu_count() or 1) * 2)
+
+
+class PoolSaturated(Exception):
+    """Raised when the pool already has max_pending jobs admitted."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Worker pool is saturated; retry after {retry_after:g}s")
+        self.retry_after = retry_after
+
+
+class StageTimer:
+    """Records elapsed milliseconds for consecutive named stages."""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self._last = time.perf_counter()
+
+    def mark(self, stage: str) -> None:
+        """Close the current stage under `stage` and start the next one."""
+        now = time.perf_counter()
+        self.timings[stage] = round(self.timings.get(stage, 0.0) + (now - self._last) * 1000, 3)
+        self._last = now
+
+
+class WorkerPool:
+    """Thread pool with admission control."""
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, max_pending: int = 0,
+                 retry_after: float = 1.0, name: str = "worker"):
+        """
+        Initialize the pool.
+
+        Args:
+            max_workers: Number of worker threads
+            max_pending: Jobs admitted at once, running or queued (0 = 4x workers)
+            retry_after: Seconds suggested to rejected clients
+            name: Thread name prefix
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending or max_workers * 4
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.rejected = 0
+
+    async def run(self, fn: Callable[..., Any], *args) -> Tuple[Any, float]:
+        """
+        Run `fn(*args)` on the pool.
+
+        Returns:
+            (result, queue wait in ms)
+
+        Raises:
+            PoolSaturated: If max_pending jobs are already admitted
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PoolSaturated(self.retry_after)
+        with self._lock:
+            self.pending += 1
+
+        submitted = time.perf_counter()
+
+        def job():
+            wait_ms = (time.perf_counter() - submitted) * 1000
+            return fn(*args), wait_ms
+
+        def release(_):
+            with self._lock:
+                self.pending -= 1
+            self._slots.release()
+
+        # Released when the job finishes (or is cancelled before starting),
+        # not when the awaiting request goes away
+        future = self._executor.submit(job)
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
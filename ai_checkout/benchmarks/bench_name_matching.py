@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Benchmark product-name matching against catalog size.
+
+Compares the old per-request pandas scan (exact filter + iterrows with
+fuzz.ratio) with the prebuilt NameIndex for exact hits, cold fuzzy hits and
+repeated (memoized) fuzzy hits. run_store() measures the path the API
+serves: CatalogStore.find_by_name on a built, memory-mapped store (mapped
+hash index for exact names, then the lazily built NameIndex).
+
+Usage:
+    python -m benchmarks.bench_name_matching [--sizes 1000 10000 50000] [--store]
+"""
+
+import argparse
+import json
+import random
+import string
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from api.catalog import NameIndex
+from api.catalog_store import CatalogStore, write_store
+
+BRANDS = ["Fresho", "BB Royal", "Amul", "Tata", "Nestle", "Britannia", "Haldiram's", "Organic Tattva"]
+NOUNS = ["Toor Dal", "Basmati Rice", "Milk", "Butter", "Biscuits", "Green Tea", "Atta", "Paneer", "Namkeen", "Honey"]
+
+
+def generate_catalog(size: int, seed: int = 0) -> List[dict]:
+    """Generate a synthetic BigBasket-like catalog with unique names."""
+    rng = random.Random(seed)
+    products = []
+    for i in range(size):
+        suffix = "".join(rng.choices(string.ascii_uppercase, k=3))
+        name = f"{rng.choice(BRANDS)} {rng.choice(NOUNS)} {rng.choice([100, 200, 500, 1000])}g {suffix}{i}"
+        products.append({
+            "product_id": str(100000 + i),
+            "name": name,
+            "price": round(rng.uniform(10, 500), 2),
+            "category": rng.choice(["Staples", "Dairy", "Snacks", "Beverages"]),
+            "barcode": f"890{i:010d}",
+            "sku": f"SKU{i:07d}",
+        })
+    return products
+
+
+def perturb(name: str, rng: random.Random) -> str:
+    """Introduce a one-character typo so the query misses the exact map."""
+    i = rng.randrange(len(name))
+    return name[:i] + rng.choice(string.ascii_lowercase) + name[i + 1:]
+
+
+def naive_lookup(df, product_name: str):
+    """The original find_product_by_name implementation."""
+    from rapidfuzz import fuzz
+
+    exact_match = df[df['name'].str.lower() == product_name.lower()]
+    if not exact_match.empty:
+        return exact_match.iloc[0].to_dict()
+    best_match = None
+    best_score = 0
+    for _, product in df.iterrows():
+        score = fuzz.ratio(product_name.lower(), product['name'].lower())
+        if score > best_score and score > 70:
+            best_score = score
+            best_match = product
+    return best_match.to_dict() if best_match is not None else None
+
+
+def time_per_call(fn: Callable[[str], object], queries: List[str]) -> float:
+    """Mean milliseconds per call over `queries`."""
+    start = time.perf_counter()
+    for q in queries:
+        fn(q)
+    return (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def run(sizes: List[int], queries: int = 50, naive: bool = True, seed: int = 0) -> Dict[str, dict]:
+    """Run the benchmark for each catalog size and return ms-per-lookup results."""
+    rng = random.Random(seed)
+    results = {}
+    for size in sizes:
+        products = generate_catalog(size, seed)
+        exact_q = [p["name"] for p in rng.sample(products, min(queries, size))]
+        fuzzy_q = [perturb(q, rng) for q in exact_q]
+
+        start = time.perf_counter()
+        index = NameIndex(products)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        row = {
+            "build_ms": round(build_ms, 3),
+            "exact_ms": time_per_call(index.lookup, exact_q),
+            "fuzzy_cold_ms": time_per_call(index.lookup, fuzzy_q),
+            "fuzzy_cached_ms": time_per_call(index.lookup, fuzzy_q),
+        }
+        if naive:
+            import pandas as pd
+
+            df = pd.DataFrame(products)
+            # The scan is slow; a handful of queries is enough for a stable mean
+            row["naive_fuzzy_ms"] = time_per_call(lambda q: naive_lookup(df, q), fuzzy_q[:3])
+        results[str(size)] = {k: round(v, 4) for k, v in row.items()}
+    return results
+
+
+def run_store(sizes: List[int], workdir: Path, queries: int = 50, seed: int = 0) -> Dict[str, dict]:
+    """
+    Time CatalogStore.find_by_name, as the API serves it, per catalog size.
+
+    Args:
+        sizes: Catalog sizes
+        workdir: Directory the stores are written to
+        queries: Lookups per query kind
+        seed: Catalog and query seed
+
+    Returns:
+        ms per lookup (exact, cold and cached fuzzy) plus store build, open
+        and first-fuzzy-lookup (NameIndex build) times, per size
+    """
+    rng = random.Random(seed)
+    results = {}
+    for size in sizes:
+        products = generate_catalog(size, seed)
+        exact_q = [p["name"] for p in rng.sample(products, min(queries, size))]
+        fuzzy_q = [perturb(q, rng) for q in exact_q]
+        store_dir = Path(workdir) / f"catalog_{size}.store"
+
+        start = time.perf_counter()
+        write_store(products, store_dir)
+        build_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        store = CatalogStore(store_dir)
+        open_ms = (time.perf_counter() - start) * 1000
+
+        row = {
+            "store_build_ms": build_ms,
+            "open_ms": open_ms,
+            # Exact names never touch the fuzzy matcher, so time them first
+            "exact_ms": time_per_call(store.find_by_name, exact_q),
+            "name_index_build_ms": time_per_call(store.find_by_name, fuzzy_q[:1]),
+            "fuzzy_cold_ms": time_per_call(store.find_by_name, fuzzy_q[1:]),
+            "fuzzy_cached_ms": time_per_call(store.find_by_name, fuzzy_q[1:]),
+        }
+        results[str(size)] = {k: round(v, 4) for k, v in row.items()}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark product-name matching")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--skip-naive", action="store_true", help="Skip the pandas iterrows baseline")
+    parser.add_argument("--store", action="store_true", help="Benchmark CatalogStore.find_by_name instead")
+    args = parser.parse_args()
+
+    if args.store:
+        with tempfile.TemporaryDirectory(prefix="name-matching-") as tmp:
+            results = run_store(args.sizes, Path(tmp), args.queries)
+    else:
+        results = run(args.sizes, args.queries, naive=not args.skip_naive)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
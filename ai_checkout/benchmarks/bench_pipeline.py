@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Reproducible offline benchmark of the scan pipeline.
+
+Runs with no network and no trained model: a tiny stand-in classifier, a
+generated catalog and synthetic JPEG frames are written to a temporary
+directory (see stand_in.py). Suites:
+
+    decode          JPEG bytes -> BGR array
+    preprocess      BGR frames -> classifier batch, per batch size
+    inference       classifier forward pass, per batch size
+    name_matching   CatalogStore.find_by_name vs catalog size, as the API
+                    serves lookups (bench_name_matching.run_store)
+    end_to_end      POST /detect-vision through the FastAPI app in-process,
+                    plus the server-side stage timings it reports
+
+Timed suites report p50/p95/p99 milliseconds and throughput. Results are
+written as JSON; pass an earlier run as --baseline and the run fails (exit
+status 1) when any latency grows, or throughput drops, by more than
+--threshold.
+
+Needs the API requirements plus the benchmark extras (onnx for the stand-in
+model, requests for FastAPI's TestClient):
+
+    pip install -r api/requirements_dev.txt
+
+Usage:
+    python -m benchmarks.bench_pipeline [--out results.json]
+                                        [--baseline old.json] [--threshold 0.2]
+                                        [--quick]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from api.ingest import decode_image_bytes
+from benchmarks import bench_name_matching
+from benchmarks.stand_in import synthetic_jpegs, write_catalog, write_stand_in_bundle
+
+DEFAULT_BATCH_SIZES = [1, 2, 4, 8, 16]
+DEFAULT_CATALOG_SIZES = [1000, 10000]
+# Catalog served by the in-process app; the first N_CLASSES names are the model's classes
+SERVED_CATALOG_SIZE = 5000
+N_CLASSES = 20
+# Baseline values below this are timer noise and are never flagged
+DEFAULT_MIN_MS = 0.05
+
+
+def percentiles(samples_ms: List[float], items_per_sample: int = 1) -> Dict[str, float]:
+    """Summarize per-call latencies: p50/p95/p99, mean and items per second."""
+    arr = np.asarray(samples_ms, dtype=np.float64)
+    total_s = arr.sum() / 1000
+    return {
+        "n": int(arr.size),
+        "mean_ms": round(float(arr.mean()), 4),
+        "p50_ms": round(float(np.percentile(arr, 50)), 4),
+        "p95_ms": round(float(np.percentile(arr, 95)), 4),
+        "p99_ms": round(float(np.percentile(arr, 99)), 4),
+        "throughput_per_s": round(arr.size * items_per_sample / total_s, 2) if total_s else 0.0,
+    }
+
+
+def sample(fn: Callable[[], object], repeat: int, warmup: int = 3) -> List[float]:
+    """Milliseconds per call of `fn` over `repeat` calls, after `warmup` untimed ones."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def bench_decode(frames: List[bytes], repeat: int) -> Dict[str, float]:
+    it = iter(frames * (repeat // len(frames) + 4))
+    return percentiles(sample(lambda: decode_image_bytes(next(it)), repeat))
+
+
+def bench_preprocess(images: List[np.ndarray], batch_sizes: List[int], repeat: int) -> Dict[str, dict]:
+    from inference.preprocess import preprocess_batch
+
+    results = {}
+    for bs in batch_sizes:
+        batch = [images[i % len(images)] for i in range(bs)]
+        results[str(bs)] = percentiles(sample(lambda: preprocess_batch(batch), repeat), bs)
+    return results
+
+
+def bench_inference(bundle_dir: Path, images: List[np.ndarray], batch_sizes: List[int],
+                    repeat: int) -> Dict[str, dict]:
+    from inference.backends import OnnxBackend
+    from inference.preprocess import preprocess_batch
+
+    engine = OnnxBackend(bundle_dir=bundle_dir)
+    if not engine.load():
+        raise RuntimeError(f"Stand-in bundle at {bundle_dir} did not load")
+    results = {}
+    for bs in batch_sizes:
+        # Copy out of the reusable preprocessing buffer so only the forward pass is timed
+        x = preprocess_batch([images[i % len(images)] for i in range(bs)]).copy()
+        results[str(bs)] = percentiles(sample(lambda: engine.predict(x), repeat), bs)
+    return results
+
+
+def configure_environment(workdir: Path, bundle_dir: Path, catalog_path: Path) -> None:
+    """
+    Point the API at the stand-in fixtures and keep it offline.
+
+    Must run before anything imports inference.backends or api.main, which
+    read their configuration from the environment at import time.
+    """
+    os.environ.update({
+        "CNN_BACKEND": "onnx",
+        "CNN_PRECISION": "fp32",
+        "CNN_ONNX_BUNDLE": str(bundle_dir),
+        "PRODUCT_CATALOG_PATH": str(catalog_path),
+        "SCAN_SPILL_PATH": str(workdir / "spool" / "scans.jsonl"),
+        "FRAME_STORE_DIR": str(workdir / "frames"),
+        # Empty registry and no polling, so a CURRENT pointer in the checkout's
+        # models/registry cannot swap the stand-in model out mid-run
+        "MODEL_REGISTRY_DIR": str(workdir / "registry"),
+        "MODEL_REGISTRY_POLL_S": "0",
+        # Every frame is distinct, but never let the result cache short-circuit a request
+        "RESULT_CACHE_TTL_S": "0",
+        "DETECTOR_MODEL_PATH": str(workdir / "no_detector.onnx"),
+        "CAMERA_CALIBRATION_PATH": str(workdir / "no_camera.json"),
+        # Unroutable; scan rows are dropped below before any insert is attempted
+        "SUPABASE_URL": "http://127.0.0.1:9",
+        "SUPABASE_SERVICE_ROLE_KEY": "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.benchmark",
+    })
+
+
+def bench_end_to_end(frames: List[bytes], repeat: int) -> Dict[str, dict]:
+    from fastapi.testclient import TestClient
+    from api import main as app_module
+
+    # Keep scan rows off the network (and out of the timings)
+    app_module.scan_log.insert_fn = lambda rows: None
+
+    stage_samples: Dict[str, List[float]] = {}
+    statuses: Dict[str, int] = {}
+    it = iter(frames * (repeat // len(frames) + 4))
+
+    def post():
+        response = client.post(
+            "/detect-vision",
+            data=next(it),
+            params={"user_id": "benchmark"},
+            headers={"Content-Type": "image/jpeg"},
+        )
+        return response.json()
+
+    with TestClient(app_module.app) as client:
+        # Models load and warm up in the background after startup
+        deadline = time.monotonic() + 120
+        ready = client.get("/ready")
+        while ready.status_code != 200:
+            if ready.json()["status"] == "unavailable" or time.monotonic() > deadline:
+                raise RuntimeError(f"API did not become ready: {ready.json()}")
+            time.sleep(0.05)
+            ready = client.get("/ready")
+        for _ in range(3):
+            post()
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            body = post()
+            samples.append((time.perf_counter() - start) * 1000)
+            statuses[body.get("status", "error")] = statuses.get(body.get("status", "error"), 0) + 1
+            for stage, ms in (body.get("timings_ms") or {}).items():
+                stage_samples.setdefault(stage, []).append(ms)
+
+    return {
+        "detect_vision": percentiles(samples),
+        # Stage throughput would be meaningless; keep only the latency percentiles
+        "stages": {
+            stage: {k: v for k, v in percentiles(ms).items() if k != "throughput_per_s"}
+            for stage, ms in stage_samples.items()
+        },
+        "statuses": statuses,
+    }
+
+
+def environment_info() -> dict:
+    import cv2
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+    }
+    try:
+        import onnxruntime
+        info["onnxruntime"] = onnxruntime.__version__
+    except ImportError:
+        pass
+    try:
+        info["commit"] = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return info
+
+
+def run(batch_sizes: List[int], catalog_sizes: List[int], repeat: int = 200, e2e_requests: int = 200,
+        skip_e2e: bool = False, seed: int = 0) -> dict:
+    """Build the fixtures, run every suite and return the results document."""
+    with tempfile.TemporaryDirectory(prefix="checkout-bench-") as tmp:
+        workdir = Path(tmp)
+        catalog_path = workdir / "product_catalog.json"
+        products = write_catalog(catalog_path, SERVED_CATALOG_SIZE, seed)
+        class_names = [p["name"] for p in products[:N_CLASSES]]
+        bundle_dir = write_stand_in_bundle(workdir / "stand_in_onnx", class_names, seed)
+        configure_environment(workdir, bundle_dir, catalog_path)
+
+        frames = synthetic_jpegs(class_names, 32, seed=seed)
+        images = [decode_image_bytes(f) for f in frames]
+
+        suites = {
+            "decode": bench_decode(frames, repeat),
+            "preprocess": bench_preprocess(images, batch_sizes, repeat),
+            "inference": bench_inference(bundle_dir, images, batch_sizes, repeat),
+            "name_matching": bench_name_matching.run_store(catalog_sizes, workdir / "stores", seed=seed),
+        }
+        if not skip_e2e:
+            suites["end_to_end"] = bench_end_to_end(frames, e2e_requests)
+
+    return {
+        "environment": environment_info(),
+        "config": {
+            "batch_sizes": batch_sizes,
+            "catalog_sizes": catalog_sizes,
+            "repeat": repeat,
+            "e2e_requests": 0 if skip_e2e else e2e_requests,
+            "frame_size": [640, 480],
+            "seed": seed,
+        },
+        "suites": suites,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float, min_ms: float = DEFAULT_MIN_MS,
+            path: str = "") -> List[str]:
+    """
+    List regressions of `current` against `baseline` (both "suites" trees).
+
+    Latencies (keys ending in _ms, except the noisy p99) regress when they
+    grow by more than `threshold`; throughput regresses when it falls by
+    more than `threshold`. Entries missing from either side are ignored.
+    """
+    regressions = []
+    for key, base in baseline.items():
+        if key not in current:
+            continue
+        cur = current[key]
+        name = f"{path}.{key}" if path else key
+        if isinstance(base, dict) and isinstance(cur, dict):
+            regressions.extend(compare(cur, base, threshold, min_ms, name))
+        elif not isinstance(base, (int, float)) or not isinstance(cur, (int, float)):
+            continue
+        elif key.endswith("_ms") and not key.startswith("p99") and base >= min_ms:
+            if cur > base * (1 + threshold):
+                regressions.append(f"{name}: {base:.4f} -> {cur:.4f} ms (+{(cur / base - 1) * 100:.1f}%)")
+        elif key == "throughput_per_s" and base > 0:
+            if cur < base / (1 + threshold):
+                regressions.append(f"{name}: {base:.2f} -> {cur:.2f}/s (+{(base / cur - 1) * 100:.1f}% per item)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the scan pipeline")
+    parser.add_argument("--out", type=Path, help="Write the results JSON here (default: stdout)")
+    parser.add_argument("--baseline", type=Path, help="Earlier results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed relative slowdown before a metric counts as a regression")
+    parser.add_argument("--min-ms", type=float, default=DEFAULT_MIN_MS,
+                        help="Ignore latencies whose baseline is below this")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=DEFAULT_BATCH_SIZES)
+    parser.add_argument("--catalog-sizes", type=int, nargs="+", default=DEFAULT_CATALOG_SIZES)
+    parser.add_argument("--repeat", type=int, default=200, help="Timed calls per micro-benchmark")
+    parser.add_argument("--requests", type=int, default=200, help="Requests for the end-to-end suite")
+    parser.add_argument("--skip-e2e", action="store_true", help="Skip the in-process FastAPI suite")
+    parser.add_argument("--quick", action="store_true", help="Few repeats; for smoke runs, not comparisons")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.repeat, args.requests = 20, 20
+    results = run(args.batch_sizes, args.catalog_sizes, args.repeat, args.requests, args.skip_e2e)
+
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(text + "\n")
+        print(f"Wrote {args.out}")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(results["suites"], baseline.get("suites", {}), args.threshold, args.min_ms)
+        if regressions:
+            print(f"\nPERFORMANCE REGRESSION: {len(regressions)} metric(s) worse than "
+                  f"{args.baseline} by more than {args.threshold:.0%}", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
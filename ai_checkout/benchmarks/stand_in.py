@@ -0,0 +1,108 @@
+"""
+Offline fixtures for the benchmarks: a tiny stand-in classifier, a generated
+catalog and synthetic camera frames.
+
+The stand-in model has the same interface as the exported BigBasket bundle
+(NHWC float32 224x224 RGB input, softmax over the classes in
+class_indices.json) but only a strided conv, a global pool and a dense
+layer, so runs are fast and need no downloads. Absolute inference numbers
+therefore measure the serving path around the model, not the production
+network; compare them across commits, not against production.
+
+Building the model needs the `onnx` package (api/requirements_dev.txt).
+"""
+
+import json
+import random
+from pathlib import Path
+from typing import List, Tuple
+import cv2
+import numpy as np
+
+from benchmarks.bench_name_matching import generate_catalog
+
+INPUT_SIZE = 224
+STAND_IN_CHANNELS = 16
+
+
+def write_stand_in_bundle(out_dir: Path, class_names: List[str], seed: int = 0) -> Path:
+    """
+    Write an ONNX bundle (model.onnx + class_indices.json) loadable by OnnxBackend.
+
+    Args:
+        out_dir: Bundle directory (created if missing)
+        class_names: Class label per output index
+        seed: Weight initialization seed
+
+    Returns:
+        The bundle directory
+    """
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    n_classes = len(class_names)
+    weights = {
+        "conv_w": rng.standard_normal((STAND_IN_CHANNELS, 3, 3, 3)).astype(np.float32) * 0.5,
+        "conv_b": np.zeros(STAND_IN_CHANNELS, dtype=np.float32),
+        "fc_w": rng.standard_normal((STAND_IN_CHANNELS, n_classes)).astype(np.float32),
+        "fc_b": np.zeros(n_classes, dtype=np.float32),
+    }
+    nodes = [
+        helper.make_node("Transpose", ["input"], ["nchw"], perm=[0, 3, 1, 2]),
+        helper.make_node("Conv", ["nchw", "conv_w", "conv_b"], ["conv"], kernel_shape=[3, 3], strides=[4, 4]),
+        helper.make_node("Relu", ["conv"], ["relu"]),
+        helper.make_node("GlobalAveragePool", ["relu"], ["pool"]),
+        helper.make_node("Flatten", ["pool"], ["flat"]),
+        helper.make_node("Gemm", ["flat", "fc_w", "fc_b"], ["logits"]),
+        helper.make_node("Softmax", ["logits"], ["probs"], axis=1),
+    ]
+    graph = helper.make_graph(
+        nodes,
+        "stand_in_classifier",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, [None, INPUT_SIZE, INPUT_SIZE, 3])],
+        [helper.make_tensor_value_info("probs", TensorProto.FLOAT, [None, n_classes])],
+        [numpy_helper.from_array(v, k) for k, v in weights.items()],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 7
+    onnx.save(model, str(out_dir / "model.onnx"))
+    with open(out_dir / "class_indices.json", "w") as f:
+        json.dump({"idx_to_class": {str(i): name for i, name in enumerate(class_names)}}, f)
+    return out_dir
+
+
+def write_catalog(path: Path, size: int, seed: int = 0) -> List[dict]:
+    """Generate a catalog of `size` products (see bench_name_matching) and save it as JSON."""
+    products = generate_catalog(size, seed)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(products, f)
+    return products
+
+
+def synthetic_frame(label: str, size: Tuple[int, int] = (640, 480), seed: int = 0) -> np.ndarray:
+    """A BGR frame with sensor-like noise, a coloured 'product' and its label."""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    img = rng.integers(150, 255, (h, w, 3), dtype=np.uint8)
+    x1, y1 = w // 4, h // 4
+    color = tuple(int(c) for c in rng.integers(0, 200, 3))
+    cv2.rectangle(img, (x1, y1), (w - x1, h - y1), color, -1)
+    cv2.putText(img, label[:24], (x1, h // 2), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+    return img
+
+
+def synthetic_jpegs(labels: List[str], count: int, size: Tuple[int, int] = (640, 480),
+                    quality: int = 90, seed: int = 0) -> List[bytes]:
+    """`count` distinct JPEG frames cycling through `labels`."""
+    rng = random.Random(seed)
+    frames = []
+    for i in range(count):
+        img = synthetic_frame(labels[i % len(labels)], size, seed=rng.randrange(1 << 30))
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        frames.append(buf.tobytes())
+    return frames
@@ -0,0 +1 @@
+"""Inference components for the AI checkout system."""
@@ -0,0 +1,167 @@
+"""
+Inference backends for the BigBasket product classifier.
+
+Each backend takes a preprocessed float32 batch of shape (N, 224, 224, 3)
+and returns class probabilities of shape (N, num_classes). Heavy runtimes
+(TensorFlow, ONNX Runtime) are imported only when a backend is loaded, so the
+serving process never imports TensorFlow unless the Keras backend is chosen.
+"""
+
+import os
+import json
+from pathlib import Path
+from typing import Dict, Optional
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+MODELS_DIR = ROOT / 'models'
+CLASS_INDEX_PATH = MODELS_DIR / 'class_indices.json'
+KERAS_MODEL_PATH = MODELS_DIR / 'bigbasket_vision_model.h5'
+ONNX_BUNDLE_DIR = Path(os.getenv('CNN_ONNX_BUNDLE', str(MODELS_DIR / 'bigbasket_vision_onnx')))
+ONNX_MODEL_NAME = 'model.onnx'
+ONNX_INT8_MODEL_NAME = 'model.int8.onnx'
+
+DEFAULT_BACKEND = os.getenv('CNN_BACKEND', 'keras').lower()
+# 'fp32' serves the float model; 'int8' serves the quantized artifact
+# written into the ONNX bundle by inference.quantize.
+DEFAULT_PRECISION = os.getenv('CNN_PRECISION', 'fp32').lower()
+
+
+def load_class_indices(path: Path) -> Dict[int, str]:
+    """Read class_indices.json and return an index -> label mapping."""
+    with open(path, 'r') as f:
+        payload = json.load(f)
+    return {int(k): v for k, v in payload['idx_to_class'].items()}
+
+
+def create_ort_session(model_path: Path):
+    """CPU ONNX Runtime session with full graph optimization (ORT_INTRA_OP_THREADS caps threads)."""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    intra_threads = int(os.getenv('ORT_INTRA_OP_THREADS', '0'))
+    if intra_threads > 0:
+        options.intra_op_num_threads = intra_threads
+    return ort.InferenceSession(str(model_path), sess_options=options, providers=['CPUExecutionProvider'])
+
+
+class InferenceBackend:
+    """Base class for classifier backends."""
+
+    name = 'base'
+
+    def __init__(self):
+        self.model_path: Optional[Path] = None
+        self.idx_to_class: Optional[Dict[int, str]] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.idx_to_class is not None
+
+    def load(self) -> bool:
+        raise NotImplementedError
+
+    def predict(self, x: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def unload(self) -> None:
+        """Drop the model so its memory can be reclaimed."""
+        self.idx_to_class = None
+
+
+class KerasBackend(InferenceBackend):
+    """TensorFlow/Keras backend loading the original .h5 model."""
+
+    name = 'keras'
+
+    def __init__(self, model_path: Path = KERAS_MODEL_PATH, class_index_path: Path = CLASS_INDEX_PATH):
+        super().__init__()
+        self.model_path = Path(model_path)
+        self.class_index_path = Path(class_index_path)
+        self._model = None
+
+    def load(self) -> bool:
+        if not self.model_path.exists() or not self.class_index_path.exists():
+            print(f"CNN model or class indices not found. Looked for: {self.model_path}, {self.class_index_path}")
+            return False
+        import tensorflow as tf
+
+        self._model = tf.keras.models.load_model(str(self.model_path))
+        self.idx_to_class = load_class_indices(self.class_index_path)
+        return True
+
+    def predict(self, x: np.ndarray) -> np.ndarray:
+        return self._model.predict(x, batch_size=len(x), verbose=0)
+
+    def unload(self) -> None:
+        super().unload()
+        self._model = None
+
+
+class OnnxBackend(InferenceBackend):
+    """ONNX Runtime CPU backend loading a bundle written by export_onnx."""
+
+    name = 'onnx'
+
+    def __init__(self, bundle_dir: Path = ONNX_BUNDLE_DIR, model_name: str = ONNX_MODEL_NAME):
+        super().__init__()
+        self.bundle_dir = Path(bundle_dir)
+        self.model_path = self.bundle_dir / model_name
+        self.class_index_path = self.bundle_dir / 'class_indices.json'
+        self._session = None
+        self._input_name = None
+
+    def load(self) -> bool:
+        if not self.model_path.exists() or not self.class_index_path.exists():
+            print(f"ONNX bundle incomplete. Looked for: {self.model_path}, {self.class_index_path}")
+            return False
+        self._session = create_ort_session(self.model_path)
+        self._input_name = self._session.get_inputs()[0].name
+        self.idx_to_class = load_class_indices(self.class_index_path)
+        return True
+
+    def predict(self, x: np.ndarray) -> np.ndarray:
+        return self._session.run(None, {self._input_name: x})[0]
+
+    def unload(self) -> None:
+        super().unload()
+        self._session = None
+
+
+BACKENDS = {
+    KerasBackend.name: KerasBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+
+def create_backend(name: Optional[str] = None, precision: Optional[str] = None,
+                   bundle_dir: Optional[Path] = None) -> InferenceBackend:
+    """
+    Create a backend by name.
+
+    Args:
+        name: Backend name ('keras' or 'onnx'); defaults to CNN_BACKEND
+        precision: 'fp32' or 'int8'; defaults to CNN_PRECISION
+        bundle_dir: Load from this directory (e.g. a registry version) instead
+            of the configured model paths
+
+    Returns:
+        An unloaded InferenceBackend instance
+    """
+    name = (name or DEFAULT_BACKEND).lower()
+    precision = (precision or DEFAULT_PRECISION).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown CNN backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    if precision not in ('fp32', 'int8'):
+        raise ValueError(f"Unknown CNN precision '{precision}'. Choose from: fp32, int8")
+    if precision == 'int8':
+        if name != OnnxBackend.name:
+            raise ValueError("INT8 serving requires the onnx backend (CNN_BACKEND=onnx)")
+        return OnnxBackend(bundle_dir or ONNX_BUNDLE_DIR, model_name=ONNX_INT8_MODEL_NAME)
+    if bundle_dir is None:
+        return BACKENDS[name]()
+    bundle_dir = Path(bundle_dir)
+    if name == KerasBackend.name:
+        return KerasBackend(bundle_dir / KERAS_MODEL_PATH.name, bundle_dir / 'class_indices.json')
+    return OnnxBackend(bundle_dir)
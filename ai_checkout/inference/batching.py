@@ -0,0 +1,159 @@
+"""
+Dynamic micro-batching for CNN inference.
+
+Frames submitted by concurrent callers are collected for up to a short
+deadline (or until the batch is full) and run through the model as a single
+batched forward pass. Each caller receives its own result through a
+``concurrent.futures.Future``.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Collects individual requests into batches for a batch function.
+
+    The batch function receives a list of submitted items and must return a
+    list of results of the same length and order.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 16,
+        max_delay_ms: float = 10.0,
+        max_queue_size: int = 0,
+        name: str = "micro-batcher",
+    ):
+        """
+        Initialize the batcher.
+
+        Args:
+            batch_fn: Function that processes a list of items in one call
+            max_batch_size: Largest number of items run in one batch
+            max_delay_ms: How long to wait for more items after the first one
+            max_queue_size: Bound on pending items (0 means unbounded)
+            name: Name of the worker thread
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_delay = max(0.0, max_delay_ms) / 1000.0
+        self.name = name
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        # Running counters, read by stats()
+        self.batches_run = 0
+        self.items_run = 0
+        self.last_batch_size = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the worker thread if it is not already running."""
+        with self._lock:
+            if self.running:
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """Stop the worker thread after it has drained queued items."""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._queue.put(_STOP)
+            thread.join(timeout)
+            self._thread = None
+
+    def submit(self, item: Any) -> Future:
+        """
+        Queue an item for the next batch.
+
+        Args:
+            item: Input passed through to the batch function
+
+        Returns:
+            Future resolved with the item's result
+        """
+        if not self.running:
+            raise RuntimeError(f"{self.name} is not running")
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def stats(self) -> dict:
+        """Return running batch statistics."""
+        return {
+            "batches": self.batches_run,
+            "items": self.items_run,
+            "avg_batch_size": self.items_run / self.batches_run if self.batches_run else 0.0,
+            "last_batch_size": self.last_batch_size,
+            "queue_depth": self._queue.qsize(),
+        }
+
+    def _collect(self, first: Tuple[Any, Future]) -> Tuple[List[Tuple[Any, Future]], bool]:
+        """Gather items until the batch is full or the deadline passes."""
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    entry = self._queue.get(timeout=remaining)
+                else:
+                    entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            entry = self._queue.get()
+            if entry is _STOP:
+                break
+            batch, stopping = self._collect(entry)
+
+            # Drop callers that gave up before the batch started
+            batch = [(item, fut) for item, fut in batch if fut.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                results = self.batch_fn([item for item, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"Batch function returned {len(results)} results for {len(batch)} items"
+                    )
+            except Exception as e:
+                logger.error(f"{self.name} batch of {len(batch)} failed: {e}")
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+
+            for (_, fut), result in zip(batch, results):
+                fut.set_result(result)
+
+            self.batches_run += 1
+            self.items_run += len(batch)
+            self.last_batch_size = len(batch)
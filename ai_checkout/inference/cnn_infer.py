@@ -1,54 +1,278 @@
 import os
-import json
+import threading
+import time
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 import numpy as np
-from PIL import Image
-import tensorflow as tf
 
-ROOT = Path(__file__).resolve().parents[1]
-MODELS_DIR = ROOT / 'models'
-CLASS_INDEX_PATH = MODELS_DIR / 'class_indices.json'
-MODEL_PATH = MODELS_DIR / 'bigbasket_vision_model.h5'
+from .backends import (
+    CLASS_INDEX_PATH,
+    KERAS_MODEL_PATH as MODEL_PATH,
+    MODELS_DIR,
+    ROOT,
+    InferenceBackend,
+    create_backend,
+)
+from .batching import MicroBatcher
+from .instrumentation import REGISTRY, SIZE_BUCKETS, span
+from .preprocess import get_preprocessor, preprocess_batch
 
-_model: Optional[tf.keras.Model] = None
-_idx_to_class = None
+# Micro-batching: frames from concurrent callers are grouped for up to
+# BATCH_MAX_DELAY_MS (or BATCH_MAX_SIZE frames) into one forward pass.
+BATCH_MAX_SIZE = int(os.getenv('CNN_BATCH_MAX_SIZE', '16'))
+BATCH_MAX_DELAY_MS = float(os.getenv('CNN_BATCH_MAX_DELAY_MS', '10'))
+# Warm-up runs one synthetic forward pass per batch size (comma-separated);
+# by default every size from 1 to BATCH_MAX_SIZE, since the micro-batcher
+# can form any of them and the runtimes plan each new input shape on first use.
+WARMUP_BATCH_SIZES = sorted(
+    {int(v) for v in os.getenv('CNN_WARMUP_BATCH_SIZES', '').split(',') if v.strip()}
+    or set(range(1, BATCH_MAX_SIZE + 1))
+)
 
+# The serving model. Each batch reads this reference once, so replacing it
+# (swap_model) moves new batches to the new model while running ones finish.
+_backend: Optional[InferenceBackend] = None
+_version: Optional[str] = None
+_batcher: Optional[MicroBatcher] = None
+# Lifecycle: cold -> loading -> warming -> ready, or unavailable if loading failed
+_state = 'cold'
+_warmup_ms: Dict[int, float] = {}
+# Forward passes running per model, so a swapped-out model is freed only once drained
+_inflight: Dict[InferenceBackend, int] = {}
+_inflight_cond = threading.Condition()
+_swap_lock = threading.Lock()
+_swaps = 0
 
-def load_model() -> bool:
-    global _model, _idx_to_class
+
+def load_model(backend: Optional[str] = None, precision: Optional[str] = None,
+               bundle_dir: Optional[Path] = None, version: Optional[str] = None) -> bool:
+    """Load the classifier with the given backend/precision (defaults: CNN_BACKEND, CNN_PRECISION)."""
+    global _backend, _version
     try:
-        if not MODEL_PATH.exists() or not CLASS_INDEX_PATH.exists():
-            print(f"CNN model or class indices not found. Looked for: {MODEL_PATH}, {CLASS_INDEX_PATH}")
+        engine = create_backend(backend, precision, bundle_dir)
+        if not engine.load():
             return False
-        _model = tf.keras.models.load_model(str(MODEL_PATH))
-        with open(CLASS_INDEX_PATH, 'r') as f:
-            payload = json.load(f)
-            _idx_to_class = {int(k): v for k, v in payload['idx_to_class'].items()}
-        print("Loaded CNN model for BigBasket classification.")
+        _backend, _version = engine, version
+        print(f"Loaded CNN model for BigBasket classification ({engine.name} backend, {engine.model_path.name}"
+              f"{f', version {version}' if version else ''}).")
         return True
     except Exception as e:
         print(f"Error loading CNN model: {e}")
-        _model = None
-        _idx_to_class = None
+        _backend = None
         return False
 
 
 def preprocess_image(img_arr: np.ndarray, target_size=(224, 224)) -> np.ndarray:
-    # img_arr is expected BGR (from OpenCV); convert to RGB
-    img_rgb = Image.fromarray(img_arr[:, :, ::-1])
-    img = img_rgb.resize(target_size)
-    x = np.array(img).astype('float32') / 255.0
-    x = np.expand_dims(x, axis=0)
+    # img_arr is expected BGR (from OpenCV); returns a new (1, H, W, 3) RGB float32 array
+    x = np.empty((1, target_size[1], target_size[0], 3), dtype=np.float32)
+    get_preprocessor(tuple(target_size)).preprocess_into(img_arr, x[0])
     return x
 
 
+def _acquire() -> Optional[InferenceBackend]:
+    with _inflight_cond:
+        engine = _backend
+        if engine is not None:
+            _inflight[engine] = _inflight.get(engine, 0) + 1
+        return engine
+
+
+def _release(engine: InferenceBackend) -> None:
+    with _inflight_cond:
+        _inflight[engine] -= 1
+        if not _inflight[engine]:
+            del _inflight[engine]
+            _inflight_cond.notify_all()
+
+
+def predict_batch(img_arrs: List[np.ndarray]) -> List[Optional[Tuple[str, float]]]:
+    """Classify several BGR frames in a single forward pass."""
+    if not img_arrs:
+        return []
+    engine = _acquire()
+    if engine is None:
+        return [None] * len(img_arrs)
+    try:
+        return _classify(engine, img_arrs)
+    finally:
+        _release(engine)
+
+
+def _classify(engine: InferenceBackend, img_arrs: List[np.ndarray]) -> List[Optional[Tuple[str, float]]]:
+    REGISTRY.histogram('cnn_batch_size', 'Frames per classifier forward pass', SIZE_BUCKETS).observe(len(img_arrs))
+    # Written into this thread's reusable batch buffer; consumed before we return
+    with span('cnn_stage_seconds', stage='preprocess', backend=engine.name):
+        x = preprocess_batch(img_arrs)
+    with span('cnn_stage_seconds', stage='forward', backend=engine.name):
+        probs = engine.predict(x)
+    cls_idx = np.argmax(probs, axis=1)
+    confs = probs[np.arange(len(cls_idx)), cls_idx]
+    return [(engine.idx_to_class.get(int(i)), float(c)) for i, c in zip(cls_idx, confs)]
+
+
+def start_batcher(max_batch_size: int = BATCH_MAX_SIZE, max_delay_ms: float = BATCH_MAX_DELAY_MS) -> MicroBatcher:
+    """Route predict() calls through a shared micro-batcher."""
+    global _batcher
+    if _batcher is None or not _batcher.running:
+        _batcher = MicroBatcher(
+            predict_batch,
+            max_batch_size=max_batch_size,
+            max_delay_ms=max_delay_ms,
+            name='cnn-batcher',
+        )
+        _batcher.start()
+    return _batcher
+
+
+def warm_up(batch_sizes: Optional[Sequence[int]] = None, runs: int = 2,
+            engine: Optional[InferenceBackend] = None) -> Dict[int, float]:
+    """
+    Run synthetic forward passes at each batch size so the first real
+    requests do not pay for graph tracing or buffer allocation.
+
+    Calls the backend directly, so warm-up does not show in the metrics.
+
+    Args:
+        batch_sizes: Batch sizes to run (default: WARMUP_BATCH_SIZES)
+        runs: Passes per batch size
+        engine: Model to warm (default: the serving one)
+
+    Returns:
+        batch size -> milliseconds of the last pass
+    """
+    engine = engine or _backend
+    if engine is None:
+        return {}
+    frame = np.random.default_rng(0).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    timings = {}
+    for size in sorted(set(batch_sizes or WARMUP_BATCH_SIZES)):
+        for _ in range(runs):
+            start = time.perf_counter()
+            engine.predict(preprocess_batch([frame] * size))
+            timings[size] = round((time.perf_counter() - start) * 1000, 3)
+    return timings
+
+
+def initialize(backend: Optional[str] = None, precision: Optional[str] = None,
+               batch_sizes: Optional[Sequence[int]] = None, bundle_dir: Optional[Path] = None,
+               version: Optional[str] = None) -> bool:
+    """
+    Load the model, start the micro-batcher and warm up; state() tracks progress.
+
+    Blocking (seconds for large models), so the API runs it on a background
+    thread and reports readiness from state().
+    """
+    global _state, _warmup_ms
+    _state = 'loading'
+    if not load_model(backend, precision, bundle_dir, version):
+        _state = 'unavailable'
+        return False
+    start_batcher()
+    _state = 'warming'
+    try:
+        _warmup_ms = warm_up(batch_sizes)
+    except Exception as e:
+        # A cold model still serves; only the first requests are slower
+        print(f"CNN warm-up failed: {e}")
+    _state = 'ready'
+    return True
+
+
+def swap_model(bundle_dir: Path, version: str, backend: Optional[str] = None, precision: Optional[str] = None,
+               batch_sizes: Optional[Sequence[int]] = None, drain_timeout_s: float = 30.0) -> bool:
+    """
+    Hot-swap the serving model without stopping the batcher.
+
+    The new model is loaded and warmed next to the old one, then replaces it
+    in a single reference assignment. The old model is unloaded once its
+    in-flight forward passes have finished (or after drain_timeout_s, in
+    which case it is left to the garbage collector).
+
+    Args:
+        bundle_dir: Bundle of the new version (see model_registry)
+        version: Version name reported by version() and stats()
+        backend: Backend name (default: CNN_BACKEND)
+        precision: 'fp32' or 'int8' (default: CNN_PRECISION)
+        batch_sizes: Warm-up batch sizes (default: WARMUP_BATCH_SIZES)
+        drain_timeout_s: Longest wait for the old model's batches
+
+    Returns:
+        True if the new version is serving; False if it failed to load
+        (the old model keeps serving)
+    """
+    global _backend, _version, _state, _warmup_ms, _swaps
+    with _swap_lock:
+        if version == _version and _backend is not None:
+            return True
+        try:
+            engine = create_backend(backend, precision, bundle_dir)
+            if not engine.load():
+                return False
+            warmup_ms = warm_up(batch_sizes, engine=engine)
+        except Exception as e:
+            print(f"Error loading CNN model version {version}: {e}")
+            return False
+
+        with _inflight_cond:
+            old = _backend
+            _backend, _version, _warmup_ms = engine, version, warmup_ms
+            _swaps += 1
+            drained = old is None or _inflight_cond.wait_for(lambda: old not in _inflight, drain_timeout_s)
+        _state = 'ready'
+        if old is not None and drained:
+            old.unload()
+        print(f"Serving CNN model version {version} ({engine.name} backend)"
+              f"{'' if drained else '; previous model still busy, left to the garbage collector'}.")
+        return True
+
+
+def version() -> Optional[str]:
+    return _version
+
+
+def state() -> str:
+    return _state
+
+
+def ready() -> bool:
+    return _state == 'ready'
+
+
+def stats() -> dict:
+    """Classifier state for monitoring: lifecycle, warm-up timings plus micro-batcher counters."""
+    result = {
+        'loaded': _backend is not None,
+        'ready': ready(),
+        'state': _state,
+        'version': _version,
+        'swaps': _swaps,
+        'warmup_ms': dict(_warmup_ms),
+    }
+    if _batcher is not None:
+        result.update(_batcher.stats())
+    return result
+
+
+def stop_batcher() -> None:
+    global _batcher
+    if _batcher is not None:
+        _batcher.stop()
+        _batcher = None
+
+
+def submit(img_arr: np.ndarray) -> Future:
+    """Queue a frame for batched prediction and return a future for its result."""
+    if _batcher is None or not _batcher.running:
+        future: Future = Future()
+        future.set_result(predict_batch([img_arr])[0])
+        return future
+    return _batcher.submit(img_arr)
+
+
 def predict(img_arr: np.ndarray) -> Optional[Tuple[str, float]]:
-    if _model is None or _idx_to_class is None:
+    if _backend is None:
         return None
-    x = preprocess_image(img_arr)
-    probs = _model.predict(x, verbose=0)[0]
-    cls_idx = int(np.argmax(probs))
-    conf = float(probs[cls_idx])
-    label = _idx_to_class.get(cls_idx)
-    return (label, conf)
+    if _batcher is not None and _batcher.running:
+        return _batcher.submit(img_arr).result()
+    return predict_batch([img_arr])[0]
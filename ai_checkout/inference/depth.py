@@ -0,0 +1,256 @@
+"""
+Depth estimation for the volume check, kept cheap enough to run beside detection.
+
+Replaces the torch-hub DPT_Large wrapper with a small ONNX depth model
+(e.g. MiDaS_small exported to ONNX; DEPTH_MODEL_PATH) and three ways of
+doing less work:
+
+    - working resolution: the model runs at ``working_size`` (256 by default)
+      and the depth map is never upsampled back to the frame; ROIs are
+      sampled from the low-resolution map directly
+    - ROI-only: only the region enclosing the detector boxes (plus a margin
+      for context) is cropped and fed to the model
+    - reuse: per stream (lane), a tiny grayscale thumbnail of each frame is
+      compared to the one the cached depth map was computed from; if the
+      camera and basket have not moved and the cached region covers the
+      requested boxes, the cached map is reused
+
+The model outputs relative inverse depth (disparity). ``depth_for_boxes``
+returns 1 / median disparity per box, i.e. relative depth; the camera
+calibration's ``depth_scale`` converts it to metres.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Sequence, Tuple
+import cv2
+import numpy as np
+
+from .backends import MODELS_DIR, create_ort_session
+from .volume import CameraCalibration
+
+DEPTH_MODEL_PATH = Path(os.getenv('DEPTH_MODEL_PATH', str(MODELS_DIR / 'midas_small.onnx')))
+WORKING_SIZE = 256
+THUMB_SIZE = (64, 48)
+_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+
+def calibrate_camera(reference_object_width_pixels: float, reference_object_width_meters: float,
+                     **kwargs) -> CameraCalibration:
+    """
+    Calibrate camera using a reference object of known size.
+
+    Args:
+        reference_object_width_pixels (float): Width of reference object in pixels
+        reference_object_width_meters (float): Width of reference object in meters
+
+    Returns:
+        CameraCalibration: Calibration parameters
+    """
+    return CameraCalibration.from_reference(reference_object_width_pixels, reference_object_width_meters, **kwargs)
+
+
+def roi_union(boxes: np.ndarray, shape: Tuple[int, int], margin: float = 0.15) -> Tuple[int, int, int, int]:
+    """Integer xyxy rectangle enclosing all boxes, grown by `margin` and clipped to the frame."""
+    h, w = shape
+    x1, y1 = boxes[:, 0].min(), boxes[:, 1].min()
+    x2, y2 = boxes[:, 2].max(), boxes[:, 3].max()
+    mx, my = (x2 - x1) * margin, (y2 - y1) * margin
+    return (
+        int(max(0, np.floor(x1 - mx))), int(max(0, np.floor(y1 - my))),
+        int(min(w, np.ceil(x2 + mx))), int(min(h, np.ceil(y2 + my))),
+    )
+
+
+@dataclass
+class _DepthCache:
+    thumb: np.ndarray
+    region: Tuple[int, int, int, int]
+    disparity: np.ndarray
+    age: int = 0
+
+    def covers(self, region: Tuple[int, int, int, int]) -> bool:
+        x1, y1, x2, y2 = self.region
+        return region[0] >= x1 and region[1] >= y1 and region[2] <= x2 and region[3] <= y2
+
+
+class DepthEstimator:
+    """Small ONNX depth model with working-resolution, ROI-only and reuse modes."""
+
+    def __init__(
+        self,
+        model_path: Path = DEPTH_MODEL_PATH,
+        working_size: int = WORKING_SIZE,
+        roi_only: bool = True,
+        diff_threshold: float = 3.0,
+        max_reuse: int = 30,
+        max_streams: int = 64,
+    ):
+        """
+        Initialize the estimator.
+
+        Args:
+            model_path: Depth model exported to ONNX (NCHW RGB input, ImageNet normalization)
+            working_size: Model input side; overridden by a static model input shape
+            roi_only: Run the model only on the region around the boxes
+            diff_threshold: Mean absolute thumbnail difference (0-255) below which
+                a frame counts as unchanged
+            max_reuse: Recompute after this many consecutive reuses
+            max_streams: Streams whose cached depth is kept (LRU)
+        """
+        self.model_path = Path(model_path)
+        self.working_size = working_size
+        self.roi_only = roi_only
+        self.diff_threshold = diff_threshold
+        self.max_reuse = max_reuse
+        self.max_streams = max_streams
+        self._session = None
+        self._input_name = None
+        self._caches: "OrderedDict[str, _DepthCache]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self.computed = 0
+        self.reused = 0
+        self.last_ms = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._session is not None
+
+    def load(self) -> bool:
+        if not self.model_path.exists():
+            print(f"Depth model not found at {self.model_path}")
+            return False
+        session = create_ort_session(self.model_path)
+        model_input = session.get_inputs()[0]
+        if isinstance(model_input.shape[-1], int):
+            self.working_size = model_input.shape[-1]
+        self._input_name = model_input.name
+        self._session = session
+        return True
+
+    def _input_buffer(self) -> np.ndarray:
+        size = self.working_size
+        buf = getattr(self._local, 'input', None)
+        if buf is None or buf.shape[-1] != size:
+            buf = self._local.input = np.empty((1, 3, size, size), dtype=np.float32)
+        return buf
+
+    def predict(self, img_bgr: np.ndarray) -> np.ndarray:
+        """Disparity map (working_size x working_size) for a BGR image or crop."""
+        size = self.working_size
+        resized = cv2.resize(img_bgr, (size, size), interpolation=cv2.INTER_AREA)
+        rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB).astype(np.float32)
+        rgb *= np.float32(1.0 / 255.0)
+        rgb -= _MEAN
+        rgb /= _STD
+        x = self._input_buffer()
+        x[0] = rgb.transpose(2, 0, 1)
+        out = self._session.run(None, {self._input_name: x})[0]
+        return np.asarray(out, dtype=np.float32).reshape(out.shape[-2], out.shape[-1])
+
+    def warm_up(self, runs: int = 2) -> float:
+        """Run the model on a blank image; returns ms of the last run."""
+        img = np.zeros((self.working_size, self.working_size, 3), dtype=np.uint8)
+        elapsed_ms = 0.0
+        for _ in range(runs):
+            start = time.perf_counter()
+            self.predict(img)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        return elapsed_ms
+
+    def _thumbnail(self, img_bgr: np.ndarray) -> np.ndarray:
+        # Subsample by striding first; INTER_AREA over the full frame costs more than the gate saves
+        step = max(1, img_bgr.shape[1] // (THUMB_SIZE[0] * 4))
+        small = cv2.resize(img_bgr[::step, ::step], THUMB_SIZE, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def _cached(self, stream: str, thumb: np.ndarray, region) -> Optional[_DepthCache]:
+        with self._lock:
+            cache = self._caches.get(stream)
+            if cache is None:
+                return None
+            self._caches.move_to_end(stream)
+        if cache.age >= self.max_reuse or not cache.covers(region):
+            return None
+        diff = cv2.absdiff(thumb, cache.thumb).mean()
+        return cache if diff <= self.diff_threshold else None
+
+    def depth_for_boxes(self, img_bgr: np.ndarray, boxes: Sequence[Sequence[float]],
+                        stream: str = 'default') -> np.ndarray:
+        """
+        Relative depth of each box (1 / median disparity inside it).
+
+        Args:
+            img_bgr: Decoded BGR frame
+            boxes: (N, 4) xyxy boxes in frame pixels
+            stream: Camera/lane key for depth reuse
+
+        Returns:
+            (N,) relative depths; 0 where a box has no valid depth
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        if self._session is None or not len(boxes):
+            return np.zeros(len(boxes))
+        h, w = img_bgr.shape[:2]
+        region = roi_union(boxes, (h, w)) if self.roi_only else (0, 0, w, h)
+        thumb = self._thumbnail(img_bgr)
+
+        cache = self._cached(stream, thumb, region)
+        if cache is not None:
+            cache.age += 1
+            self.reused += 1
+        else:
+            start = time.perf_counter()
+            x1, y1, x2, y2 = region
+            disparity = self.predict(img_bgr[y1:y2, x1:x2])
+            self.last_ms = (time.perf_counter() - start) * 1000
+            self.computed += 1
+            cache = _DepthCache(thumb=thumb, region=region, disparity=disparity)
+            with self._lock:
+                self._caches[stream] = cache
+                self._caches.move_to_end(stream)
+                while len(self._caches) > self.max_streams:
+                    self._caches.popitem(last=False)
+
+        return self._sample(cache, boxes)
+
+    @staticmethod
+    def _sample(cache: _DepthCache, boxes: np.ndarray) -> np.ndarray:
+        """Median disparity per box, read from the low-resolution map without upsampling."""
+        rx1, ry1, rx2, ry2 = cache.region
+        dh, dw = cache.disparity.shape
+        sx, sy = dw / max(rx2 - rx1, 1), dh / max(ry2 - ry1, 1)
+        cols = np.clip(((boxes[:, [0, 2]] - rx1) * sx).round().astype(np.int64), 0, dw)
+        rows = np.clip(((boxes[:, [1, 3]] - ry1) * sy).round().astype(np.int64), 0, dh)
+        depths = np.zeros(len(boxes))
+        for i, ((c1, c2), (r1, r2)) in enumerate(zip(cols, rows)):
+            patch = cache.disparity[r1:max(r2, r1 + 1), c1:max(c2, c1 + 1)]
+            if patch.size:
+                d = float(np.median(patch))
+                depths[i] = 1.0 / d if d > 1e-6 else 0.0
+        return depths
+
+    def reset(self, stream: Optional[str] = None) -> None:
+        """Forget cached depth for one stream (or all)."""
+        with self._lock:
+            if stream is None:
+                self._caches.clear()
+            else:
+                self._caches.pop(stream, None)
+
+    def stats(self) -> dict:
+        total = self.computed + self.reused
+        return {
+            'computed': self.computed,
+            'reused': self.reused,
+            'reuse_rate': round(self.reused / total, 4) if total else 0.0,
+            'last_ms': round(self.last_ms, 3),
+        }
+
@@ -0,0 +1,318 @@
+"""
+Multi-item detection with a YOLO ONNX model.
+
+Frames are letterboxed to the detector's square input (aspect ratio kept,
+borders padded with gray), run through ONNX Runtime, and the raw output
+tensor is decoded in NumPy:
+
+    - YOLOv8 layout (1, 4 + num_classes, anchors) or YOLOv5 layout
+      (1, anchors, 5 + num_classes) with an objectness column
+    - confidence filtering, argmax and xywh -> xyxy are whole-array ops
+    - class-aware NMS (boxes of different classes never suppress each other)
+    - boxes are mapped back from the letterboxed input to frame pixels
+
+The default model is models/best.onnx (override with DETECTOR_MODEL_PATH).
+"""
+
+import ast
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+
+from .backends import MODELS_DIR, create_ort_session
+
+DETECTOR_MODEL_PATH = Path(os.getenv('DETECTOR_MODEL_PATH', str(MODELS_DIR / 'best.onnx')))
+INPUT_SIZE = 640
+PAD_VALUE = 114
+_SCALE = np.float32(1.0 / 255.0)
+
+
+@dataclass
+class Letterbox:
+    """How a frame was placed on the square model input."""
+    scale: float
+    pad: Tuple[int, int]     # (left, top) in input pixels
+    shape: Tuple[int, int]   # original (height, width)
+
+
+@dataclass
+class Detection:
+    """One detected item in frame pixel coordinates."""
+    box: Tuple[float, float, float, float]  # x1, y1, x2, y2
+    score: float
+    class_id: int
+    label: str
+    # Set by the second-stage classifier (see two_stage.py)
+    product_label: Optional[str] = None
+    product_score: Optional[float] = None
+
+    @property
+    def name(self) -> str:
+        """Best available label: the classifier's, else the detector's."""
+        return self.product_label or self.label
+
+    @property
+    def confidence(self) -> float:
+        return self.product_score if self.product_label else self.score
+
+    def to_dict(self) -> dict:
+        result = {
+            'box': [round(v, 1) for v in self.box],
+            'score': round(self.score, 4),
+            'class_id': self.class_id,
+            'label': self.label,
+        }
+        if self.product_label is not None:
+            result['product_label'] = self.product_label
+            result['product_score'] = round(self.product_score, 4)
+        return result
+
+
+def letterbox(img_bgr: np.ndarray, size: int = INPUT_SIZE, pad_value: int = PAD_VALUE,
+              out: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Letterbox]:
+    """
+    Resize a frame to fit a size x size canvas, keeping its aspect ratio.
+
+    Args:
+        img_bgr: uint8 BGR frame
+        size: Side of the square model input
+        pad_value: Gray level of the borders
+        out: Optional (size, size, 3) uint8 canvas to reuse
+
+    Returns:
+        (canvas, Letterbox) where Letterbox undoes the mapping
+    """
+    h, w = img_bgr.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    left, top = (size - new_w) // 2, (size - new_h) // 2
+
+    canvas = out if out is not None else np.empty((size, size, 3), dtype=np.uint8)
+    canvas.fill(pad_value)
+    if (new_w, new_h) == (w, h):
+        canvas[top:top + new_h, left:left + new_w] = img_bgr
+    else:
+        canvas[top:top + new_h, left:left + new_w] = cv2.resize(
+            img_bgr, (new_w, new_h), interpolation=cv2.INTER_LINEAR
+        )
+    return canvas, Letterbox(scale=scale, pad=(left, top), shape=(h, w))
+
+
+def to_input(canvas_bgr: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """BGR uint8 canvas -> (1, 3, H, W) float32 RGB in [0, 1]."""
+    h, w = canvas_bgr.shape[:2]
+    if out is None:
+        out = np.empty((1, 3, h, w), dtype=np.float32)
+    np.multiply(canvas_bgr[:, :, ::-1].transpose(2, 0, 1), _SCALE, out=out[0])
+    return out
+
+
+def decode_yolo(output: np.ndarray, conf_threshold: float = 0.25, num_classes: Optional[int] = None,
+                has_objectness: Optional[bool] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Decode a raw YOLO output tensor.
+
+    Args:
+        output: (1, 4 + nc, anchors), (1, anchors, 5 + nc) or the same without the batch axis
+        conf_threshold: Minimum class score (times objectness, if present)
+        num_classes: Number of classes; used to recognize the YOLOv5 layout
+        has_objectness: Force the layout; by default inferred from num_classes
+
+    Returns:
+        (boxes (N, 4) xyxy in input pixels, scores (N,), class_ids (N,))
+    """
+    pred = np.asarray(output, dtype=np.float32)
+    if pred.ndim == 3:
+        pred = pred[0]
+    # YOLOv8 exports attributes along axis 0; there are always far more anchors than attributes
+    if pred.shape[0] < pred.shape[1]:
+        pred = pred.T
+    if has_objectness is None:
+        has_objectness = num_classes is not None and pred.shape[1] == 5 + num_classes
+
+    if has_objectness:
+        # Cheap prefilter on objectness before touching the class columns
+        pred = pred[pred[:, 4] >= conf_threshold]
+        class_scores = pred[:, 5:] * pred[:, 4:5]
+    else:
+        class_scores = pred[:, 4:]
+
+    class_ids = class_scores.argmax(axis=1)
+    scores = np.take_along_axis(class_scores, class_ids[:, None], axis=1)[:, 0]
+    keep = scores >= conf_threshold
+
+    xywh = pred[keep, :4]
+    half_wh = xywh[:, 2:4] / 2
+    boxes = np.concatenate([xywh[:, :2] - half_wh, xywh[:, :2] + half_wh], axis=1)
+    return boxes, scores[keep], class_ids[keep]
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float = 0.45,
+        class_ids: Optional[np.ndarray] = None, max_det: int = 300,
+        max_candidates: int = 3000) -> np.ndarray:
+    """
+    Greedy non-maximum suppression.
+
+    Args:
+        boxes: (N, 4) xyxy boxes
+        scores: (N,) scores
+        iou_threshold: Boxes overlapping a kept box by more than this are dropped
+        class_ids: If given, suppression only happens within a class
+        max_det: Maximum number of boxes kept
+        max_candidates: Only the highest-scoring boxes are considered
+
+    Returns:
+        Indices of kept boxes, highest score first
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+    if class_ids is not None:
+        # Shift each class into its own region so boxes of different classes never overlap
+        boxes = boxes + class_ids[:, None].astype(np.float32) * (float(boxes.max()) + 1.0)
+
+    x1, y1, x2, y2 = boxes.T
+    areas = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    order = scores.argsort()[::-1][:max_candidates]
+    keep = []
+    while order.size and len(keep) < max_det:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def unletterbox(boxes: np.ndarray, lb: Letterbox) -> np.ndarray:
+    """Map xyxy boxes from letterboxed input pixels back to the original frame (in place)."""
+    left, top = lb.pad
+    boxes[:, [0, 2]] -= left
+    boxes[:, [1, 3]] -= top
+    boxes /= lb.scale
+    h, w = lb.shape
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w)
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h)
+    return boxes
+
+
+def read_class_names(session) -> Optional[Dict[int, str]]:
+    """Class names stored in the model metadata by Ultralytics exports ("{0: 'apple', ...}")."""
+    names = session.get_modelmeta().custom_metadata_map.get('names')
+    if not names:
+        return None
+    try:
+        parsed = ast.literal_eval(names)
+    except (ValueError, SyntaxError):
+        return None
+    if isinstance(parsed, dict):
+        return {int(k): str(v) for k, v in parsed.items()}
+    return dict(enumerate(map(str, parsed)))
+
+
+class YoloDetector:
+    """Letterbox -> ONNX Runtime -> vectorized decode -> NMS -> frame coordinates."""
+
+    def __init__(
+        self,
+        model_path: Path = DETECTOR_MODEL_PATH,
+        class_names: Optional[Dict[int, str]] = None,
+        input_size: int = INPUT_SIZE,
+        conf_threshold: float = 0.25,
+        iou_threshold: float = 0.45,
+        max_det: int = 100,
+    ):
+        """
+        Initialize the detector.
+
+        Args:
+            model_path: YOLO model exported to ONNX
+            class_names: class id -> label; read from the model metadata when omitted
+            input_size: Square input side, overridden by a static model input shape
+            conf_threshold: Minimum detection score
+            iou_threshold: NMS IoU threshold
+            max_det: Maximum detections per frame
+        """
+        self.model_path = Path(model_path)
+        self.class_names = class_names
+        self.input_size = input_size
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        self.max_det = max_det
+        self._session = None
+        self._input_name = None
+        self._local = threading.local()
+
+    @property
+    def loaded(self) -> bool:
+        return self._session is not None
+
+    def load(self) -> bool:
+        if not self.model_path.exists():
+            print(f"Detector model not found at {self.model_path}")
+            return False
+        session = create_ort_session(self.model_path)
+        model_input = session.get_inputs()[0]
+        if isinstance(model_input.shape[-1], int):
+            self.input_size = model_input.shape[-1]
+        if self.class_names is None:
+            self.class_names = read_class_names(session) or {}
+        self._input_name = model_input.name
+        self._session = session
+        return True
+
+    def warm_up(self, runs: int = 2) -> float:
+        """Run the model on a blank frame; returns ms of the last run."""
+        frame = np.full((self.input_size, self.input_size, 3), PAD_VALUE, dtype=np.uint8)
+        elapsed_ms = 0.0
+        for _ in range(runs):
+            start = time.perf_counter()
+            self.detect(frame)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        return elapsed_ms
+
+    def _buffers(self) -> Tuple[np.ndarray, np.ndarray]:
+        """This thread's reusable canvas and input tensor."""
+        size = self.input_size
+        canvas = getattr(self._local, 'canvas', None)
+        if canvas is None or canvas.shape[0] != size:
+            self._local.canvas = np.empty((size, size, 3), dtype=np.uint8)
+            self._local.input = np.empty((1, 3, size, size), dtype=np.float32)
+        return self._local.canvas, self._local.input
+
+    def detect(self, img_bgr: np.ndarray) -> List[Detection]:
+        """
+        Detect every item in a frame.
+
+        Args:
+            img_bgr: Decoded BGR frame
+
+        Returns:
+            Detections in frame pixels, highest score first
+        """
+        if self._session is None:
+            return []
+        canvas, x = self._buffers()
+        canvas, lb = letterbox(img_bgr, self.input_size, out=canvas)
+        output = self._session.run(None, {self._input_name: to_input(canvas, out=x)})[0]
+
+        num_classes = len(self.class_names) or None
+        boxes, scores, class_ids = decode_yolo(output, self.conf_threshold, num_classes)
+        keep = nms(boxes, scores, self.iou_threshold, class_ids, self.max_det)
+        boxes = unletterbox(boxes[keep], lb)
+        return [
+            Detection(
+                box=tuple(float(v) for v in box),
+                score=float(score),
+                class_id=int(cls),
+                label=self.class_names.get(int(cls), f'class_{int(cls)}'),
+            )
+            for box, score, cls in zip(boxes, scores[keep], class_ids[keep])
+        ]
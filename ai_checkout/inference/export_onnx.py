@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Export the BigBasket Keras classifier to an ONNX Runtime bundle.
+
+The bundle is a directory holding:
+    model.onnx          - the converted classifier
+    class_indices.json  - copied unchanged from the Keras model directory
+    metadata.json       - source model, input shape, opset and export time
+
+Requires tensorflow and tf2onnx (export time only; serving with the ONNX
+backend needs just onnxruntime).
+
+Usage:
+    python -m inference.export_onnx [--model models/bigbasket_vision_model.h5]
+                                    [--out models/bigbasket_vision_onnx]
+"""
+
+import argparse
+import json
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+
+from .backends import CLASS_INDEX_PATH, KERAS_MODEL_PATH, ONNX_BUNDLE_DIR, ONNX_MODEL_NAME
+
+INPUT_SHAPE = (224, 224, 3)
+
+
+def export_bundle(model_path: Path, class_index_path: Path, out_dir: Path, opset: int = 13) -> Path:
+    """
+    Convert a Keras .h5 classifier into an ONNX bundle directory.
+
+    Args:
+        model_path: Path to the Keras .h5 model
+        class_index_path: Path to class_indices.json
+        out_dir: Bundle directory to create
+        opset: ONNX opset version
+
+    Returns:
+        Path to the exported model.onnx
+    """
+    import tensorflow as tf
+    import tf2onnx
+
+    model = tf.keras.models.load_model(str(model_path))
+    out_dir.mkdir(parents=True, exist_ok=True)
+    onnx_path = out_dir / ONNX_MODEL_NAME
+
+    spec = (tf.TensorSpec((None,) + INPUT_SHAPE, tf.float32, name='input'),)
+    tf2onnx.convert.from_keras(model, input_signature=spec, opset=opset, output_path=str(onnx_path))
+    shutil.copyfile(class_index_path, out_dir / 'class_indices.json')
+
+    max_diff = check_parity(model, onnx_path)
+    metadata = {
+        "source_model": Path(model_path).name,
+        "input_shape": list(INPUT_SHAPE),
+        "input_name": "input",
+        "opset": opset,
+        "parity_max_abs_diff": max_diff,
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+    }
+    with open(out_dir / 'metadata.json', 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    print(f"Exported ONNX bundle to {out_dir} (max |keras - onnx| = {max_diff:.2e})")
+    return onnx_path
+
+
+def check_parity(model, onnx_path: Path, samples: int = 4) -> float:
+    """Compare Keras and ONNX Runtime outputs on random inputs."""
+    import onnxruntime as ort
+
+    x = np.random.default_rng(0).random((samples,) + INPUT_SHAPE, dtype=np.float32)
+    expected = model.predict(x, verbose=0)
+    session = ort.InferenceSession(str(onnx_path), providers=['CPUExecutionProvider'])
+    actual = session.run(None, {session.get_inputs()[0].name: x})[0]
+    return float(np.max(np.abs(expected - actual)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the Keras classifier to an ONNX bundle")
+    parser.add_argument("--model", type=Path, default=KERAS_MODEL_PATH)
+    parser.add_argument("--class-indices", type=Path, default=CLASS_INDEX_PATH)
+    parser.add_argument("--out", type=Path, default=ONNX_BUNDLE_DIR)
+    parser.add_argument("--opset", type=int, default=13)
+    args = parser.parse_args()
+
+    export_bundle(args.model, args.class_indices, args.out, opset=args.opset)
+
+
+if __name__ == "__main__":
+    main()
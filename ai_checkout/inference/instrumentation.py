@@ -0,0 +1,178 @@
+"""
+Latency spans, histograms and Prometheus text exposition.
+
+Lives in the inference package because both the classifier (cnn_infer) and
+the API record into it; the API only renders the registry at /metrics.
+
+    with span('cnn_stage_seconds', stage='forward'):
+        probs = engine.predict(x)
+
+    @timed('catalog_lookup_seconds')
+    def find_product(name): ...
+
+Histograms use fixed cumulative buckets, so recording is a bisect plus a few
+additions under a lock and memory does not grow with traffic. Components that
+already keep counters (worker pool, batcher, caches, writers) are exported
+as gauges through collectors that call their stats() at scrape time.
+"""
+
+import bisect
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+NAMESPACE = 'checkout'
+# Seconds; spans from sub-millisecond preprocessing up to multi-second stalls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+class Histogram:
+    """Prometheus-style histogram with per-label-set cumulative buckets."""
+
+    def __init__(self, name: str, help: str, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # per-bucket counts, +Inf count, sum
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    def snapshot(self) -> Dict[LabelKey, Tuple[List[float], float, float]]:
+        """label set -> (cumulative bucket counts, count, sum)."""
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        out = {}
+        for key, series in items:
+            counts = series[:-1]
+            cumulative, running = [], 0.0
+            for c in counts[:-1]:
+                running += c
+                cumulative.append(running)
+            out[key] = (cumulative, running + counts[-1], series[-1])
+        return out
+
+    def render(self) -> List[str]:
+        full = f'{NAMESPACE}_{self.name}'
+        lines = [f'# HELP {full} {self.help}', f'# TYPE {full} histogram']
+        for key, (cumulative, count, total) in sorted(self.snapshot().items()):
+            for bound, c in zip(self.buckets, cumulative):
+                lines.append(f'{full}_bucket{_format_labels(key, ("le", _format_value(bound)))} {int(c)}')
+            lines.append(f'{full}_bucket{_format_labels(key, ("le", "+Inf"))} {int(count)}')
+            lines.append(f'{full}_sum{_format_labels(key)} {_format_value(total)}')
+            lines.append(f'{full}_count{_format_labels(key)} {int(count)}')
+        return lines
+
+
+class Registry:
+    """Named histograms plus gauge collectors, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._histograms: Dict[str, Histogram] = {}
+        self._collectors: Dict[str, Callable[[], dict]] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, help: str = '', buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        """Return the histogram called `name`, creating it on first use."""
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                hist = self._histograms[name] = Histogram(name, help or name.replace('_', ' '), buckets)
+            return hist
+
+    def register_collector(self, name: str, collect: Callable[[], dict]) -> None:
+        """Export the numeric values of `collect()` as gauges named <name>_<key>."""
+        with self._lock:
+            self._collectors[name] = collect
+
+    def render(self) -> str:
+        with self._lock:
+            histograms = list(self._histograms.values())
+            collectors = list(self._collectors.items())
+        lines: List[str] = []
+        for hist in histograms:
+            lines.extend(hist.render())
+        for prefix, collect in collectors:
+            try:
+                values = collect()
+            except Exception as e:
+                print(f"Metrics collector {prefix} failed: {e}")
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if not isinstance(value, (int, float)):
+                    continue
+                full = f'{NAMESPACE}_{prefix}_{key}'
+                lines.append(f'# TYPE {full} gauge')
+                lines.append(f'{full} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+@contextmanager
+def span(name: str, registry: Registry = REGISTRY, **labels) -> Iterator[None]:
+    """Time the enclosed block into histogram `name` (seconds)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.histogram(name).observe(time.perf_counter() - start, **labels)
+
+
+def timed(name: str, registry: Registry = REGISTRY, **labels):
+    """Decorator form of span()."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, registry, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def observe_stages(timings_ms: Dict[str, float], endpoint: str, registry: Registry = REGISTRY) -> None:
+    """Record a StageTimer-style {stage: ms} dict into stage_seconds{endpoint, stage}."""
+    hist = registry.histogram('stage_seconds', 'Time spent per request stage')
+    for stage, ms in timings_ms.items():
+        hist.observe(ms / 1000.0, endpoint=endpoint, stage=stage)
+
+
+def server_timing(timings_ms: Dict[str, float]) -> str:
+    """Server-Timing header value for a {stage: ms} dict."""
+    return ', '.join(f'{stage};dur={ms:.3f}' for stage, ms in timings_ms.items())
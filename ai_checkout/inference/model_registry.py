@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Local registry of versioned classifier bundles.
+
+Layout (MODEL_REGISTRY_DIR, default models/registry):
+
+    <root>/
+        CURRENT                 - name of the version workers should serve
+        v20251012093000/
+            model.onnx          - bundle as written by export_onnx / quantize
+            class_indices.json    (a Keras version holds the .h5 model instead)
+            metadata.json       - export metadata (optional)
+            metrics.json        - evaluation metrics: accuracy, map50, map95 (optional)
+            registered.json     - written by register(): version, source, time,
+                                  backend and precision to serve it with
+
+A version is served with the backend and precision recorded at register
+time (inferred from the bundle's files unless given), not CNN_BACKEND /
+CNN_PRECISION, so an ONNX bundle activates on a worker configured for Keras.
+
+Versions are immutable once registered: register() copies the bundle into a
+temporary directory and renames it into place, and set_current() replaces
+CURRENT atomically, so a worker never sees a half-written version. Serving
+workers poll current() and hot-swap (see cnn_infer.swap_model), so rolling
+out a retrained model is:
+
+    python -m inference.model_registry register models/bigbasket_vision_onnx \\
+        --metrics eval.json --activate
+
+Usage:
+    python -m inference.model_registry list
+    python -m inference.model_registry register BUNDLE_DIR [--version V] [--metrics FILE]
+                                                [--backend keras|onnx] [--precision fp32|int8] [--activate]
+    python -m inference.model_registry activate VERSION
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import tempfile
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .backends import KERAS_MODEL_PATH, MODELS_DIR, ONNX_INT8_MODEL_NAME, ONNX_MODEL_NAME
+
+MODEL_REGISTRY_DIR = Path(os.getenv('MODEL_REGISTRY_DIR', str(MODELS_DIR / 'registry')))
+CURRENT_FILE = 'CURRENT'
+MODEL_NAME = 'bigbasket_vision'
+# Columns of the model_metrics table read from metrics.json
+METRIC_COLUMNS = ('map50', 'map95', 'accuracy')
+_VERSION_RE = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]*$')
+
+
+def _read_json(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def detect_format(bundle_dir: Path) -> Tuple[Optional[str], Optional[str]]:
+    """(backend, precision) a bundle can be served with, from the model files it holds."""
+    bundle_dir = Path(bundle_dir)
+    if (bundle_dir / ONNX_MODEL_NAME).exists():
+        return 'onnx', 'fp32'
+    if (bundle_dir / ONNX_INT8_MODEL_NAME).exists():
+        return 'onnx', 'int8'
+    if (bundle_dir / KERAS_MODEL_PATH.name).exists():
+        return 'keras', 'fp32'
+    return None, None
+
+
+def _write_json_atomic(path: Path, payload: dict) -> None:
+    tmp = path.with_name(f'.{path.name}.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp, path)
+
+
+@dataclass
+class ModelVersion:
+    """One registered bundle."""
+    version: str
+    path: Path
+    metadata: dict = field(default_factory=dict)
+    metrics: dict = field(default_factory=dict)
+    registered_at: Optional[str] = None
+    backend: Optional[str] = None
+    precision: Optional[str] = None
+
+    def metrics_row(self, model_name: str = MODEL_NAME) -> dict:
+        """Row for the model_metrics table."""
+        row = {'model_name': model_name, 'version': self.version}
+        row.update({k: self.metrics[k] for k in METRIC_COLUMNS if self.metrics.get(k) is not None})
+        return row
+
+    def to_dict(self) -> dict:
+        return {
+            'version': self.version,
+            'path': str(self.path),
+            'metadata': self.metadata,
+            'metrics': self.metrics,
+            'registered_at': self.registered_at,
+            'backend': self.backend,
+            'precision': self.precision,
+        }
+
+
+class ModelRegistry:
+    """Directory of immutable model versions plus a CURRENT pointer."""
+
+    def __init__(self, root: Path = MODEL_REGISTRY_DIR):
+        self.root = Path(root)
+
+    def _version_dir(self, version: str) -> Path:
+        if not _VERSION_RE.match(version):
+            raise ValueError(f"Invalid model version '{version}'")
+        return self.root / version
+
+    def get(self, version: str) -> Optional[ModelVersion]:
+        path = self._version_dir(version)
+        if not path.is_dir():
+            return None
+        registered = _read_json(path / 'registered.json')
+        if registered.get('backend'):
+            backend, precision = registered['backend'], registered.get('precision') or 'fp32'
+        else:
+            # Registered before formats were recorded
+            backend, precision = detect_format(path)
+        return ModelVersion(
+            version=version,
+            path=path,
+            metadata=_read_json(path / 'metadata.json'),
+            metrics=_read_json(path / 'metrics.json'),
+            registered_at=registered.get('registered_at'),
+            backend=backend,
+            precision=precision,
+        )
+
+    def versions(self) -> List[ModelVersion]:
+        """Registered versions, oldest first."""
+        if not self.root.is_dir():
+            return []
+        found = [self.get(p.name) for p in self.root.iterdir()
+                 if p.is_dir() and not p.name.startswith('.') and _VERSION_RE.match(p.name)]
+        return sorted(found, key=lambda v: (v.registered_at or '', v.version))
+
+    def current(self) -> Optional[str]:
+        """Version named by CURRENT, or None if unset."""
+        try:
+            version = (self.root / CURRENT_FILE).read_text().strip()
+        except FileNotFoundError:
+            return None
+        return version or None
+
+    def set_current(self, version: str) -> ModelVersion:
+        """Point CURRENT at `version` (atomic rename)."""
+        entry = self.get(version)
+        if entry is None:
+            raise KeyError(f"Model version '{version}' is not registered")
+        tmp = self.root / f'.{CURRENT_FILE}.tmp'
+        tmp.write_text(version + '\n')
+        os.replace(tmp, self.root / CURRENT_FILE)
+        return entry
+
+    def register(self, bundle_dir: Path, version: Optional[str] = None,
+                 metrics: Optional[dict] = None, backend: Optional[str] = None,
+                 precision: Optional[str] = None) -> ModelVersion:
+        """
+        Copy a bundle into the registry as a new version.
+
+        Args:
+            bundle_dir: Directory holding the model and class_indices.json
+            version: Version name (default: v<UTC timestamp>)
+            metrics: Evaluation metrics; merged over the bundle's own metrics.json
+            backend: 'keras' or 'onnx' (default: inferred from the bundle's files)
+            precision: 'fp32' or 'int8' (default: inferred; fp32 when both are present)
+
+        Returns:
+            The registered version
+        """
+        bundle_dir = Path(bundle_dir)
+        if not (bundle_dir / 'class_indices.json').exists():
+            raise FileNotFoundError(f"{bundle_dir} is not a model bundle (no class_indices.json)")
+        detected_backend, detected_precision = detect_format(bundle_dir)
+        backend = backend or detected_backend
+        precision = precision or (detected_precision if backend == detected_backend else 'fp32')
+        if backend is None:
+            raise FileNotFoundError(f"{bundle_dir} holds no model file")
+        if backend == 'onnx' and precision == 'int8':
+            required = ONNX_INT8_MODEL_NAME
+        else:
+            required = ONNX_MODEL_NAME if backend == 'onnx' else KERAS_MODEL_PATH.name
+        if not (bundle_dir / required).exists():
+            raise FileNotFoundError(f"{bundle_dir} has no {required} for the {backend} backend ({precision})")
+        now = datetime.now(timezone.utc)
+        version = version or now.strftime('v%Y%m%d%H%M%S')
+        target = self._version_dir(version)
+        if target.exists():
+            raise FileExistsError(f"Model version '{version}' is already registered")
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f'.{version}.', dir=self.root))
+        try:
+            shutil.copytree(bundle_dir, staging, dirs_exist_ok=True)
+            if metrics:
+                _write_json_atomic(staging / 'metrics.json', {**_read_json(staging / 'metrics.json'), **metrics})
+            _write_json_atomic(staging / 'registered.json', {
+                'version': version,
+                'source': str(bundle_dir.resolve()),
+                'registered_at': now.isoformat(),
+                'backend': backend,
+                'precision': precision,
+            })
+            os.rename(staging, target)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return self.get(version)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage versioned classifier bundles")
+    parser.add_argument("--root", type=Path, default=MODEL_REGISTRY_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="List registered versions")
+    reg = sub.add_parser("register", help="Copy a bundle into the registry")
+    reg.add_argument("bundle", type=Path)
+    reg.add_argument("--version")
+    reg.add_argument("--metrics", type=Path, help="JSON file with accuracy/map50/map95")
+    reg.add_argument("--backend", choices=["keras", "onnx"], help="Serving backend (default: from the bundle)")
+    reg.add_argument("--precision", choices=["fp32", "int8"], help="Serving precision (default: from the bundle)")
+    reg.add_argument("--activate", action="store_true", help="Point CURRENT at the new version")
+    act = sub.add_parser("activate", help="Point CURRENT at a version; serving workers hot-swap to it")
+    act.add_argument("version")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.root)
+    if args.command == "list":
+        current = registry.current()
+        for entry in registry.versions():
+            marker = "*" if entry.version == current else " "
+            print(f"{marker} {entry.version}  {entry.registered_at or '-'}  "
+                  f"{entry.backend or '?'}/{entry.precision or '?'}  {json.dumps(entry.metrics)}")
+    elif args.command == "register":
+        metrics = _read_json(args.metrics) if args.metrics else None
+        entry = registry.register(args.bundle, args.version, metrics, args.backend, args.precision)
+        print(f"Registered {entry.version} at {entry.path} ({entry.backend}, {entry.precision})")
+        if args.activate:
+            registry.set_current(entry.version)
+            print(f"CURRENT -> {entry.version}")
+    elif args.command == "activate":
+        registry.set_current(args.version)
+        print(f"CURRENT -> {args.version}")
+
+
+if __name__ == "__main__":
+    main()
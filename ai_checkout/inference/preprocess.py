@@ -0,0 +1,108 @@
+"""
+Fused, allocation-free preprocessing for the product classifier.
+
+Converts BGR camera frames into the classifier's (N, 224, 224, 3) float32
+RGB input in [0, 1]. Per frame, the only full-size pass is the resize, which
+writes into a reusable uint8 scratch buffer; the BGR->RGB swap then happens
+in place on that small buffer and the /255 normalization writes straight
+into a preallocated float32 batch slot. Frames are shrunk with INTER_AREA,
+which averages the source pixels instead of aliasing like INTER_LINEAR.
+
+Buffers are reused between calls: the array returned by preprocess() and
+preprocess_batch() stays valid only until the same thread preprocesses again.
+"""
+
+import threading
+from typing import Optional, Sequence, Tuple
+import numpy as np
+import cv2
+
+TARGET_SIZE: Tuple[int, int] = (224, 224)
+_SCALE = np.float32(1.0 / 255.0)
+
+
+class Preprocessor:
+    """Owns the scratch and batch buffers used to preprocess frames."""
+
+    def __init__(self, target_size: Tuple[int, int] = TARGET_SIZE, max_batch: int = 1,
+                 interpolation: Optional[int] = None):
+        """
+        Initialize the buffers.
+
+        Args:
+            target_size: (width, height) of the model input
+            max_batch: Initial number of batch slots; grows on demand
+            interpolation: OpenCV interpolation flag used for resizing
+                (default: INTER_AREA when shrinking, INTER_LINEAR when enlarging)
+        """
+        self.target_size = target_size
+        self.interpolation = interpolation
+        width, height = target_size
+        self._resized = np.empty((height, width, 3), dtype=np.uint8)
+        self.buffer = np.empty((max(1, max_batch), height, width, 3), dtype=np.float32)
+
+    def _ensure_capacity(self, n: int) -> None:
+        if n > len(self.buffer):
+            self.buffer = np.empty((n,) + self.buffer.shape[1:], dtype=np.float32)
+
+    def preprocess_into(self, img_bgr: np.ndarray, out: np.ndarray) -> np.ndarray:
+        """
+        Preprocess one BGR frame into `out` (a (H, W, 3) float32 array).
+
+        Args:
+            img_bgr: uint8 frame from OpenCV (BGR, BGRA or grayscale)
+            out: Destination slot, typically a view into a batch buffer
+
+        Returns:
+            `out`, filled with normalized RGB values
+        """
+        if img_bgr.ndim == 2:
+            img_bgr = cv2.cvtColor(img_bgr, cv2.COLOR_GRAY2BGR)
+        elif img_bgr.shape[2] == 4:
+            img_bgr = cv2.cvtColor(img_bgr, cv2.COLOR_BGRA2BGR)
+
+        if img_bgr.shape[1::-1] == self.target_size:
+            cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB, dst=self._resized)
+        else:
+            interpolation = self.interpolation
+            if interpolation is None:
+                height, width = img_bgr.shape[:2]
+                shrinking = width >= self.target_size[0] and height >= self.target_size[1]
+                interpolation = cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR
+            cv2.resize(img_bgr, self.target_size, dst=self._resized, interpolation=interpolation)
+            cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGB, dst=self._resized)
+        np.multiply(self._resized, _SCALE, out=out)
+        return out
+
+    def preprocess(self, img_bgr: np.ndarray) -> np.ndarray:
+        """Preprocess one frame into a (1, H, W, 3) view of the reusable buffer."""
+        self.preprocess_into(img_bgr, self.buffer[0])
+        return self.buffer[:1]
+
+    def preprocess_batch(self, imgs: Sequence[np.ndarray]) -> np.ndarray:
+        """Preprocess N frames into one contiguous (N, H, W, 3) view of the reusable buffer."""
+        self._ensure_capacity(len(imgs))
+        for slot, img in zip(self.buffer, imgs):
+            self.preprocess_into(img, slot)
+        return self.buffer[:len(imgs)]
+
+
+_local = threading.local()
+
+
+def get_preprocessor(target_size: Tuple[int, int] = TARGET_SIZE) -> Preprocessor:
+    """Return the calling thread's Preprocessor for `target_size`."""
+    cache = getattr(_local, 'preprocessors', None)
+    if cache is None:
+        cache = _local.preprocessors = {}
+    if target_size not in cache:
+        cache[target_size] = Preprocessor(target_size)
+    return cache[target_size]
+
+
+def preprocess(img_bgr: np.ndarray, target_size: Tuple[int, int] = TARGET_SIZE) -> np.ndarray:
+    return get_preprocessor(target_size).preprocess(img_bgr)
+
+
+def preprocess_batch(imgs: Sequence[np.ndarray], target_size: Tuple[int, int] = TARGET_SIZE) -> np.ndarray:
+    return get_preprocessor(target_size).preprocess_batch(imgs)
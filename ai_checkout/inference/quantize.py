@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Post-training INT8 quantization for the BigBasket classifier.
+
+Takes the float ONNX bundle written by export_onnx (exporting it from the
+Keras model first if it is missing), calibrates activation ranges on a sample
+of images from the train/ split of the dataset prepared by
+download_dataset.py, writes model.int8.onnx into the same bundle and reports
+the top-1 accuracy delta, latency and size against the float model on the
+val/ split.
+
+Serve the result with CNN_BACKEND=onnx CNN_PRECISION=int8.
+
+Usage:
+    python -m inference.quantize [--dataset ./dataset] [--calib-samples 200]
+                                 [--eval-samples 500]
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import random
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import cv2
+
+from .backends import (
+    CLASS_INDEX_PATH,
+    KERAS_MODEL_PATH,
+    ONNX_BUNDLE_DIR,
+    ONNX_INT8_MODEL_NAME,
+    ONNX_MODEL_NAME,
+    load_class_indices,
+)
+from .cnn_infer import preprocess_image
+
+TRAIN_SPLIT = 'train'
+EVAL_SPLIT = 'val'
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+IMAGE_COLUMNS = ('image', 'img', 'image_path', 'path', 'file_name')
+LABEL_COLUMNS = ('label', 'class', 'category', 'product', 'name')
+
+
+def _decode_cell(value, base_dir: Path) -> Tuple[Optional[str], Optional[np.ndarray]]:
+    """
+    Decode an image cell from a dataset CSV (file path or serialized HF image dict).
+
+    Returns (key, image); the key identifies the image (resolved path or
+    content hash) so the same image referenced twice is only used once.
+    """
+    if not isinstance(value, str) or not value:
+        return None, None
+    if value.startswith('{'):
+        # Hugging Face Image features round-trip through to_csv() as a dict repr
+        try:
+            payload = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return None, None
+        if payload.get('bytes'):
+            key = 'sha1:' + hashlib.sha1(payload['bytes']).hexdigest()
+            return key, cv2.imdecode(np.frombuffer(payload['bytes'], np.uint8), cv2.IMREAD_COLOR)
+        value = payload.get('path') or ''
+    path = Path(value)
+    if not path.is_absolute():
+        path = base_dir / path
+    if path.suffix.lower() in IMAGE_EXTENSIONS and path.exists():
+        return str(path.resolve()), cv2.imread(str(path), cv2.IMREAD_COLOR)
+    return None, None
+
+
+def iter_dataset_images(dataset_dir: Path) -> Iterator[Tuple[np.ndarray, Optional[str]]]:
+    """
+    Yield (BGR image, label) pairs from one split of a prepared dataset.
+
+    Supports class-per-folder image trees and the data.csv files written by
+    download_dataset.py. Each image is yielded once, however many CSVs or
+    folders reference it. Labels are None when they cannot be determined.
+    """
+    seen = set()
+    for csv_path in sorted(dataset_dir.rglob('*.csv')):
+        import pandas as pd
+
+        df = pd.read_csv(csv_path)
+        image_col = next((c for c in IMAGE_COLUMNS if c in df.columns), None)
+        label_col = next((c for c in LABEL_COLUMNS if c in df.columns), None)
+        if image_col is None:
+            continue
+        for _, row in df.iterrows():
+            key, img = _decode_cell(row[image_col], csv_path.parent)
+            if img is not None and key not in seen:
+                seen.add(key)
+                yield img, (str(row[label_col]) if label_col else None)
+
+    for path in sorted(dataset_dir.rglob('*')):
+        if path.suffix.lower() in IMAGE_EXTENSIONS and str(path.resolve()) not in seen:
+            img = cv2.imread(str(path), cv2.IMREAD_COLOR)
+            if img is not None:
+                seen.add(str(path.resolve()))
+                yield img, path.parent.name
+
+
+def sample_dataset(dataset_dir: Path, count: int, seed: int = 42) -> List[Tuple[np.ndarray, Optional[str]]]:
+    """Reservoir-sample `count` images so large datasets are never fully loaded."""
+    rng = random.Random(seed)
+    reservoir: List[Tuple[np.ndarray, Optional[str]]] = []
+    for i, item in enumerate(iter_dataset_images(dataset_dir)):
+        if len(reservoir) < count:
+            reservoir.append(item)
+        else:
+            j = rng.randint(0, i)
+            if j < count:
+                reservoir[j] = item
+    return reservoir
+
+
+class _CalibrationReader:
+    """Feeds preprocessed calibration images to the ORT quantizer."""
+
+    def __init__(self, images: List[np.ndarray], input_name: str):
+        self._iter = iter([{input_name: preprocess_image(img)} for img in images])
+
+    def get_next(self):
+        return next(self._iter, None)
+
+
+def quantize_bundle(bundle_dir: Path, calib_images: List[np.ndarray], per_channel: bool = True) -> Path:
+    """
+    Quantize bundle_dir/model.onnx to INT8 using static calibration.
+
+    Args:
+        bundle_dir: ONNX bundle directory
+        calib_images: BGR images used to calibrate activation ranges
+        per_channel: Quantize weights per output channel
+
+    Returns:
+        Path to the written model.int8.onnx
+    """
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+
+    float_path = bundle_dir / ONNX_MODEL_NAME
+    int8_path = bundle_dir / ONNX_INT8_MODEL_NAME
+    input_name = ort.InferenceSession(str(float_path), providers=['CPUExecutionProvider']).get_inputs()[0].name
+
+    model_input = float_path
+    try:
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+
+        model_input = bundle_dir / 'model.preprocessed.onnx'
+        quant_pre_process(str(float_path), str(model_input))
+    except Exception as e:
+        print(f"Skipping quantization pre-processing: {e}")
+        model_input = float_path
+
+    quantize_static(
+        str(model_input),
+        str(int8_path),
+        _CalibrationReader(calib_images, input_name),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=per_channel,
+        calibrate_method=CalibrationMethod.MinMax,
+    )
+    if model_input != float_path:
+        model_input.unlink(missing_ok=True)
+    return int8_path
+
+
+def evaluate(model_path: Path, samples: List[Tuple[np.ndarray, Optional[str]]], idx_to_class: Dict[int, str]) -> dict:
+    """Run a model over labelled samples and collect predictions, accuracy and latency."""
+    import onnxruntime as ort
+
+    session = ort.InferenceSession(str(model_path), providers=['CPUExecutionProvider'])
+    input_name = session.get_inputs()[0].name
+    predictions = []
+    latencies = []
+    for img, _ in samples:
+        x = preprocess_image(img)
+        start = time.perf_counter()
+        probs = session.run(None, {input_name: x})[0]
+        latencies.append((time.perf_counter() - start) * 1000)
+        predictions.append(idx_to_class.get(int(np.argmax(probs[0]))))
+
+    labelled = [(pred, label) for pred, (_, label) in zip(predictions, samples) if label in idx_to_class.values()]
+    accuracy = sum(pred == label for pred, label in labelled) / len(labelled) if labelled else None
+    return {
+        "predictions": predictions,
+        "top1_accuracy": accuracy,
+        "labelled_samples": len(labelled),
+        "latency_ms_p50": float(np.percentile(latencies, 50)) if latencies else None,
+        "size_mb": model_path.stat().st_size / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize the BigBasket classifier to INT8")
+    parser.add_argument("--bundle", type=Path, default=ONNX_BUNDLE_DIR)
+    parser.add_argument("--model", type=Path, default=KERAS_MODEL_PATH, help="Keras model exported if the bundle is missing")
+    parser.add_argument("--dataset", type=Path, default=Path(os.getenv("DATASET_DIR", "./dataset")))
+    parser.add_argument("--calib-samples", type=int, default=200)
+    parser.add_argument("--eval-samples", type=int, default=500)
+    parser.add_argument("--no-per-channel", action="store_true")
+    args = parser.parse_args()
+
+    if not (args.bundle / ONNX_MODEL_NAME).exists():
+        from .export_onnx import export_bundle
+
+        print(f"No float ONNX model in {args.bundle}; exporting from {args.model}")
+        export_bundle(args.model, CLASS_INDEX_PATH, args.bundle)
+
+    # Calibrate on train/ and evaluate on val/ only: scoring on calibration
+    # images would hide the accuracy cost of quantization
+    train_dir, eval_dir = args.dataset / TRAIN_SPLIT, args.dataset / EVAL_SPLIT
+    for split_dir in (train_dir, eval_dir):
+        if not split_dir.is_dir():
+            raise SystemExit(f"No {split_dir.name}/ split under {args.dataset}; run download_dataset.py first")
+
+    print(f"Sampling calibration images from {train_dir}...")
+    calib = [img for img, _ in sample_dataset(train_dir, args.calib_samples)]
+    if not calib:
+        raise SystemExit(f"No images found under {train_dir}; run download_dataset.py first")
+    print(f"Sampling evaluation images from {eval_dir}...")
+    held_out = sample_dataset(eval_dir, args.eval_samples)
+    if not held_out:
+        raise SystemExit(f"No images found under {eval_dir}; refusing to evaluate on calibration data")
+
+    print(f"Calibrating on {len(calib)} images...")
+    int8_path = quantize_bundle(args.bundle, calib, per_channel=not args.no_per_channel)
+
+    idx_to_class = load_class_indices(args.bundle / 'class_indices.json')
+    fp32 = evaluate(args.bundle / ONNX_MODEL_NAME, held_out, idx_to_class)
+    int8 = evaluate(int8_path, held_out, idx_to_class)
+    agreement = float(np.mean([a == b for a, b in zip(fp32.pop("predictions"), int8.pop("predictions"))]))
+    delta = None
+    if fp32["top1_accuracy"] is not None and int8["top1_accuracy"] is not None:
+        delta = int8["top1_accuracy"] - fp32["top1_accuracy"]
+
+    report = {
+        "eval_samples": len(held_out),
+        "fp32": fp32,
+        "int8": int8,
+        "top1_accuracy_delta": delta,
+        "top1_agreement": agreement,
+    }
+    with open(args.bundle / 'quantization_report.json', 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(report, indent=2))
+    print(f"INT8 model written to {int8_path}")
+
+
+if __name__ == "__main__":
+    main()
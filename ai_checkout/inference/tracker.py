@@ -0,0 +1,254 @@
+"""
+Lightweight multi-object tracker (SORT/ByteTrack style) in NumPy.
+
+No appearance embeddings: each track is a constant-velocity Kalman filter
+over (cx, cy, area, aspect), and detections are associated to the predicted
+boxes through an IoU matrix computed in one vectorized pass followed by a
+minimum-cost assignment (scipy's Hungarian solver, or greedy fallback).
+
+Association runs in two rounds as in ByteTrack: confident detections are
+matched first, then low-confidence detections get a chance to continue the
+tracks that are still unmatched (an item partly hidden by a hand keeps its
+id). Only unmatched confident detections start new tracks.
+"""
+
+from typing import List, Sequence, Tuple
+import numpy as np
+
+from .volume import assign
+
+# State: cx, cy, area, aspect, vx, vy, varea (aspect is assumed constant)
+_DIM_X = 7
+_DIM_Z = 4
+_F = np.eye(_DIM_X)
+_F[0, 4] = _F[1, 5] = _F[2, 6] = 1.0
+_H = np.eye(_DIM_Z, _DIM_X)
+_R = np.diag([1.0, 1.0, 10.0, 10.0])
+_Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 0.0001])
+_P0 = np.diag([10.0, 10.0, 10.0, 10.0, 1e4, 1e4, 1e4])
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Pairwise IoU of two sets of xyxy boxes.
+
+    Args:
+        a: (N, 4) boxes
+        b: (M, 4) boxes
+
+    Returns:
+        (N, M) IoU values
+    """
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 4)
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(np.clip(a[:, 2:] - a[:, :2], 0, None), axis=1)
+    area_b = np.prod(np.clip(b[:, 2:] - b[:, :2], 0, None), axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def compute_iou(box1: Sequence[float], box2: Sequence[float]) -> float:
+    """
+    Compute Intersection over Union (IoU) of two bounding boxes.
+
+    Args:
+        box1 (list): [x1, y1, x2, y2]
+        box2 (list): [x1, y1, x2, y2]
+
+    Returns:
+        float: IoU value
+    """
+    return float(iou_matrix([box1], [box2])[0, 0])
+
+
+def filter_detections(detections: list, confidence_threshold: float = 0.5) -> list:
+    """
+    Filter detections based on confidence threshold.
+
+    Args:
+        detections (list): Detections in format [x1, y1, x2, y2, confidence, class_id]
+        confidence_threshold (float): Minimum confidence threshold
+
+    Returns:
+        list: Filtered detections
+    """
+    return [det for det in detections if det[4] >= confidence_threshold]
+
+
+def _xyxy_to_z(boxes: np.ndarray) -> np.ndarray:
+    w = boxes[:, 2] - boxes[:, 0]
+    h = boxes[:, 3] - boxes[:, 1]
+    return np.stack([boxes[:, 0] + w / 2, boxes[:, 1] + h / 2, w * h, w / np.maximum(h, 1e-6)], axis=1)
+
+
+def _x_to_xyxy(x: np.ndarray) -> np.ndarray:
+    area = np.clip(x[:, 2], 1e-6, None)
+    w = np.sqrt(area * np.clip(x[:, 3], 1e-6, None))
+    h = area / w
+    return np.stack([x[:, 0] - w / 2, x[:, 1] - h / 2, x[:, 0] + w / 2, x[:, 1] + h / 2], axis=1)
+
+
+class ObjectTracker:
+    """IoU + Kalman tracker with stable ids; all tracks are stepped as arrays."""
+
+    def __init__(self, max_age: int = 30, n_init: int = 3, iou_threshold: float = 0.3,
+                 high_conf: float = 0.5, low_conf: float = 0.1, class_aware: bool = True):
+        """
+        Initialize the tracker.
+
+        Args:
+            max_age (int): Frames a track survives without a matching detection
+            n_init (int): Matched frames before a track is confirmed
+            iou_threshold (float): Minimum IoU for a detection to continue a track
+            high_conf (float): Detections at or above this are matched first and may start tracks
+            low_conf (float): Detections below this are ignored
+            class_aware (bool): Only match detections to tracks of the same class
+        """
+        self.max_age = max_age
+        self.n_init = n_init
+        self.iou_threshold = iou_threshold
+        self.high_conf = high_conf
+        self.low_conf = low_conf
+        self.class_aware = class_aware
+
+        self._x = np.empty((0, _DIM_X))
+        self._p = np.empty((0, _DIM_X, _DIM_X))
+        self._ids = np.empty(0, dtype=np.int64)
+        self._hits = np.empty(0, dtype=np.int64)
+        self._misses = np.empty(0, dtype=np.int64)
+        self._class_ids = np.empty(0, dtype=np.int64)
+        self._scores = np.empty(0)
+        self._next_id = 1
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _predict(self) -> None:
+        if not len(self._x):
+            return
+        # Keep the area non-negative when it is shrinking fast
+        shrinking = self._x[:, 2] + self._x[:, 6] <= 0
+        self._x[shrinking, 6] = 0.0
+        self._x = self._x @ _F.T
+        self._p = _F @ self._p @ _F.T + _Q
+
+    def _correct(self, tracks: np.ndarray, z: np.ndarray) -> None:
+        """Batched Kalman update of `tracks` with measurements `z` (K, 4)."""
+        x, p = self._x[tracks], self._p[tracks]
+        s = _H @ p @ _H.T + _R
+        k = p @ _H.T @ np.linalg.inv(s)
+        y = z - x @ _H.T
+        self._x[tracks] = x + np.einsum('kij,kj->ki', k, y)
+        self._p[tracks] = (np.eye(_DIM_X) - k @ _H) @ p
+
+    def _match(self, track_idx: np.ndarray, boxes: np.ndarray, class_ids: np.ndarray,
+               det_idx: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Assign detections `det_idx` to tracks `track_idx`; returns matched (tracks, dets)."""
+        if not len(track_idx) or not len(det_idx):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        iou = iou_matrix(_x_to_xyxy(self._x[track_idx]), boxes[det_idx])
+        if self.class_aware:
+            iou[self._class_ids[track_idx][:, None] != class_ids[det_idx][None, :]] = 0.0
+        rows, cols = assign(1.0 - iou)
+        ok = iou[rows, cols] >= self.iou_threshold
+        return track_idx[rows[ok]], det_idx[cols[ok]]
+
+    def assign(self, boxes, scores, class_ids=None) -> np.ndarray:
+        """
+        Step the tracker with one frame and return a track id per detection.
+
+        Args:
+            boxes: (N, 4) xyxy boxes
+            scores: (N,) confidences
+            class_ids: (N,) class ids (all 0 if omitted)
+
+        Returns:
+            (N,) track ids (confirmed or not; see n_init); 0 for detections
+            that neither continue nor start a track
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        scores = np.asarray(scores, dtype=np.float64).reshape(-1)
+        class_ids = (np.zeros(len(boxes), dtype=np.int64) if class_ids is None
+                     else np.asarray(class_ids, dtype=np.int64).reshape(-1))
+        self._predict()
+
+        high = np.flatnonzero(scores >= self.high_conf)
+        low = np.flatnonzero((scores >= self.low_conf) & (scores < self.high_conf))
+        all_tracks = np.arange(len(self._ids))
+
+        t1, d1 = self._match(all_tracks, boxes, class_ids, high)
+        remaining = np.setdiff1d(all_tracks, t1, assume_unique=True)
+        t2, d2 = self._match(remaining, boxes, class_ids, low)
+        matched_t = np.concatenate([t1, t2])
+        matched_d = np.concatenate([d1, d2])
+
+        if len(matched_t):
+            self._correct(matched_t, _xyxy_to_z(boxes[matched_d]))
+            self._hits[matched_t] += 1
+            self._misses[matched_t] = 0
+            self._class_ids[matched_t] = class_ids[matched_d]
+            self._scores[matched_t] = scores[matched_d]
+        unmatched_t = np.setdiff1d(all_tracks, matched_t, assume_unique=True)
+        self._misses[unmatched_t] += 1
+
+        det_track = np.zeros(len(boxes), dtype=np.int64)
+        det_track[matched_d] = self._ids[matched_t]
+
+        new = np.setdiff1d(high, d1, assume_unique=True)
+        self._keep(self._misses <= self.max_age)
+        self._spawn(boxes[new], scores[new], class_ids[new])
+        if len(new):
+            det_track[new] = self._ids[-len(new):]
+        return det_track
+
+    def _keep(self, mask: np.ndarray) -> None:
+        self._x, self._p = self._x[mask], self._p[mask]
+        self._ids, self._hits, self._misses = self._ids[mask], self._hits[mask], self._misses[mask]
+        self._class_ids, self._scores = self._class_ids[mask], self._scores[mask]
+
+    def _spawn(self, boxes: np.ndarray, scores: np.ndarray, class_ids: np.ndarray) -> None:
+        n = len(boxes)
+        if not n:
+            return
+        x = np.zeros((n, _DIM_X))
+        x[:, :_DIM_Z] = _xyxy_to_z(boxes)
+        self._x = np.concatenate([self._x, x])
+        self._p = np.concatenate([self._p, np.repeat(_P0[None], n, axis=0)])
+        self._ids = np.concatenate([self._ids, np.arange(self._next_id, self._next_id + n)])
+        self._next_id += n
+        self._hits = np.concatenate([self._hits, np.ones(n, dtype=np.int64)])
+        self._misses = np.concatenate([self._misses, np.zeros(n, dtype=np.int64)])
+        self._class_ids = np.concatenate([self._class_ids, class_ids])
+        self._scores = np.concatenate([self._scores, scores])
+
+    def update(self, detections) -> List[list]:
+        """
+        Update the tracker with new detections.
+
+        Args:
+            detections (list): Detections in format [x1, y1, x2, y2, confidence, class_id]
+
+        Returns:
+            list: Confirmed tracks seen this frame, as [x1, y1, x2, y2, track_id, confidence, class_id]
+        """
+        dets = np.asarray(detections, dtype=np.float64).reshape(-1, 6)
+        self.assign(dets[:, :4], dets[:, 4], dets[:, 5].astype(np.int64))
+        visible = (self._misses == 0) & (self._hits >= self.n_init)
+        boxes = _x_to_xyxy(self._x[visible])
+        return [
+            [*map(float, box), int(tid), float(score), int(cls)]
+            for box, tid, score, cls in zip(boxes, self._ids[visible], self._scores[visible],
+                                            self._class_ids[visible])
+        ]
+
+    def reset(self) -> None:
+        self._keep(np.zeros(len(self._ids), dtype=bool))
+        self._next_id = 1
+
+
+if __name__ == '__main__':
+    print('Object tracking module (Kalman + IoU, no appearance model)')
+    print('Initialize with: tracker = ObjectTracker()')
+    print('Update with: tracks = tracker.update(detections)')
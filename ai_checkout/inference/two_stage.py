@@ -0,0 +1,84 @@
+"""
+Detect-then-classify: label each detector box with the product classifier.
+
+The detector finds where the items are; the classifier (trained on single
+product images) decides what each one is. All crops of a frame are
+classified together in one forward pass, so a basket of N items costs one
+detector call plus one batched classifier call rather than N classifier
+calls on the whole frame.
+
+Crops are NumPy views into the decoded frame (no copies); the only per-crop
+work is the resize into the classifier's preallocated 224x224 batch buffer.
+"""
+
+from typing import Callable, List, Optional, Sequence, Tuple
+import numpy as np
+
+from . import cnn_infer
+from .detection import Detection
+
+# Crops smaller than this (in pixels, either side) are too small to classify
+MIN_CROP_SIZE = 8
+
+ClassifyBatch = Callable[[List[np.ndarray]], List[Optional[Tuple[str, float]]]]
+
+
+def crop_views(img: np.ndarray, boxes: Sequence[Sequence[float]], pad_ratio: float = 0.05,
+               min_size: int = MIN_CROP_SIZE) -> List[Optional[np.ndarray]]:
+    """
+    Slice each box out of the frame as a view.
+
+    Args:
+        img: Decoded (H, W, 3) frame
+        boxes: xyxy boxes in frame pixels
+        pad_ratio: Context added around each box, as a fraction of its size
+        min_size: Boxes narrower or shorter than this give None
+
+    Returns:
+        One view (or None) per box
+    """
+    h, w = img.shape[:2]
+    if len(boxes) == 0:
+        return []
+    b = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    pad = (b[:, 2:4] - b[:, 0:2]) * pad_ratio
+    x1y1 = np.floor(b[:, 0:2] - pad).astype(np.int64)
+    x2y2 = np.ceil(b[:, 2:4] + pad).astype(np.int64)
+    x1y1 = np.clip(x1y1, 0, [w, h])
+    x2y2 = np.clip(x2y2, 0, [w, h])
+
+    crops = []
+    for (x1, y1), (x2, y2) in zip(x1y1, x2y2):
+        if x2 - x1 < min_size or y2 - y1 < min_size:
+            crops.append(None)
+        else:
+            crops.append(img[y1:y2, x1:x2])
+    return crops
+
+
+def classify_detections(img: np.ndarray, detections: List[Detection],
+                        classify_batch: Optional[ClassifyBatch] = None,
+                        pad_ratio: float = 0.05) -> List[Detection]:
+    """
+    Attach classifier labels to detections (in place).
+
+    Args:
+        img: The frame the detections came from
+        detections: Detector output
+        classify_batch: Batched classifier; defaults to cnn_infer.predict_batch
+        pad_ratio: Context added around each box before classifying
+
+    Returns:
+        `detections`, with product_label/product_score set where a crop was classified
+    """
+    classify_batch = classify_batch or cnn_infer.predict_batch
+    crops = crop_views(img, [d.box for d in detections], pad_ratio)
+    valid = [i for i, crop in enumerate(crops) if crop is not None]
+    if not valid:
+        return detections
+
+    predictions = classify_batch([crops[i] for i in valid])
+    for i, prediction in zip(valid, predictions):
+        if prediction is not None and prediction[0] is not None:
+            detections[i].product_label, detections[i].product_score = prediction
+    return detections
@@ -0,0 +1,483 @@
+"""
+Basket verification: reconcile barcode-scanned items with what the camera sees.
+
+A VerificationSession is created per checkout with the scanned basket and
+then fed detections frame by frame. Detections are reconciled with scanned
+items by catalog ``product_id`` (set by the API after matching the
+detector label to the catalog); the normalized name is only a fallback for
+records without one. It keeps running per-product state
+(confirmed visible count, best confidence, volume estimates), so each
+update costs O(detections in the frame) and the verdict is available at any
+moment in O(items) without replaying earlier frames.
+
+Counting:
+    - detections with a ``track_id`` are counted once per track, after the
+      track has been seen in ``TRACKER_PERSISTENCE_FRAMES`` frames (sessions
+      with a tracker assign ids to detections that arrive without one)
+    - untracked detections are counted per frame; a product's confirmed count
+      is the largest count seen in at least ``TRACKER_PERSISTENCE_FRAMES``
+      frames, which filters out single-frame false positives and
+      double detections
+
+Flags:
+    EXTRA_ITEM       seen more often than scanned (confidence >= EXTRA_ITEM_CONF)
+    MISSING_ITEM     scanned but not (or not enough times) seen
+    VOLUME_MISMATCH  in at least TRACKER_PERSISTENCE_FRAMES frames, the
+                     measured volume paired with one of the product's units
+                     differs from its catalog dimensions by more than
+                     VOLUME_MISMATCH_TOLERANCE (relative); see volume.py
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+from .backends import ROOT
+from .tracker import ObjectTracker
+from .volume import CameraCalibration, check_volumes, metric_volumes
+
+CONFIG_PATH = Path(__file__).resolve().parent / 'config.yml'
+SAMPLE_BASKET_PATH = ROOT / 'sample_scanned_basket.json'
+
+DEFAULT_CONFIG = {
+    'FRAME_SAMPLING_FPS': 5,
+    'DETECTION_CONF_THRESH': 0.35,
+    'DETECTION_IOU_THRESH': 0.45,
+    'EXTRA_ITEM_CONF': 0.6,
+    'VOLUME_MISMATCH_TOLERANCE': 0.3,
+    'TRACKER_PERSISTENCE_FRAMES': 3,
+}
+
+
+def load_config(config_path: Path = CONFIG_PATH) -> Dict[str, Any]:
+    """Defaults overlaid with the YAML config file, if present."""
+    config = dict(DEFAULT_CONFIG)
+    if Path(config_path).exists():
+        import yaml
+
+        with open(config_path, 'r') as f:
+            config.update(yaml.safe_load(f) or {})
+    return config
+
+
+@dataclass
+class Detection:
+    """Represents a detected object in a frame"""
+    frame_id: Optional[int]
+    class_name: str
+    confidence: float
+    bbox: Tuple[float, float, float, float]
+    mask: Optional[np.ndarray] = None
+    pixel_area: float = 0.0
+    depth_estimate: float = 0.0
+    area_m2: float = 0.0
+    volume_m3: float = 0.0
+    track_id: Optional[int] = None
+    product_id: Optional[str] = None
+
+
+@dataclass
+class ScannedItem:
+    """Represents an item from barcode scan"""
+    product_id: str
+    name: str
+    price: float
+    quantity: int = 1
+    expected_dimensions: Optional[Dict[str, float]] = None
+
+    @property
+    def expected_volume_m3(self) -> Optional[float]:
+        dims = self.expected_dimensions
+        if not dims:
+            return None
+        return dims.get('width', 0.0) * dims.get('height', 0.0) * dims.get('depth', 0.0)
+
+
+class FraudFlag(Enum):
+    EXTRA_ITEM = 'EXTRA_ITEM'
+    MISSING_ITEM = 'MISSING_ITEM'
+    VOLUME_MISMATCH = 'VOLUME_MISMATCH'
+
+
+@dataclass
+class VerificationResult:
+    """Final verification result"""
+    session_id: str
+    status: str
+    flags: List[str]
+    scanned_total: float
+    detected_total: float
+    matches: List[Dict[str, Any]]
+    debug: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def normalize_label(name: str) -> str:
+    return ' '.join(str(name).lower().split())
+
+
+def product_key(product_id: Optional[str], name: str) -> str:
+    """Reconciliation key: the catalog product id, or the normalized name when there is none."""
+    return f'id:{product_id}' if product_id else f'name:{normalize_label(name)}'
+
+
+class _ProductState:
+    """Running observations for one product."""
+
+    __slots__ = ('label', 'name', 'expected', 'scanned', 'frames_with_at_least', 'track_frames',
+                 'confirmed_tracks', 'max_confidence', 'volume_sum', 'volume_n',
+                 'volume_mismatch_frames')
+
+    def __init__(self, label: str, name: str, scanned: Optional[ScannedItem] = None):
+        self.label = label
+        self.name = name
+        self.scanned = scanned
+        self.expected = scanned.quantity if scanned else 0
+        # frames_with_at_least[c - 1] = frames in which >= c untracked copies were seen
+        self.frames_with_at_least: List[int] = []
+        self.track_frames: Dict[int, int] = {}
+        self.confirmed_tracks = 0
+        self.max_confidence = 0.0
+        self.volume_sum = 0.0
+        self.volume_n = 0
+        self.volume_mismatch_frames = 0
+
+    def observe_frame_count(self, count: int, persistence: int) -> int:
+        """Record a per-frame count; returns the new confirmed untracked count."""
+        while len(self.frames_with_at_least) < count:
+            self.frames_with_at_least.append(0)
+        for c in range(count):
+            self.frames_with_at_least[c] += 1
+        return self.untracked_count(persistence)
+
+    def untracked_count(self, persistence: int) -> int:
+        # frames_with_at_least is non-increasing, so this stops at the first short entry
+        n = 0
+        for frames in self.frames_with_at_least:
+            if frames < persistence:
+                break
+            n += 1
+        return n
+
+    def observe_track(self, track_id: int, persistence: int) -> None:
+        seen = self.track_frames.get(track_id, 0) + 1
+        self.track_frames[track_id] = seen
+        if seen == persistence:
+            self.confirmed_tracks += 1
+
+    def seen(self, persistence: int) -> int:
+        # Tracked and per-frame counting describe the same items; trust the larger
+        return max(self.confirmed_tracks, self.untracked_count(persistence))
+
+    @property
+    def mean_volume_m3(self) -> Optional[float]:
+        return self.volume_sum / self.volume_n if self.volume_n else None
+
+
+class VerificationSession:
+    """Incremental scanned-vs-detected reconciliation for one checkout."""
+
+    def __init__(self, session_id: str, scanned_items: Iterable[ScannedItem],
+                 config: Optional[Dict[str, Any]] = None,
+                 calibration: Optional[CameraCalibration] = None,
+                 tracker: Optional[ObjectTracker] = None):
+        """
+        Initialize the session.
+
+        Args:
+            session_id: Checkout session identifier
+            scanned_items: Items scanned at the lane
+            config: Thresholds; defaults to load_config()
+            calibration: Converts pixel areas/depths to volumes for detections
+                that do not carry volume_m3
+            tracker: Assigns track ids so an item seen across frames counts once
+        """
+        self.session_id = session_id
+        self.config = config or load_config()
+        self.calibration = calibration
+        self.tracker = tracker
+        self.volume_tolerance = float(self.config['VOLUME_MISMATCH_TOLERANCE'])
+        # One entry per scanned unit: product state, label id and expected volume
+        self._label_ids: Dict[str, int] = {}
+        self._units: Optional[Tuple[List[_ProductState], np.ndarray, np.ndarray]] = None
+        self.persistence = max(1, int(self.config['TRACKER_PERSISTENCE_FRAMES']))
+        self.min_confidence = float(self.config['DETECTION_CONF_THRESH'])
+        self._products: Dict[str, _ProductState] = {}
+        self._lock = threading.Lock()
+        self.frames = 0
+        self.detections = 0
+        self.last_frame_id: Optional[int] = None
+        for item in scanned_items:
+            self.add_scanned(item)
+
+    def add_scanned(self, item: ScannedItem) -> None:
+        """Add an item scanned after the session started."""
+        key = product_key(item.product_id, item.name)
+        with self._lock:
+            state = self._products.get(key)
+            if state is None:
+                self._products[key] = _ProductState(key, item.name, item)
+            elif state.scanned is None:
+                state.scanned, state.expected = item, item.quantity
+            else:
+                state.expected += item.quantity
+            self._units = None
+
+    def _label_id(self, label: str) -> int:
+        return self._label_ids.setdefault(label, len(self._label_ids))
+
+    def _expected_units(self) -> Tuple[List[_ProductState], np.ndarray, np.ndarray]:
+        if self._units is None:
+            states = [st for st in self._products.values() if st.scanned for _ in range(st.expected)]
+            labels = np.array([self._label_id(st.label) for st in states], dtype=np.int64)
+            volumes = np.array([st.scanned.expected_volume_m3 or 0.0 for st in states], dtype=np.float64)
+            self._units = (states, labels, volumes)
+        return self._units
+
+    def _measured_volumes(self, detections: List[Detection]) -> np.ndarray:
+        volumes = np.array([det.volume_m3 for det in detections], dtype=np.float64)
+        missing = volumes <= 0
+        if self.calibration is not None and missing.any():
+            todo = [det for det, m in zip(detections, missing) if m]
+            volumes[missing] = metric_volumes(
+                [det.pixel_area for det in todo],
+                [det.depth_estimate for det in todo],
+                [(det.bbox[2] - det.bbox[0], det.bbox[3] - det.bbox[1]) for det in todo],
+                self.calibration,
+            )
+        return volumes
+
+    def _check_frame_volumes(self, detections: List[Detection], states: List[_ProductState]) -> None:
+        """Pair this frame's volumes with the scanned units; count mismatches per product."""
+        volumes = self._measured_volumes(detections)
+        for state, volume in zip(states, volumes):
+            if volume > 0:
+                state.volume_sum += float(volume)
+                state.volume_n += 1
+        unit_states, unit_labels, unit_volumes = self._expected_units()
+        if not (volumes > 0).any() or not (unit_volumes > 0).any():
+            return
+        det_labels = np.array([self._label_id(st.label) for st in states], dtype=np.int64)
+        check = check_volumes(volumes, unit_volumes, self.volume_tolerance, det_labels, unit_labels)
+        # Several units of one product can mismatch in the same frame; count the frame once
+        mismatched = {id(unit_states[u]): unit_states[u] for u in check.expected_idx[check.mismatched]}
+        for state in mismatched.values():
+            state.volume_mismatch_frames += 1
+
+    def _assign_tracks(self, detections: List[Detection]) -> None:
+        untracked = [det for det in detections if det.track_id is None]
+        if not untracked:
+            return
+        track_ids = self.tracker.assign(
+            [det.bbox for det in untracked],
+            [det.confidence for det in untracked],
+            [self._label_id(product_key(det.product_id, det.class_name)) for det in untracked],
+        )
+        for det, track_id in zip(untracked, track_ids):
+            if track_id:
+                det.track_id = int(track_id)
+
+    def _state(self, det: Detection) -> _ProductState:
+        key = product_key(det.product_id, det.class_name)
+        state = self._products.get(key)
+        if state is None:
+            state = self._products[key] = _ProductState(key, det.class_name)
+        return state
+
+    def update(self, frame_id: Optional[int], detections: Iterable[Detection]) -> int:
+        """
+        Fold one frame's detections into the running state.
+
+        Args:
+            frame_id: Frame identifier (only used for bookkeeping); None assigns
+                the next sequence number, which is safe with concurrent updates
+            detections: Detections from this frame
+
+        Returns:
+            The frame id used
+        """
+        detections = [det for det in detections if det.confidence >= self.min_confidence]
+        per_frame: Dict[str, int] = {}
+        states: List[_ProductState] = []
+        with self._lock:
+            if frame_id is None:
+                frame_id = self.frames
+                for det in detections:
+                    det.frame_id = frame_id
+            self.frames += 1
+            self.last_frame_id = frame_id
+            self.detections += len(detections)
+            if self.tracker is not None:
+                self._assign_tracks(detections)
+            for det in detections:
+                state = self._state(det)
+                state.max_confidence = max(state.max_confidence, det.confidence)
+                if det.track_id is not None:
+                    state.observe_track(det.track_id, self.persistence)
+                else:
+                    per_frame[state.label] = per_frame.get(state.label, 0) + 1
+                states.append(state)
+            for label, count in per_frame.items():
+                self._products[label].observe_frame_count(count, self.persistence)
+            if detections:
+                self._check_frame_volumes(detections, states)
+        return frame_id
+
+    def _product_flags(self, state: _ProductState, seen: int, final: bool) -> List[str]:
+        flags = []
+        if seen > state.expected and state.max_confidence >= self.config['EXTRA_ITEM_CONF']:
+            flags.append(FraudFlag.EXTRA_ITEM.value)
+        if final and seen < state.expected:
+            flags.append(FraudFlag.MISSING_ITEM.value)
+        if state.volume_mismatch_frames >= self.persistence:
+            flags.append(FraudFlag.VOLUME_MISMATCH.value)
+        return flags
+
+    def result(self, final: bool = False) -> VerificationResult:
+        """
+        Current verdict.
+
+        Args:
+            final: The customer has finished; items not seen by now are missing.
+                While the session is open, shortfalls are reported as 'pending'.
+
+        Returns:
+            VerificationResult ('success', 'failed' or 'pending')
+        """
+        with self._lock:
+            flags = set()
+            matches = []
+            scanned_total = 0.0
+            detected_total = 0.0
+            for state in self._products.values():
+                seen = state.seen(self.persistence)
+                if not seen and not state.expected:
+                    continue  # unconfirmed noise for an unscanned product
+                item_flags = self._product_flags(state, seen, final)
+                flags.update(item_flags)
+                price = state.scanned.price if state.scanned else 0.0
+                scanned_total += price * state.expected
+                detected_total += price * min(seen, state.expected)
+                matches.append({
+                    'name': state.scanned.name if state.scanned else state.name,
+                    'product_id': state.scanned.product_id if state.scanned else None,
+                    'scanned': state.expected,
+                    'seen': seen,
+                    'confidence': round(state.max_confidence, 4),
+                    'measured_volume_m3': state.mean_volume_m3,
+                    'flags': item_flags,
+                })
+            short = any(m['seen'] < m['scanned'] for m in matches)
+            if flags:
+                status = 'failed'
+            elif short and not final:
+                status = 'pending'
+            else:
+                status = 'success'
+            return VerificationResult(
+                session_id=self.session_id,
+                status=status,
+                flags=sorted(flags),
+                scanned_total=round(scanned_total, 2),
+                detected_total=round(detected_total, 2),
+                matches=matches,
+                debug={'frames': self.frames, 'detections': self.detections, 'last_frame_id': self.last_frame_id},
+            )
+
+    def finish(self) -> VerificationResult:
+        return self.result(final=True)
+
+
+class BasketVerifier:
+    """
+    Creates and tracks verification sessions.
+
+    Shares one configuration across lanes; sessions are independent and can
+    be updated from different threads. Sessions that are never finished are
+    dropped oldest-first beyond ``max_sessions``.
+    """
+
+    def __init__(self, config_path: Path = CONFIG_PATH, max_sessions: int = 1024,
+                 calibration: Optional[CameraCalibration] = None, track: bool = True):
+        self.config = load_config(config_path)
+        self.calibration = calibration
+        self.track = track
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, VerificationSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _new_session(self, session_id: str, scanned_items: Iterable[ScannedItem]) -> VerificationSession:
+        tracker = None
+        if self.track:
+            tracker = ObjectTracker(low_conf=float(self.config['DETECTION_CONF_THRESH']))
+        return VerificationSession(session_id, scanned_items, self.config, self.calibration, tracker)
+
+    def start(self, session_id: str, scanned_items: Iterable[ScannedItem]) -> VerificationSession:
+        session = self._new_session(session_id, scanned_items)
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._sessions[session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session
+
+    def get(self, session_id: str) -> Optional[VerificationSession]:
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def finish(self, session_id: str) -> Optional[VerificationResult]:
+        """Final verdict for a session, which is then forgotten."""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        return session.finish() if session else None
+
+    def verify(self, session_id: str, scanned_items: Iterable[ScannedItem],
+               frames: Iterable[Tuple[int, List[Detection]]]) -> VerificationResult:
+        """One-shot verification over already collected frames."""
+        session = self._new_session(session_id, scanned_items)
+        for frame_id, detections in frames:
+            session.update(frame_id, detections)
+        return session.finish()
+
+
+def scanned_items_from_json(items: List[dict]) -> List[ScannedItem]:
+    """Build ScannedItems from sample_scanned_basket.json-style records."""
+    return [
+        ScannedItem(
+            product_id=str(item.get('product_id', '')),
+            name=item['name'],
+            price=float(item.get('price', 0.0)),
+            quantity=int(item.get('quantity', 1)),
+            expected_dimensions=item.get('dimensions') or item.get('expected_dimensions'),
+        )
+        for item in items
+    ]
+
+
+def load_scanned_basket(path: Path = SAMPLE_BASKET_PATH) -> List[ScannedItem]:
+    with open(path, 'r') as f:
+        return scanned_items_from_json(json.load(f))
+
+
+def main():
+    """Example usage of the BasketVerifier"""
+    verifier = BasketVerifier()
+    session = verifier.start('abc123', load_scanned_basket())
+    for frame_id in range(5):
+        session.update(frame_id, [
+            Detection(frame_id, 'Apple', 0.91, (10, 10, 60, 60), volume_m3=0.00033, product_id='1234567890123'),
+            Detection(frame_id, 'Milk', 0.88, (80, 10, 120, 120), volume_m3=0.00088, product_id='2345678901234'),
+        ])
+        print(f"frame {frame_id}: {session.result().status}")
+    print(json.dumps(verifier.finish('abc123').to_dict(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""
+Volume-consistency check between detections and the scanned basket.
+
+Every detection in a frame is converted to a metric volume in one
+vectorized pass:
+
+    metres_per_pixel = pixel_to_meter * depth_m / reference_depth_m
+    area_m2          = pixel_area * metres_per_pixel ** 2
+    thickness_m      = thickness_ratio * min(bbox_w, bbox_h) * metres_per_pixel
+    volume_m3        = area_m2 * thickness_m
+
+where depth_m = depth_estimate * depth_scale. The camera only sees one face
+of an item, so its depth extent is approximated from the smaller visible
+side.
+
+Measured volumes are then paired with the expected volumes of the scanned
+items (catalog width * height * depth, one entry per unit) by a minimum-cost
+assignment on the log volume ratio, with a penalty for pairing different
+labels. Pairs whose relative error exceeds the tolerance are mismatches.
+SciPy's linear_sum_assignment is used when installed (imported on first
+use; scipy.optimize adds a noticeable delay to process start); otherwise a
+greedy cheapest-pair-first matching is used.
+"""
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+
+# Added to the cost of pairing a detection with an item of another label
+LABEL_MISMATCH_COST = 10.0
+_EPS = 1e-12
+# scipy.optimize.linear_sum_assignment once resolved; False when scipy is missing
+_solver = None
+
+
+@dataclass
+class CameraCalibration:
+    """Pixel-to-metre scale from a reference object (see the calibration JSON)."""
+    pixel_to_meter: float = 0.001      # metres per pixel at reference_depth_m
+    depth_scale: float = 1.0           # metres per depth-map unit
+    reference_depth_m: float = 1.0
+    thickness_ratio: float = 1.0       # unseen depth extent relative to the smaller visible side
+
+    @classmethod
+    def from_reference(cls, width_pixels: float, width_meters: float, **kwargs) -> 'CameraCalibration':
+        """Calibrate from an object of known width imaged at reference_depth_m."""
+        return cls(pixel_to_meter=width_meters / width_pixels, **kwargs)
+
+
+def load_calibration(path: Path) -> CameraCalibration:
+    """Read a calibration JSON (pixel_to_meter, depth_scale and optional extras)."""
+    with open(path, 'r') as f:
+        payload = json.load(f)
+    known = CameraCalibration.__dataclass_fields__
+    return CameraCalibration(**{k: float(v) for k, v in payload.items() if k in known})
+
+
+def metric_volumes(pixel_areas, depths, bbox_sizes, calib: CameraCalibration) -> np.ndarray:
+    """
+    Convert per-detection pixel measurements to volumes in cubic metres.
+
+    Args:
+        pixel_areas: (N,) mask (or box) areas in pixels
+        depths: (N,) depth estimates in depth-map units
+        bbox_sizes: (N, 2) box widths and heights in pixels
+        calib: Camera calibration
+
+    Returns:
+        (N,) volumes; 0 where a measurement is missing
+    """
+    areas = np.asarray(pixel_areas, dtype=np.float64)
+    depth_m = np.asarray(depths, dtype=np.float64) * calib.depth_scale
+    sizes = np.asarray(bbox_sizes, dtype=np.float64).reshape(-1, 2)
+    m_per_px = calib.pixel_to_meter * depth_m / calib.reference_depth_m
+    area_m2 = areas * m_per_px ** 2
+    thickness_m = calib.thickness_ratio * sizes.min(axis=1) * m_per_px
+    return np.where((areas > 0) & (depth_m > 0), area_m2 * thickness_m, 0.0)
+
+
+def expected_volumes(dimensions: Sequence[Optional[dict]]) -> np.ndarray:
+    """(M,) catalog volumes from width/height/depth dicts; 0 where unknown."""
+    dims = np.array(
+        [[d.get('width', 0.0), d.get('height', 0.0), d.get('depth', 0.0)] if d else [0.0, 0.0, 0.0]
+         for d in dimensions],
+        dtype=np.float64,
+    ).reshape(-1, 3)
+    return dims.prod(axis=1)
+
+
+def _greedy_assignment(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Cheapest-pair-first matching: sort all pairs once, take each free row/column."""
+    n_rows, n_cols = cost.shape
+    order = np.argsort(cost, axis=None, kind='stable')
+    rows, cols = np.unravel_index(order, cost.shape)
+    used_rows = np.zeros(n_rows, dtype=bool)
+    used_cols = np.zeros(n_cols, dtype=bool)
+    picked_rows, picked_cols = [], []
+    limit = min(n_rows, n_cols)
+    for r, c in zip(rows, cols):
+        if not used_rows[r] and not used_cols[c]:
+            used_rows[r] = used_cols[c] = True
+            picked_rows.append(r)
+            picked_cols.append(c)
+            if len(picked_rows) == limit:
+                break
+    return np.asarray(picked_rows, dtype=np.int64), np.asarray(picked_cols, dtype=np.int64)
+
+
+def _linear_sum_assignment():
+    global _solver
+    if _solver is None:
+        try:
+            from scipy.optimize import linear_sum_assignment
+            _solver = linear_sum_assignment
+        except ImportError:  # scipy is optional; fall back to greedy matching
+            _solver = False
+    return _solver or None
+
+
+def assign(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Minimum-cost (rectangular) assignment: (row indices, column indices)."""
+    if cost.size == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    solver = _linear_sum_assignment()
+    if solver is not None:
+        rows, cols = solver(cost)
+        return rows.astype(np.int64), cols.astype(np.int64)
+    return _greedy_assignment(cost)
+
+
+@dataclass
+class VolumeCheck:
+    """Result of pairing measured volumes with expected ones."""
+    detection_idx: np.ndarray                  # (K,) indices into the measured volumes
+    expected_idx: np.ndarray                   # (K,) indices into the expected volumes
+    relative_error: np.ndarray                 # (K,) |measured - expected| / expected
+    mismatched: np.ndarray                     # (K,) bool, relative_error > tolerance
+    unmatched_detections: List[int] = field(default_factory=list)
+    unmatched_expected: List[int] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.mismatched.any()
+
+
+def check_volumes(measured, expected, tolerance: float = 0.3,
+                  measured_labels: Optional[Sequence[int]] = None,
+                  expected_labels: Optional[Sequence[int]] = None) -> VolumeCheck:
+    """
+    Pair measured with expected volumes and flag relative errors above `tolerance`.
+
+    Args:
+        measured: (N,) detected volumes (entries <= 0 are ignored)
+        expected: (M,) expected volumes (entries <= 0 are ignored)
+        tolerance: Allowed relative error
+        measured_labels: (N,) integer labels of the detections
+        expected_labels: (M,) integer labels of the expected items
+
+    Returns:
+        VolumeCheck with indices into the original arrays
+    """
+    measured = np.asarray(measured, dtype=np.float64)
+    expected = np.asarray(expected, dtype=np.float64)
+    det_idx = np.flatnonzero(measured > 0)
+    exp_idx = np.flatnonzero(expected > 0)
+
+    # |log ratio| treats "twice as big" and "half as big" alike
+    cost = np.abs(np.log(measured[det_idx, None] + _EPS) - np.log(expected[None, exp_idx] + _EPS))
+    if measured_labels is not None and expected_labels is not None:
+        m_lab = np.asarray(measured_labels)[det_idx]
+        e_lab = np.asarray(expected_labels)[exp_idx]
+        cost += LABEL_MISMATCH_COST * (m_lab[:, None] != e_lab[None, :])
+
+    rows, cols = assign(cost)
+    d, e = det_idx[rows], exp_idx[cols]
+    rel = np.abs(measured[d] - expected[e]) / expected[e]
+    return VolumeCheck(
+        detection_idx=d,
+        expected_idx=e,
+        relative_error=rel,
+        mismatched=rel > tolerance,
+        unmatched_detections=sorted(set(det_idx.tolist()) - set(d.tolist())),
+        unmatched_expected=sorted(set(exp_idx.tolist()) - set(e.tolist())),
+    )
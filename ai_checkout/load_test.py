@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Concurrent load generator for the AI Smart Vision Scan API.
+
+Simulates N checkout lanes, each sending frames at a fixed rate. Arrivals are
+open-loop: every lane fires on its own schedule whether or not earlier
+requests have returned, so a slow server builds a backlog instead of
+silently slowing the generator down. Latency is measured from each request's
+scheduled send time, which keeps generator-side queueing in the numbers
+(no coordinated omission).
+
+Payloads are encoded once up front and reused; they are visually distinct
+synthetic camera frames (benchmarks.stand_in.synthetic_jpegs), so the
+server's result cache cannot answer them from one another. Requests carry no
+session_id, which keeps the cache out of the path entirely; the share of
+responses marked ``cached`` is reported next to the latency percentiles in
+case a server is configured otherwise. Requests go through one pooled
+httpx.AsyncClient. Install httpx with the other dev extras:
+pip install -r api/requirements_dev.txt
+
+Usage:
+    python load_test.py --lanes 8 --fps 2 --duration 60
+    python load_test.py --lanes 20 --fps 5 --payload json --out results.json
+
+Use it to size API instances: raise --lanes until p99 latency or the
+busy/error rate crosses the rollout budget.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from benchmarks.stand_in import synthetic_jpegs
+from inference.instrumentation import LATENCY_BUCKETS
+from test_infer import API_BASE_URL, load_bigbasket_data
+
+# Statuses /detect-vision returns for a request it handled
+HANDLED_STATUSES = ("success", "unknown_item")
+
+
+@dataclass
+class LoadResult:
+    """Outcome counters and raw latencies of one load run."""
+    duration_s: float = 0.0
+    scheduled: int = 0
+    latencies_ms: List[float] = field(default_factory=list)      # handled requests only
+    cached: int = 0                                              # handled from the result cache
+    send_lag_ms: List[float] = field(default_factory=list)       # actual - scheduled send time
+    outcomes: Dict[str, int] = field(default_factory=dict)
+
+    def count(self, outcome: str) -> None:
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    def summary(self, offered_rps: float) -> dict:
+        completed = sum(self.outcomes.values())
+        handled = len(self.latencies_ms)
+        errors = completed - handled
+        lat = np.asarray(self.latencies_ms or [0.0])
+        lag = np.asarray(self.send_lag_ms or [0.0])
+        return {
+            "duration_s": round(self.duration_s, 3),
+            "offered_rps": round(offered_rps, 2),
+            "scheduled": self.scheduled,
+            "completed": completed,
+            "handled": handled,
+            "achieved_rps": round(handled / self.duration_s, 2) if self.duration_s else 0.0,
+            "error_rate": round(errors / completed, 4) if completed else 0.0,
+            "cached_ratio": round(self.cached / handled, 4) if handled else 0.0,
+            "outcomes": dict(sorted(self.outcomes.items())),
+            "latency_ms": {
+                "p50": round(float(np.percentile(lat, 50)), 2),
+                "p90": round(float(np.percentile(lat, 90)), 2),
+                "p95": round(float(np.percentile(lat, 95)), 2),
+                "p99": round(float(np.percentile(lat, 99)), 2),
+                "max": round(float(lat.max()), 2),
+                "mean": round(float(lat.mean()), 2),
+            },
+            "send_lag_p99_ms": round(float(np.percentile(lag, 99)), 2),
+            "histogram": histogram(self.latencies_ms),
+        }
+
+
+def histogram(latencies_ms: List[float]) -> List[Tuple[str, int]]:
+    """Counts per latency bucket (the /metrics buckets, in ms), non-cumulative."""
+    edges = [b * 1000 for b in LATENCY_BUCKETS]
+    counts = np.bincount(np.searchsorted(edges, latencies_ms, side="left"), minlength=len(edges) + 1)
+    labels = [f"<= {e:g} ms" for e in edges] + [f"> {edges[-1]:g} ms"]
+    return [(label, int(c)) for label, c in zip(labels, counts)]
+
+
+def build_payloads(names: List[str], count: int, mode: str, size: Tuple[int, int]) -> List[dict]:
+    """Pre-encode `count` distinct frames labelled with `names` (httpx keyword arguments)."""
+    payloads = []
+    for jpeg in synthetic_jpegs(names, count, size):
+        if mode == "json":
+            data_url = "data:image/jpeg;base64," + base64.b64encode(jpeg).decode("ascii")
+            payloads.append({"json": {"image": data_url}})
+        else:
+            payloads.append({"content": jpeg, "headers": {"Content-Type": "image/jpeg"}})
+    return payloads
+
+
+async def send(client: httpx.AsyncClient, endpoint: str, payload: dict, lane: int,
+               scheduled: float, result: LoadResult) -> None:
+    result.send_lag_ms.append((time.perf_counter() - scheduled) * 1000)
+    try:
+        response = await client.post(endpoint, params={"user_id": f"lane-{lane}"}, **payload)
+    except httpx.TimeoutException:
+        result.count("timeout")
+        return
+    except httpx.HTTPError as e:
+        result.count(f"transport_error:{type(e).__name__}")
+        return
+    elapsed_ms = (time.perf_counter() - scheduled) * 1000
+
+    if response.status_code == 429:
+        result.count("busy")
+        return
+    if response.status_code != 200:
+        result.count(f"http_{response.status_code}")
+        return
+    try:
+        body = response.json()
+        status = body.get("status", "missing_status")
+    except ValueError:
+        body, status = {}, "invalid_json"
+    result.count(status)
+    if status in HANDLED_STATUSES:
+        result.latencies_ms.append(elapsed_ms)
+        if body.get("cached"):
+            result.cached += 1
+
+
+async def run_lane(client: httpx.AsyncClient, endpoint: str, payloads: List[dict], lane: int, fps: float,
+                   start: float, duration_s: float, result: LoadResult, tasks: List[asyncio.Task]) -> None:
+    """Fire requests at start + phase + k / fps until duration_s has elapsed."""
+    rng = random.Random(lane)
+    interval = 1.0 / fps
+    # Spread lanes so they do not all fire on the same tick
+    next_at = start + rng.uniform(0, interval)
+    k = 0
+    while next_at < start + duration_s:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        payload = payloads[(lane + k) % len(payloads)]
+        tasks.append(asyncio.create_task(send(client, endpoint, payload, lane, next_at, result)))
+        result.scheduled += 1
+        k += 1
+        next_at += interval
+
+
+async def run_load(base_url: str, endpoint: str, payloads: List[dict], lanes: int, fps: float,
+                   duration_s: float, timeout_s: float = 10.0, max_connections: Optional[int] = None,
+                   transport: Optional[httpx.AsyncBaseTransport] = None) -> LoadResult:
+    """
+    Drive `lanes` open-loop lanes at `fps` frames per second each.
+
+    Args:
+        base_url: API root
+        endpoint: Path to post frames to
+        payloads: Pre-encoded bodies from build_payloads
+        lanes: Number of simulated checkout lanes
+        fps: Frames per second per lane
+        duration_s: How long to keep scheduling new requests
+        timeout_s: Per-request timeout
+        max_connections: Connection pool size (default: 2 per lane)
+        transport: Optional httpx transport (e.g. ASGITransport for in-process runs)
+
+    Returns:
+        LoadResult; requests still in flight at the end are awaited
+    """
+    max_connections = max_connections or 2 * lanes
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    result = LoadResult()
+    tasks: List[asyncio.Task] = []
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout_s,
+                                 transport=transport) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            run_lane(client, endpoint, payloads, lane, fps, start, duration_s, result, tasks)
+            for lane in range(lanes)
+        ))
+        await asyncio.gather(*tasks)
+        result.duration_s = time.perf_counter() - start
+    return result
+
+
+async def wait_until_ready(base_url: str, timeout_s: float) -> bool:
+    """Poll /ready until the API reports warm models; False on timeout (True if /ready is absent)."""
+    deadline = time.monotonic() + timeout_s
+    async with httpx.AsyncClient(base_url=base_url, timeout=5.0) as client:
+        while True:
+            try:
+                response = await client.get("/ready")
+                if response.status_code in (200, 404):
+                    return True
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                return False
+            await asyncio.sleep(0.5)
+
+
+def print_report(summary: dict) -> None:
+    lat = summary["latency_ms"]
+    print("\n=== LOAD TEST SUMMARY ===")
+    print(f"Offered:   {summary['offered_rps']} req/s for {summary['duration_s']} s ({summary['scheduled']} requests)")
+    print(f"Achieved:  {summary['achieved_rps']} req/s handled, error rate {summary['error_rate']:.2%}, "
+          f"{summary['cached_ratio']:.2%} answered from the result cache")
+    print(f"Latency:   p50 {lat['p50']} ms, p90 {lat['p90']} ms, p95 {lat['p95']} ms, "
+          f"p99 {lat['p99']} ms, max {lat['max']} ms")
+    print(f"Generator: p99 send lag {summary['send_lag_p99_ms']} ms")
+    print("Outcomes:  " + ", ".join(f"{k}={v}" for k, v in summary["outcomes"].items()))
+    peak = max((c for _, c in summary["histogram"]), default=0)
+    for label, c in summary["histogram"]:
+        if c:
+            bar = "#" * max(1, round(40 * c / peak))
+            print(f"  {label:>14} {c:7d} {bar}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop load test for /detect-vision")
+    parser.add_argument("--url", default=API_BASE_URL, help="API base URL (default: API_BASE_URL)")
+    parser.add_argument("--endpoint", default="/detect-vision")
+    parser.add_argument("--lanes", type=int, default=4, help="Simulated checkout lanes")
+    parser.add_argument("--fps", type=float, default=2.0, help="Frames per second per lane")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to generate load")
+    parser.add_argument("--frames", type=int, default=64, help="Distinct pre-encoded frames")
+    parser.add_argument("--payload", choices=["jpeg", "json"], default="jpeg",
+                        help="Raw JPEG body, or the legacy JSON data URL body")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--timeout", type=float, default=10.0, help="Per-request timeout in seconds")
+    parser.add_argument("--max-connections", type=int, help="Connection pool size (default: 2 per lane)")
+    parser.add_argument("--wait-ready", type=float, default=60.0,
+                        help="Seconds to wait for /ready before starting (0 to skip)")
+    parser.add_argument("--out", help="Write the summary JSON here")
+    args = parser.parse_args()
+
+    try:
+        names = [p.get("name", "Unknown") for p in load_bigbasket_data()[:args.frames]]
+    except (OSError, ValueError):
+        names = []
+    names = names or [f"Sample product {i}" for i in range(args.frames)]
+    payloads = build_payloads(names, args.frames, args.payload, (args.width, args.height))
+
+    if args.wait_ready > 0 and not asyncio.run(wait_until_ready(args.url, args.wait_ready)):
+        print(f"API at {args.url} was not ready after {args.wait_ready} s; starting anyway")
+    print(f"Load testing {args.url}{args.endpoint}: {args.lanes} lanes x {args.fps} fps for {args.duration} s")
+    result = asyncio.run(run_load(
+        args.url, args.endpoint, payloads, args.lanes, args.fps, args.duration,
+        timeout_s=args.timeout, max_connections=args.max_connections,
+    ))
+    summary = result.summary(args.lanes * args.fps)
+    print_report(summary)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"\nWrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Offline build scripts for the AI checkout system."""
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Build the memory-mapped columnar catalog store.
+
+Runs after build_catalog (which writes data/product_catalog.json) and
+converts the JSON catalog into the read-only store that API workers map at
+startup. Run it as part of a deploy so workers never build the store
+themselves.
+
+Usage:
+    python -m scripts.build_catalog_store [--catalog data/product_catalog.json]
+                                          [--out data/product_catalog.store]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from api.catalog_store import CatalogStore, store_lock, write_store
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the columnar product catalog store")
+    parser.add_argument("--catalog", type=Path, default=DATA_DIR / "product_catalog.json")
+    parser.add_argument("--out", type=Path, default=DATA_DIR / "product_catalog.store")
+    args = parser.parse_args()
+
+    with open(args.catalog, "r") as f:
+        products = json.load(f)
+
+    start = time.perf_counter()
+    with store_lock(args.out):
+        write_store(products, args.out, source=args.catalog)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store = CatalogStore(args.out)
+    open_ms = (time.perf_counter() - start) * 1000
+
+    size_mb = sum(p.stat().st_size for p in args.out.iterdir()) / 1e6
+    print(f"Wrote {len(store)} products to {args.out} ({size_mb:.1f} MB, version {store.version})")
+    print(f"Build took {build_s:.2f}s; opening the store takes {open_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
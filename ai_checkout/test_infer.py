@@ -9,13 +9,8 @@ and logs the results for debugging and verification.
 import os
 import json
 import base64
-import requests
 import cv2
 import numpy as np
-from io import BytesIO
-from PIL import Image
-import pandas as pd
-import uuid
 
 # Configuration
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
@@ -27,8 +22,8 @@ def load_bigbasket_data():
     with open(BIGBASKET_CSV, 'r') as f:
         return json.load(f)
 
-def create_sample_image(product_name: str, size: tuple = (640, 480)) -> str:
-    """Create a sample image with text and encode as base64."""
+def create_sample_jpeg(product_name: str, size: tuple = (640, 480)) -> bytes:
+    """Create a sample image with text and return the encoded JPEG bytes."""
     # Create a blank image
     img = np.zeros((size[1], size[0], 3), dtype=np.uint8)
     img[:] = (255, 255, 255)  # White background
@@ -39,21 +34,35 @@ def create_sample_image(product_name: str, size: tuple = (640, 480)) -> str:
     
     # Encode as JPEG
     _, buffer = cv2.imencode('.jpg', img)
-    
-    # Convert to base64
-    jpg_as_text = base64.b64encode(buffer).decode('utf-8')
+    return buffer.tobytes()
+
+def create_sample_image(product_name: str, size: tuple = (640, 480)) -> str:
+    """Create a sample image with text and encode as a base64 data URL."""
+    jpg_as_text = base64.b64encode(create_sample_jpeg(product_name, size)).decode('utf-8')
     return f"data:image/jpeg;base64,{jpg_as_text}"
 
-def send_detection_request(image_base64: str, user_id: str = "test_user") -> dict:
-    """Send detection request to API."""
+def send_detection_request(image, user_id: str = "test_user") -> dict:
+    """
+    Send detection request to API.
+
+    Raw JPEG bytes are posted as the request body; strings are sent as the
+    legacy JSON data URL payload.
+    """
+    # Imported here so load_test can reuse the frame helpers without requests installed
+    import requests
+
     url = f"{API_BASE_URL}/detect-vision"
-    payload = {
-        "image": image_base64,
-        "user_id": user_id
-    }
     
     try:
-        response = requests.post(url, json=payload)
+        if isinstance(image, bytes):
+            response = requests.post(
+                url,
+                data=image,
+                params={"user_id": user_id},
+                headers={"Content-Type": "image/jpeg"},
+            )
+        else:
+            response = requests.post(url, json={"image": image, "user_id": user_id})
         return response.json()
     except Exception as e:
         print(f"Error sending request: {e}")
@@ -75,10 +84,10 @@ def test_sample_images():
         print(f"\nTesting product {i+1}/{len(test_products)}: {product_name}")
         
         # Create sample image
-        image_base64 = create_sample_image(product_name)
+        image_bytes = create_sample_jpeg(product_name)
         
         # Send detection request
-        result = send_detection_request(image_base64)
+        result = send_detection_request(image_bytes)
         results.append({
             "product_name": product_name,
             "result": result
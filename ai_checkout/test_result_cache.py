@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the perceptual result cache.
+
+Run with `python -m pytest test_result_cache.py` (or directly with python).
+"""
+
+import cv2
+import numpy as np
+
+from api.result_cache import ResultCache, frame_signature
+from test_infer import create_sample_jpeg
+
+PRODUCTS = ["Apple", "Milk", "Tata Salt", "Amul Butter"]
+
+
+def decode(data: bytes) -> np.ndarray:
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def test_different_products_do_not_share_a_prediction():
+    cache = ResultCache()
+    first = decode(create_sample_jpeg(PRODUCTS[0]))
+    cache.put("lane-1", frame_signature(first), (PRODUCTS[0], 0.9))
+    for name in PRODUCTS[1:]:
+        hit, _ = cache.get("lane-1", frame_signature(decode(create_sample_jpeg(name))))
+        assert not hit, f"{name} reused the prediction for {PRODUCTS[0]}"
+
+
+def test_noisy_repeat_of_a_frame_hits():
+    cache = ResultCache()
+    frame = decode(create_sample_jpeg("Apple"))
+    cache.put("lane-1", frame_signature(frame), ("Apple", 0.9))
+
+    noise = np.random.default_rng(0).normal(0, 4, frame.shape)
+    noisy = np.clip(frame + noise, 0, 255).astype(np.uint8)
+    _, buf = cv2.imencode(".jpg", noisy, [cv2.IMWRITE_JPEG_QUALITY, 80])
+    hit, value = cache.get("lane-1", frame_signature(decode(buf.tobytes())))
+    assert hit and value == ("Apple", 0.9)
+    # Sessions never see each other's entries
+    assert not cache.get("lane-2", frame_signature(frame))[0]
+
+
+if __name__ == "__main__":
+    test_different_products_do_not_share_a_prediction()
+    test_noisy_repeat_of_a_frame_hits()
+    print("ok")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Unit tests for scanned-vs-detected basket reconciliation.
+
+Run with `python -m pytest test_verify_basket.py` (or directly with python).
+"""
+
+from inference.verify_basket import (
+    DEFAULT_CONFIG,
+    Detection,
+    FraudFlag,
+    ScannedItem,
+    VerificationSession,
+)
+
+# 10 x 10 x 10 cm: 0.001 m^3 per unit
+JUICE = ScannedItem('p1', 'Orange Juice 1L', 99.0, quantity=2,
+                    expected_dimensions={'width': 0.1, 'height': 0.1, 'depth': 0.1})
+
+
+def juice_frame(frame_id: int, volume_m3: float):
+    return [
+        Detection(frame_id, 'Orange Juice', 0.9, (0, 0, 50, 50), volume_m3=volume_m3, product_id='p1'),
+        Detection(frame_id, 'Orange Juice', 0.9, (60, 0, 110, 50), volume_m3=volume_m3, product_id='p1'),
+    ]
+
+
+def test_volume_mismatch_counts_each_frame_once_per_product():
+    config = dict(DEFAULT_CONFIG, TRACKER_PERSISTENCE_FRAMES=3)
+    session = VerificationSession('s1', [JUICE], config)
+
+    # Both units mismatch in every frame, but that is one bad frame for the product
+    for frame_id in range(2):
+        session.update(frame_id, juice_frame(frame_id, 0.004))
+    assert FraudFlag.VOLUME_MISMATCH.value not in session.result().flags
+
+    session.update(2, juice_frame(2, 0.004))
+    assert FraudFlag.VOLUME_MISMATCH.value in session.result().flags
+
+
+def test_matching_volumes_for_quantity_two_succeed():
+    config = dict(DEFAULT_CONFIG, TRACKER_PERSISTENCE_FRAMES=3)
+    session = VerificationSession('s2', [JUICE], config)
+    for frame_id in range(5):
+        session.update(frame_id, juice_frame(frame_id, 0.001))
+    result = session.finish()
+    assert result.status == 'success'
+    assert result.flags == []
+
+
+if __name__ == '__main__':
+    test_volume_mismatch_counts_each_frame_once_per_product()
+    test_matching_volumes_for_quantity_two_succeed()
+    print('ok')